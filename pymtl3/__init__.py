@@ -1,5 +1,25 @@
-from .datatypes import *
-from .datatypes import _bitwidths
+import sys
+
+from .datatypes import (
+    Bits,
+    BitsArray,
+    _bitwidths,
+    _get_lazy_bits,
+    bitstruct,
+    clog2,
+    concat,
+    is_bitstruct_class,
+    is_bitstruct_inst,
+    is_packed_bitstruct_class,
+    mk_bits,
+    mk_bitstruct,
+    reduce_and,
+    reduce_or,
+    reduce_xor,
+    sext,
+    trunc,
+    zext,
+)
 from .dsl.Component import Component
 from .dsl.ComponentLevel1 import update
 from .dsl.ComponentLevel2 import update_ff
@@ -19,6 +39,7 @@ from .dsl.Connectable import (
     CallerPort,
     InPort,
     Interface,
+    MemArray,
     OutPort,
     Wire,
 )
@@ -27,9 +48,21 @@ from .dsl.MetadataKey import MetadataKey
 from .dsl.Placeholder import Placeholder
 from .passes.PassGroups import DefaultPassGroup
 
+# BitsN and bN are created on first access, see datatypes/bits_import.py
+def __getattr__( name ):
+  Type = _get_lazy_bits( name )
+  if Type is None:
+    raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
+  globals()[ name ] = Type
+  return Type
+
+# No module __getattr__ before Python 3.7 (PEP 562)
+if sys.version_info < ( 3, 7 ):
+  from .datatypes import *
+
 __all__ = [
   'U','M','RD','WR',
-  'Wire', 'InPort', 'OutPort', 'Interface', 'CallerPort', 'CalleePort',
+  'Wire', 'InPort', 'OutPort', 'MemArray', 'Interface', 'CallerPort', 'CalleePort',
   'update', 'update_ff', 'update_once', 'connect', 'method_port',
   'CalleeIfcRTL', 'CallerIfcRTL',
   'non_blocking', 'CalleeIfcCL', 'CallerIfcCL',
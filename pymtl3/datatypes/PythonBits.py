@@ -125,6 +125,69 @@ class Bits:
   def to_bits( self ):
     return self
 
+  # Fused in-place operations. x.iadd(y) is x @= x + y, x.assign_add(a, b)
+  # is x @= a + b, and x.assign_field(lo, hi, y) is x[lo:hi] @= y. They
+  # check the operands once and update _uint without creating temporary
+  # Bits objects. Update blocks that use them stay translatable.
+
+  def _operand_uint( self, v, op ):
+    nbits = self._nbits
+    try:
+      if v.nbits != nbits:
+        raise ValueError( f"Operands of '{op}' operation must have matching bitwidth, "\
+                          f"but here Bits{nbits} != Bits{v.nbits}.\n" )
+      return v._uint
+    except AttributeError:
+      v = int(v)
+      up = _upper[ nbits ]
+      if v < 0 or v > up:
+        raise ValueError( f"Integer {hex(v)} is not a valid binop operand with Bits{nbits}!\n"
+                          f"Suggestion: 0 <= x <= {hex(up)}" )
+      return v
+
+  def iadd( self, v ):
+    self._uint = (self._uint + self._operand_uint( v, '+' )) & _upper[self._nbits]
+    return self
+
+  def isub( self, v ):
+    self._uint = (self._uint - self._operand_uint( v, '-' )) & _upper[self._nbits]
+    return self
+
+  def assign_add( self, a, b ):
+    # a + b of two ints is an int RHS, which @= checks before masking
+    if isinstance( a, int ) and isinstance( b, int ):
+      return self.__imatmul__( a + b )
+    self._uint = (self._operand_uint( a, '+' ) + self._operand_uint( b, '+' )) & _upper[self._nbits]
+    return self
+
+  def assign_sub( self, a, b ):
+    if isinstance( a, int ) and isinstance( b, int ):
+      return self.__imatmul__( a - b )
+    self._uint = (self._operand_uint( a, '-' ) - self._operand_uint( b, '-' )) & _upper[self._nbits]
+    return self
+
+  def assign_field( self, start, stop, v ):
+    start, stop = int(start), int(stop)
+    if not 0 <= start < stop <= self._nbits:
+      raise IndexError( f"Invalid access: [{start}:{stop}] in a Bits{self._nbits} instance" )
+
+    nbits = stop - start
+    up = _upper[nbits]
+    try:
+      if v.nbits != nbits:
+        raise ValueError( f"Cannot fit a Bits{v.nbits} object into a {nbits}-bit slice [{start}:{stop}]\n"
+                          f"- Suggestion: sext/zext/trunc the RHS" )
+      v = v._uint
+    except AttributeError:
+      v = int(v)
+      lo = _lower[nbits]
+      if v < lo or v > up:
+        raise ValueError( f"Cannot fit {v} into a Bits{nbits} slice\n" \
+                          f"(Bits{nbits} only accepts {hex(lo)} <= value <= {hex(up)})" )
+
+    self._uint = (self._uint & ~(up << start)) | ((v & up) << start)
+    return self
+
   # Arithmetics
   def __getitem__( self, idx ):
 
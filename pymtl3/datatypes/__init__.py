@@ -1,4 +1,32 @@
-from .bits_import import *
-from .bits_import import _bitwidths
-from .bitstructs import bitstruct, is_bitstruct_class, is_bitstruct_inst, mk_bitstruct
+import sys
+
+from .bits_import import Bits, _bitwidths, _get_lazy_bits, mk_bits
+from .bits_array import BitsArray
+from .bitstructs import (
+    bitstruct,
+    is_bitstruct_class,
+    is_bitstruct_inst,
+    is_packed_bitstruct_class,
+    mk_bitstruct,
+)
 from .helpers import clog2, concat, reduce_and, reduce_or, reduce_xor, sext, trunc, zext
+
+# BitsN and bN are created on first access, see bits_import.py
+def __getattr__( name ):
+  Type = _get_lazy_bits( name )
+  if Type is None:
+    raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
+  globals()[ name ] = Type
+  return Type
+
+# No module __getattr__ before Python 3.7 (PEP 562)
+if sys.version_info < ( 3, 7 ):
+  from .bits_import import *
+
+__all__ = [
+  'Bits', 'mk_bits', 'BitsArray',
+  'bitstruct', 'mk_bitstruct', 'is_bitstruct_class', 'is_bitstruct_inst',
+  'is_packed_bitstruct_class',
+  'clog2', 'concat', 'reduce_and', 'reduce_or', 'reduce_xor', 'sext', 'trunc', 'zext',
+] + [ "Bits{}".format(x) for x in _bitwidths ] \
+  + [ "b{}".format(x) for x in _bitwidths ]
@@ -0,0 +1,150 @@
+"""
+==========================================================================
+bits_array.py
+==========================================================================
+The simulation value of a MemArray signal. A BitsArray stores the values
+of all elements in a single list of integers instead of one Bits object
+per element.
+
+Indexing a BitsArray returns a view of the element, which is an instance
+of a subclass of the element BitsN type whose _uint is read from and
+written to the list. Hence all Bits operations work on elements, and
+m[i] @= x checks the bitwidth of x as usual. m[i] <<= x records a pending
+write which is applied by _flip, so flipping only costs the number of
+writes in the cycle instead of the number of elements.
+"""
+from .bits_import import Bits, mk_bits
+from .PythonBits import Bits as PythonBits
+
+_elem_view_types = {}
+
+def _mk_elem_view_type( Type ):
+  nbits = Type.nbits
+  if nbits in _elem_view_types:
+    return _elem_view_types[ nbits ]
+
+  def get_uint( self ):
+    return self._arr._data[ self._idx ]
+
+  def set_uint( self, v ):
+    self._arr._data[ self._idx ] = v
+
+  def set_next( self, v ):
+    self._arr._pending.append( (self._idx, v) )
+
+  # The properties override the _uint and _next slots of BitsN. A view
+  # reports BitsN as its __class__ so that it can stand in for a Bits
+  # object of the element type.
+  view_type = type( f"{Type.__name__}ArrayElement", (Type,), {
+    '__slots__': ( '_arr', '_idx' ),
+    '__class__': property( lambda self: Type ),
+    '_nbits'   : nbits,
+    '_uint'    : property( get_uint, set_uint ),
+    '_next'    : property( get_uint, set_next ),
+  })
+  _elem_view_types[ nbits ] = view_type
+  return view_type
+
+class BitsArray:
+  __slots__ = ( 'Type', '_nelems', '_data', '_pending', '_view_type' )
+
+  def __init__( s, Type, nelems, values=None ):
+    if isinstance( Type, int ):
+      Type = mk_bits( Type )
+    if not isinstance( Type, type ) or not issubclass( Type, Bits ):
+      raise TypeError( f"The element type of a BitsArray must be a Bits type, not {Type}." )
+    if Bits is not PythonBits:
+      raise TypeError( "BitsArray is only supported with the pure-Python Bits." )
+
+    nelems = int(nelems)
+    if nelems < 1:
+      raise ValueError( f"A BitsArray needs at least one element, not {nelems}." )
+
+    s.Type       = Type
+    s._nelems    = nelems
+    s._view_type = _mk_elem_view_type( Type )
+    s._pending   = []
+
+    if values is None:
+      s._data = [ 0 ] * nelems
+    else:
+      if len(values) != nelems:
+        raise ValueError( f"Cannot initialize a BitsArray of {nelems} elements "
+                          f"with {len(values)} values." )
+      s._data = [ Type(v)._uint for v in values ]
+
+  def __len__( s ):
+    return s._nelems
+
+  def __getitem__( s, idx ):
+    i = int(idx)
+    if i < 0 or i >= s._nelems:
+      raise IndexError( f"Invalid access: [{i}] in a BitsArray of {s._nelems} elements" )
+    view = object.__new__( s._view_type )
+    view._arr = s
+    view._idx = i
+    return view
+
+  def __setitem__( s, idx, v ):
+    # The element itself is assigned back after m[i] @= x or m[i] <<= x
+    if getattr( v, '_arr', None ) is s and v._idx == idx:
+      return
+    view = s[idx]
+    view @= v
+
+  def __iter__( s ):
+    for i in range(s._nelems):
+      yield s[i]
+
+  def __imatmul__( s, other ):
+    if len(other) != s._nelems:
+      raise ValueError( f"Cannot assign {len(other)} elements to a BitsArray of {s._nelems} elements." )
+    for i in range(s._nelems):
+      view = s[i]
+      view @= other[i]
+    return s
+
+  def __ilshift__( s, other ):
+    if other is not s:
+      if len(other) != s._nelems:
+        raise ValueError( f"Cannot assign {len(other)} elements to a BitsArray of {s._nelems} elements." )
+      for i in range(s._nelems):
+        view = s[i]
+        view <<= other[i]
+    return s
+
+  def _flip( s ):
+    pending = s._pending
+    if pending:
+      data = s._data
+      for i, v in pending:
+        data[i] = v
+      pending.clear()
+
+  def clone( s ):
+    ret = object.__new__( BitsArray )
+    ret.Type       = s.Type
+    ret._nelems    = s._nelems
+    ret._view_type = s._view_type
+    ret._data      = s._data.copy()
+    ret._pending   = []
+    return ret
+
+  def __deepcopy__( s, memo ):
+    return s.clone()
+
+  def __eq__( s, other ):
+    if isinstance( other, BitsArray ):
+      return s.Type.nbits == other.Type.nbits and s._data == other._data
+    try:
+      return len(other) == s._nelems and all( x == y for x, y in zip( s, other ) )
+    except TypeError:
+      return False
+
+  __hash__ = None
+
+  def __str__( s ):
+    return "[{}]".format( ", ".join( str(x) for x in s ) )
+
+  def __repr__( s ):
+    return f"BitsArray({s.Type.__name__}, {s._nelems})"
@@ -5,13 +5,20 @@ bits_import.py
 Import RPython Bits from PyPy mamba module if the environment variable
 that forces the use of Python Bits is set, and there is actually an
 importable Bits in mamba module. Otherwise import the Pure-Python
-implementation in Bits.py. Then generate a bunch of fixed-width BitsN
-types for PyMTL use.
+implementation in Bits.py. Then provide the fixed-width BitsN types for
+PyMTL use.
+
+The BitsN types are created on first use by mk_bits, and the names
+BitsN/bN of the widths in _bitwidths are resolved lazily through the
+module __getattr__, so importing this module does not create hundreds of
+classes. Note that "from ... import *" still creates all of them. Module
+__getattr__ needs Python 3.7+, so older interpreters create them eagerly.
 
 Author : Shunning Jiang
 Date   : Aug 23, 2018
 """
 import os
+import sys
 
 from pymtl3.extra.pypy import custom_exec
 
@@ -22,18 +29,26 @@ from pymtl3.extra.pypy import custom_exec
   # def __new__( cls, value = 0 ):
     # return Bits( {nbits}, value )
 
+def _mk_python_bits_type( nbits ):
+  _init = Bits.__init__
+
+  def __init__( s, v=0, *, trunc_int=False ):
+    return _init( s, nbits, v, trunc_int )
+
+  # The action of a __slots__ declaration is limited to the class where it is defined.
+  # As a result, subclasses will have a __dict__ unless they also define __slots__.
+  return type( f"Bits{nbits}", (Bits,), {
+    '__slots__' : ( "_nbits", "_uint", "_next" ),
+    '__module__': __name__,
+    '__init__'  : __init__,
+    'nbits'     : nbits,
+  })
+
 if os.getenv("PYMTL_BITS") == "1":
   from .PythonBits import Bits
 
   # print("[env: PYMTL_BITS=1] Use Python Bits")
-  bits_template = """
-class Bits{0}(Bits):
-  __slots__ = ( "_nbits", "_uint", "_next" )
-  nbits = {0}
-  def __init__( s, v=0, *, trunc_int=False ):
-    return super().__init__( {0}, v, trunc_int )
-_bits_types[{0}] = b{0} = Bits{0}
-"""
+  _mk_bits_type = _mk_python_bits_type
 else:
   try:
     from mamba import Bits
@@ -44,33 +59,51 @@ class Bits{0}(Bits):
   nbits = {0}
   def __new__( cls, v=0, *, trunc_int=False ):
     return Bits.__new__( cls, {0}, v, trunc_int )
-_bits_types[{0}] = b{0} = Bits{0}
 """
+    def _mk_bits_type( nbits ):
+      _locals = {}
+      custom_exec(compile( bits_template.format(nbits), filename=f"Bits{nbits}", mode="exec" ),
+                  globals(), _locals )
+      return _locals[ f"Bits{nbits}" ]
+
   except ImportError:
     from .PythonBits import Bits
 
     # print("[default w/o Mamba] Use Python Bits")
-    # The action of a __slots__ declaration is limited to the class where it is defined.
-    # As a result, subclasses will have a __dict__ unless they also define __slots__.
-    bits_template = """
-class Bits{0}(Bits):
-  __slots__ = ( "_nbits", "_uint", "_next" )
-  nbits = {0}
-  def __init__( s, v=0, *, trunc_int=False ):
-    return super().__init__( {0}, v, trunc_int )
-_bits_types[{0}] = b{0} = Bits{0}
-"""
+    _mk_bits_type = _mk_python_bits_type
 
 _bitwidths  = list(range(1, 256)) + [ 384, 512 ]
 _bits_types = dict()
 
-custom_exec(compile( "".join([ bits_template.format(nbits) for nbits in _bitwidths ]),
-                     filename="bits_import.py", mode="exec"), globals(), locals() )
-
 def mk_bits( nbits ):
   assert nbits > 0, "We don't allow Bits0"
   # assert nbits < 512, "We don't allow bitwidth to exceed 512."
   if nbits not in _bits_types:
-    custom_exec(compile( bits_template.format(nbits), filename=f"Bits{nbits}", mode="exec" ),
-                globals(), locals() )
+    _bits_types[nbits] = Type = _mk_bits_type( nbits )
+    # Bind the names so that later lookups skip __getattr__
+    globals()[ f"Bits{nbits}" ] = globals()[ f"b{nbits}" ] = Type
   return _bits_types[nbits]
+
+_lazy_bits_names = { f"{prefix}{nbits}": nbits for nbits in _bitwidths
+                                               for prefix in ( "Bits", "b" ) }
+
+def _get_lazy_bits( name ):
+  """Return the BitsN type named by BitsN/bN, or None if the name is not
+  one of the predefined widths."""
+  nbits = _lazy_bits_names.get( name )
+  if nbits is None:
+    return None
+  return mk_bits( nbits )
+
+def __getattr__( name ):
+  Type = _get_lazy_bits( name )
+  if Type is None:
+    raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
+  return Type
+
+# No module __getattr__ before Python 3.7 (PEP 562)
+if sys.version_info < ( 3, 7 ):
+  for _nbits in _bitwidths:
+    mk_bits( _nbits )
+
+__all__ = [ 'Bits', 'mk_bits' ] + list( _lazy_bits_names )
@@ -45,6 +45,12 @@ class Pixel:
   def __str__( self ):
     return f'({self.r},{self.g},{self.b})'
 
+A bit struct can also be declared as packed using @bitstruct(packed=True)
+or mk_bitstruct(..., packed=True). A packed bit struct instance stores
+all of its fields in a single integer, and accessing a field returns a
+view into that integer. This makes to_bits, from_bits, clone, @=, <<=
+and _flip constant-time operations instead of walking every field.
+
 Author : Yanghui Ou, Shunning Jiang
   Date : Oct 19, 2019
 """
@@ -58,8 +64,10 @@ import py
 
 from pymtl3.extra.pypy import custom_exec
 
-from .bits_import import *
+from .bits_import import Bits, mk_bits
 from .helpers import concat
+from .PythonBits import Bits as PythonBits
+from .PythonBits import _new_valid_bits
 
 #-------------------------------------------------------------------------
 # Constants
@@ -75,6 +83,10 @@ from .helpers import concat
 
 _FIELDS = '__bitstruct_fields__'
 
+# Packed bit struct classes have this attribute set to True.
+
+_PACKED = '__bitstruct_packed__'
+
 def is_bitstruct_inst( obj ):
   """Returns True if obj is an instance of a dataclass."""
   return hasattr(type(obj), _FIELDS)
@@ -83,13 +95,20 @@ def is_bitstruct_class(cls):
   """Returns True if obj is a dataclass ."""
   return isinstance(cls, type) and hasattr(cls, _FIELDS)
 
+def is_packed_bitstruct_class( cls ):
+  """Returns True if cls is a packed bitstruct class."""
+  return is_bitstruct_class(cls) and getattr(cls, _PACKED, False)
+
 def get_bitstruct_inst_all_classes( obj ):
   # list: put all types together
   if isinstance( obj, list ):
     return functools.reduce( operator.or_, [ get_bitstruct_inst_all_classes(x) for x in obj ] )
+  # BitsN, which might be a field view of a packed bitstruct
+  if isinstance( obj, Bits ):
+    return { mk_bits( obj.nbits ) }
   ret = { obj.__class__ }
-  # BitsN or int
-  if isinstance( obj, (Bits, int) ):
+  # int
+  if isinstance( obj, int ):
     return ret
   # BitStruct
   assert is_bitstruct_inst( obj ), f"{obj} is not a valid PyMTL Bitstruct!"
@@ -519,6 +538,254 @@ def _mk_from_bits_fns( fields, total_nbits ):
                        "other = other.to_bits()",
                        f"return cls({','.join(from_bits_strs)})" ], _globals )
 #-------------------------------------------------------------------------
+# Packed bitstruct
+#-------------------------------------------------------------------------
+# A packed bitstruct instance keeps the value of all of its fields in a
+# cell, which is a list of the current value and the next value used by
+# <<= and _flip. Every instance also has the bit offset _lo of itself in
+# the cell. A new instance owns its cell and has _lo = 0, whereas the
+# objects returned by accessing its fields are views that share the cell
+# at the bit offset of that field:
+#
+# - a BitsN field returns an instance of a subclass of BitsN whose _uint
+#   and _next are read from and written to the cell
+# - a bitstruct field returns an instance of that (packed) bitstruct
+# - a list field returns a _PackedList of views of its elements
+#
+# Since the views write through to the cell, s.x.y @= z and s.x.y <<= z
+# work as usual. Python assigns the result of the in-place operator
+# back to the field, which is detected and ignored by the field setter.
+
+_packed_bits_view_types = {}
+
+def _mk_packed_bits_view_type( Type ):
+  nbits = Type.nbits
+  if nbits in _packed_bits_view_types:
+    return _packed_bits_view_types[ nbits ]
+
+  mask = (1 << nbits) - 1
+
+  def get_uint( self ):
+    return (self._cell[0] >> self._lo) & mask
+
+  def set_uint( self, v ):
+    cell, lo = self._cell, self._lo
+    cell[0] = (cell[0] & ~(mask << lo)) | (v << lo)
+
+  def get_next( self ):
+    return (self._cell[1] >> self._lo) & mask
+
+  def set_next( self, v ):
+    cell, lo = self._cell, self._lo
+    cell[1] = (cell[1] & ~(mask << lo)) | (v << lo)
+
+  # The properties override the _uint and _next slots of BitsN, so all
+  # methods of Bits transparently operate on the cell. A view reports
+  # BitsN as its __class__ so that it can stand in for the field value,
+  # e.g., when the DSL infers the types of the fields of a signal.
+  view_type = type( f"Packed{Type.__name__}", (Type,), {
+    '__slots__': ( '_cell', '_lo' ),
+    '__class__': property( lambda self: Type ),
+    '_nbits'   : nbits,
+    '_uint'    : property( get_uint, set_uint ),
+    '_next'    : property( get_next, set_next ),
+  })
+  _packed_bits_view_types[ nbits ] = view_type
+  return view_type
+
+class _PackedList( list ):
+  """A list of views of the elements of a list field. Assigning to an
+  element writes through to the packed bitstruct."""
+
+  @property
+  def __class__( self ):
+    return list
+
+  def __setitem__( self, idx, value ):
+    if isinstance( idx, slice ):
+      for i, v in zip( range(*idx.indices(len(self))), value ):
+        self[i] = v
+      return
+    target = list.__getitem__( self, idx )
+    if value is not target:
+      if idx < 0:
+        idx += len(self)
+      self._assign( self._cell, self._lo + idx * self._width, value )
+
+def _mk_packed_accessors( type_ ):
+  """Return the number of bits of a field type, a function that creates
+  a view of the field at a bit offset of a cell, and a function that
+  assigns a value to the field at a bit offset of a cell."""
+
+  if isinstance( type_, list ):
+    n = len(type_)
+    width, elem_view, elem_assign = _mk_packed_accessors( type_[0] )
+
+    def mk_view( cell, lo ):
+      ret = _PackedList( [ elem_view( cell, lo + i * width ) for i in range(n) ] )
+      ret._cell, ret._lo, ret._width, ret._assign = cell, lo, width, elem_assign
+      return ret
+
+    def assign( cell, lo, value ):
+      if len(value) != n:
+        raise ValueError( f"Cannot assign a list of {len(value)} elements to a "
+                          f"list field of {n} elements" )
+      for i in range(n):
+        elem_assign( cell, lo + i * width, value[i] )
+
+    return n * width, mk_view, assign
+
+  if is_bitstruct_class( type_ ):
+    nbits = type_.nbits
+
+    def mk_view( cell, lo ):
+      ret = object.__new__( type_ )
+      ret._cell, ret._lo = cell, lo
+      return ret
+
+  else:
+    nbits = type_.nbits
+    view_type = _mk_packed_bits_view_type( type_ )
+
+    def mk_view( cell, lo ):
+      ret = object.__new__( view_type )
+      ret._cell, ret._lo = cell, lo
+      return ret
+
+  def assign( cell, lo, value ):
+    # @= checks the value before writing it through
+    view = mk_view( cell, lo )
+    view @= value
+
+  return nbits, mk_view, assign
+
+def _mk_packed_field( name, type_, offset ):
+  nbits, mk_view, assign = _mk_packed_accessors( type_ )
+
+  def fget( self ):
+    return mk_view( self._cell, self._lo + offset )
+
+  def fset( self, value ):
+    lo = self._lo + offset
+    # The view itself is assigned back after s.x @= y or s.x <<= y
+    if getattr( value, '_cell', None ) is self._cell and value._lo == lo:
+      return
+    assign( self._cell, lo, value )
+
+  return property( fget, fset, doc=f"Field {name} of the packed bitstruct." )
+
+def _get_packed_nbits( type_ ):
+  if isinstance( type_, list ):
+    return len(type_) * _get_packed_nbits( type_[0] )
+  return type_.nbits
+
+#-------------------------------------------------------------------------
+# _mk_packed_fns
+#-------------------------------------------------------------------------
+# Creates the field properties and all methods whose behavior differs
+# from the unpacked bitstruct. The packing order is the same as
+# to_bits: the first field is the MSB, and x[0] of a list is the LSB.
+#
+# def __init__( s, x = 0, y = None ):
+#   s._cell[0] = (_type_x(x)._uint << 16)
+#   if y is not None: s.y = y
+
+def _mk_packed_fns( self_name, fields ):
+  properties = {}
+  offsets    = {}
+  lo = 0
+  for name, type_ in reversed( list( fields.items() ) ):
+    offsets[ name ] = lo
+    properties[ name ] = _mk_packed_field( name, type_, lo )
+    lo += _get_packed_nbits( type_ )
+
+  total_nbits = lo
+  mask = (1 << total_nbits) - 1
+
+  # __init__ directly packs BitsN fields and assigns the other fields
+
+  _globals = {}
+  pack_strs   = []
+  assign_strs = []
+  for name, type_ in fields.items():
+    if isinstance( type_, list ) or is_bitstruct_class( type_ ):
+      assign_strs.append( f"if {name} is not None: {self_name}.{name} = {name}" )
+    else:
+      _globals[ f"_type_{name}" ] = type_
+      pack_strs.append( f"(_type_{name}({name})._uint << {offsets[name]})" )
+
+  init_fn = _create_fn(
+    '__init__',
+    [ self_name ] + [ _mk_init_arg( *field ) for field in fields.items() ],
+    [ f"{self_name}._cell[0] = {' | '.join(pack_strs) or '0'}" ] + assign_strs,
+    _globals = _globals,
+  )
+
+  def __new__( cls, *args, **kwargs ):
+    ret = object.__new__( cls )
+    ret._cell, ret._lo = [0, 0], 0
+    return ret
+
+  def _new( cls, v ):
+    ret = object.__new__( cls )
+    ret._cell, ret._lo = [v, 0], 0
+    return ret
+
+  def __eq__( self, other ):
+    return other.__class__ is self.__class__ and \
+           (self._cell[0] >> self._lo) & mask == (other._cell[0] >> other._lo) & mask
+
+  def __hash__( self ):
+    return hash( (self.__class__, (self._cell[0] >> self._lo) & mask) )
+
+  def to_bits( self ):
+    return _new_valid_bits( total_nbits, (self._cell[0] >> self._lo) & mask )
+
+  def from_bits( cls, other ):
+    assert cls.nbits == other.nbits, f'LHS bitstruct {cls.nbits}-bit <> RHS other {other.nbits}-bit'
+    return _new( cls, int( other.to_bits() ) )
+
+  def clone( self ):
+    return _new( self.__class__, (self._cell[0] >> self._lo) & mask )
+
+  def __deepcopy__( self, memo ):
+    return _new( self.__class__, (self._cell[0] >> self._lo) & mask )
+
+  def __imatmul__( self, other ):
+    if self.__class__ is not other.__class__:
+      other = self.__class__.from_bits( other.to_bits() )
+    v = (other._cell[0] >> other._lo) & mask
+    cell, lo = self._cell, self._lo
+    cell[0] = (cell[0] & ~(mask << lo)) | (v << lo)
+    return self
+
+  def __ilshift__( self, other ):
+    if self.__class__ is not other.__class__:
+      other = self.__class__.from_bits( other.to_bits() )
+    v = (other._cell[0] >> other._lo) & mask
+    cell, lo = self._cell, self._lo
+    cell[1] = (cell[1] & ~(mask << lo)) | (v << lo)
+    return self
+
+  def _flip( self ):
+    cell, lo = self._cell, self._lo
+    m = mask << lo
+    cell[0] = (cell[0] & ~m) | (cell[1] & m)
+
+  return properties, init_fn, {
+    '__new__'     : __new__,
+    '__eq__'      : __eq__,
+    '__hash__'    : __hash__,
+    '__imatmul__' : __imatmul__,
+    '__ilshift__' : __ilshift__,
+    '_flip'       : _flip,
+    'clone'       : clone,
+    '__deepcopy__': __deepcopy__,
+    'to_bits'     : to_bits,
+    'from_bits'   : classmethod( from_bits ),
+  }
+
+#-------------------------------------------------------------------------
 # _check_valid_array
 #-------------------------------------------------------------------------
 
@@ -573,6 +840,23 @@ def _check_field_annotation( cls, name, type_ ):
       raise TypeError( "We currently only support BitsN, list, or another BitStruct as BitStruct field:\n"
                       f"- Field '{name}' of BitStruct {cls.__name__} is annotated as {type_}." )
 
+#-------------------------------------------------------------------------
+# _check_packed_field_annotation
+#-------------------------------------------------------------------------
+
+def _check_packed_field_annotation( cls, name, type_ ):
+  if Bits is not PythonBits:
+    raise TypeError( "Packed bitstructs are only supported with the pure-Python Bits:\n"
+                    f"- BitStruct {cls.__name__} is declared as packed." )
+
+  while isinstance( type_, list ):
+    type_ = type_[0]
+
+  if is_bitstruct_class( type_ ) and not is_packed_bitstruct_class( type_ ):
+    raise TypeError( "A packed bitstruct can only have packed bitstructs as fields:\n"
+                    f"- Field '{name}' of BitStruct {cls.__name__} is annotated as "
+                    f"{type_.__name__}, which is not packed." )
+
 #-------------------------------------------------------------------------
 # _get_self_name
 #-------------------------------------------------------------------------
@@ -590,7 +874,7 @@ def _get_self_name( fields ):
 _bitstruct_hash_cache = {}
 
 def _process_class( cls, add_init=True, add_str=True, add_repr=True,
-                    add_hash=True ):
+                    add_hash=True, packed=False ):
 
   # Get annotations of the class
   cls_annotations = cls.__dict__.get('__annotations__', {})
@@ -609,6 +893,8 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
     return x
 
   reserved_fields = ['to_bits', 'from_bits', 'nbits']
+  if packed:
+    reserved_fields += ['_cell', '_lo']
   for x in reserved_fields:
     assert x not in cls.__dict__, f"Currently a bitstruct cannot have {reserved_fields}, but "\
                                   f"{x} is provided as {cls.__dict__[x]}"
@@ -618,11 +904,13 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
     assert a_name not in reserved_fields, f"Currently a bitstruct cannot have {reserved_fields}, but "\
                                           f"{a_name} is annotated as {a_type}"
     _check_field_annotation( cls, a_name, a_type )
+    if packed:
+      _check_packed_field_annotation( cls, a_name, a_type )
     fields[ a_name ] = a_type
     hashable_fields[ a_name ] = _convert_list_to_tuple( a_type )
 
   cls._hash = _hash = hash( (cls.__name__, *tuple(hashable_fields.items()),
-                             add_init, add_str, add_repr, add_hash) )
+                             add_init, add_str, add_repr, add_hash, packed) )
 
   if _hash in _bitstruct_hash_cache:
     return _bitstruct_hash_cache[ _hash ]
@@ -632,6 +920,10 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
   # Stamp the special attribute so that translation pass can identify it
   # as bit struct.
   setattr( cls, _FIELDS, fields )
+  setattr( cls, _PACKED, packed )
+
+  if packed:
+    properties, packed_init, packed_fns = _mk_packed_fns( _get_self_name(fields), fields )
 
   # Add methods to the class
 
@@ -640,7 +932,7 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
   # did not define their own init.
   if add_init:
     if not '__init__' in cls.__dict__:
-      cls.__init__ = _mk_init_fn( _get_self_name(fields), fields )
+      cls.__init__ = packed_init if packed else _mk_init_fn( _get_self_name(fields), fields )
 
   # Create __str__
   if add_str:
@@ -659,7 +951,7 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
   # equal only if all the fields are equal. We always try to add __eq__
 
   if not '__eq__' in cls.__dict__:
-    cls.__eq__ = _mk_eq_fn( fields )
+    cls.__eq__ = packed_fns['__eq__'] if packed else _mk_eq_fn( fields )
   else:
     w_msg = ( f'Overwriting {cls.__qualname__}\'s __eq__ may cause the '
               'translated verilog behaves differently from PyMTL '
@@ -669,29 +961,39 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
   # Create __hash__.
   if add_hash:
     if not '__hash__' in cls.__dict__:
-      cls.__hash__ = _mk_hash_fn( fields )
+      cls.__hash__ = packed_fns['__hash__'] if packed else _mk_hash_fn( fields )
 
   # Shunning: add __ilshift__ and _flip for update_ff
   assert not '__ilshift__' in cls.__dict__ and not '_flip' in cls.__dict__
 
-  cls.__ilshift__, cls._flip = _mk_ff_fn( fields )
-
   # Shunning: add clone
   assert not 'clone' in cls.__dict__ and not '__deepcopy__' in cls.__dict__
 
-  cls.clone = _mk_clone_fn( fields )
-
-  cls.__deepcopy__ = _mk_deepcopy_fn( fields )
-
   # Shunning: add imatmul for assignment, as well as nbits/to_bits/from_bits
   assert '__imatmul__' not in cls.__dict__ and 'to_bits' not in cls.__dict__ and \
          'nbits' not in cls.__dict__ and 'from_bits' not in cls.__dict__
 
-  cls.__imatmul__ = _mk_imatmul_fn( fields )
-  cls.nbits, cls.to_bits = _mk_nbits_to_bits_fn( fields )
+  if packed:
+    cls.nbits = sum( _get_packed_nbits( type_ ) for type_ in fields.values() )
+    cls.__new__ = staticmethod( packed_fns['__new__'] )
+    for name in [ '__ilshift__', '_flip', 'clone', '__deepcopy__',
+                  '__imatmul__', 'to_bits', 'from_bits' ]:
+      setattr( cls, name, packed_fns[ name ] )
+    for name, prop in properties.items():
+      setattr( cls, name, prop )
+
+  else:
+    cls.__ilshift__, cls._flip = _mk_ff_fn( fields )
+
+    cls.clone = _mk_clone_fn( fields )
+
+    cls.__deepcopy__ = _mk_deepcopy_fn( fields )
+
+    cls.__imatmul__ = _mk_imatmul_fn( fields )
+    cls.nbits, cls.to_bits = _mk_nbits_to_bits_fn( fields )
 
-  from_bits = _mk_from_bits_fns( fields, cls.nbits )
-  cls.from_bits = classmethod(from_bits)
+    from_bits = _mk_from_bits_fns( fields, cls.nbits )
+    cls.from_bits = classmethod(from_bits)
 
   assert not 'get_field_type' in cls.__dict__
 
@@ -712,10 +1014,11 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
 # The actual class decorator. We add a * in the argument list so that the
 # following argument can only be used as keyword arguments.
 
-def bitstruct( _cls=None, *, add_init=True, add_str=True, add_repr=True, add_hash=True ):
+def bitstruct( _cls=None, *, add_init=True, add_str=True, add_repr=True, add_hash=True,
+               packed=False ):
 
   def wrap( cls ):
-    return _process_class( cls, add_init, add_str, add_repr )
+    return _process_class( cls, add_init, add_str, add_repr, packed=packed )
 
   # Called as @bitstruct(...)
   if _cls is None:
@@ -731,7 +1034,7 @@ def bitstruct( _cls=None, *, add_init=True, add_str=True, add_repr=True, add_has
 # TODO: should we add base parameters to support inheritence?
 
 def mk_bitstruct( cls_name, fields, *, namespace=None, add_init=True,
-                   add_str=True, add_repr=True, add_hash=True ):
+                   add_str=True, add_repr=True, add_hash=True, packed=False ):
 
   # copy namespace since  will mutate it
   namespace = {} if namespace is None else namespace.copy()
@@ -750,4 +1053,4 @@ def mk_bitstruct( cls_name, fields, *, namespace=None, add_init=True,
   namespace['__annotations__'] = annos
   cls = types.new_class( cls_name, (), {}, lambda ns: ns.update( namespace ) )
   return bitstruct( cls, add_init=add_init, add_str=add_str,
-                    add_repr=add_repr, add_hash=add_hash )
+                    add_repr=add_repr, add_hash=add_hash, packed=packed )
@@ -10,7 +10,7 @@ Date   : Nov 3, 2017
 """
 import math
 
-from .bits_import import *
+from .bits_import import Bits, b1
 
 try:
   from mamba import concat
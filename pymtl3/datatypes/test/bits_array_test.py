@@ -0,0 +1,77 @@
+"""
+==========================================================================
+bits_array_test.py
+==========================================================================
+Test cases for BitsArray.
+"""
+
+import copy
+
+import pytest
+
+from ..bits_array import BitsArray
+from ..bits_import import *
+
+
+def test_basic():
+  a = BitsArray( Bits8, 4 )
+  assert len(a) == 4
+  assert a == [ 0, 0, 0, 0 ]
+  assert repr(a) == "BitsArray(Bits8, 4)"
+
+  a[1] @= 0x12
+  a[b2(2)] @= b8(0x34)
+  assert a[1] == 0x12
+  assert a[1].__class__ is Bits8
+  assert a[2] + a[1] == b8(0x46)
+  assert [ int(x) for x in a ] == [ 0, 0x12, 0x34, 0 ]
+
+  # Slices of an element write through
+  a[3][4:8] @= 0xf
+  assert a[3] == 0xf0
+
+  # An element is a view of the array
+  x = a[1]
+  a[1] @= 0x56
+  assert x == 0x56
+
+  b = BitsArray( 8, 4, [ 0, 0x56, 0x34, 0xf0 ] )
+  assert a == b
+
+def test_nonblocking():
+  a = BitsArray( Bits16, 1024 )
+  a <<= a
+  a[3] <<= 7
+  a[5] <<= 9
+  a[3] <<= 8
+  assert a[3] == 0 and a[5] == 0
+  a._flip()
+  assert a[3] == 8 and a[5] == 9
+  assert not a._pending
+
+def test_clone():
+  a = BitsArray( Bits8, 3, [ 1, 2, 3 ] )
+  b = a.clone()
+  c = copy.deepcopy( a )
+  a[0] @= 4
+  assert b == c == [ 1, 2, 3 ]
+  assert a != b
+
+  b @= a
+  assert b == a
+
+def test_errors():
+  a = BitsArray( Bits8, 4 )
+
+  with pytest.raises( ValueError ):
+    a[0] @= Bits16(1)
+  with pytest.raises( ValueError ):
+    a[0] <<= 0x100
+  with pytest.raises( IndexError ):
+    a[4]
+  with pytest.raises( IndexError ):
+    a[-1]
+  with pytest.raises( TypeError ):
+    BitsArray( int, 4 )
+  with pytest.raises( ValueError ):
+    BitsArray( Bits8, 4, [ 1, 2 ] )
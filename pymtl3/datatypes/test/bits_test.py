@@ -4,11 +4,15 @@
 # Tests for the Bits class.
 # Shunning: grabbed from PyMTL2. Thanks Derek Lockhart
 
+import os
+import subprocess
+import sys
 from copy import deepcopy
 
 import pytest
 
-from ..bits_import import Bits
+from .. import bits_import
+from ..bits_import import Bits, mk_bits
 
 
 def test_return_type():
@@ -760,3 +764,82 @@ def test_bin_oct_hex():
   assert Bits(15,35).bin() == "0b000000000100011"
   assert Bits(15,35).oct() == "0o00043"
   assert Bits(15,35).hex() == "0x0023"
+
+def test_lazy_bits_types():
+  from pymtl3.datatypes import Bits77, b77
+  assert Bits77 is b77 is mk_bits(77) is bits_import.Bits77
+  assert Bits77.nbits == 77
+  assert repr( Bits77(3) ) == 'Bits77(0x00000000000000000003)'
+  assert bits_import.b384 is mk_bits(384)
+  assert 'Bits512' in bits_import.__all__
+
+  with pytest.raises( AttributeError ):
+    bits_import.Bits1000
+  with pytest.raises( AttributeError ):
+    bits_import.Bits0
+  with pytest.raises( ImportError ):
+    from pymtl3 import b1000
+
+def test_lazy_bits_types_import():
+  # Run in a fresh interpreter so that no other test has created Bits255
+  root = os.path.dirname( os.path.dirname( os.path.dirname( bits_import.__file__ ) ) )
+  src = """
+import pymtl3
+from pymtl3.datatypes import bits_import
+assert 255 not in bits_import._bits_types
+from pymtl3 import *
+assert Bits255 is bits_import._bits_types[255]
+"""
+  pythonpath = os.pathsep.join( x for x in [ root, os.environ.get( 'PYTHONPATH' ) ] if x )
+  subprocess.run( [ sys.executable, "-c", src ], check=True,
+                  env=dict( os.environ, PYTHONPATH=pythonpath ) )
+
+def test_fused_inplace():
+  a = Bits( 8, 0xf0 )
+  b = Bits( 8, 0x20 )
+
+  x = Bits( 8, 1 )
+  assert x.iadd( b ) is x
+  assert x == 0x21
+  x.iadd( 0xff )
+  assert x == 0x20
+  x.isub( b )
+  x.isub( 1 )
+  assert x == 0xff
+
+  y = x
+  x.assign_add( a, b )
+  assert y is x and x == 0x10
+  x.assign_sub( 3, b )
+  assert x == 0xe3
+
+  x.assign_field( 4, 8, Bits( 4, 5 ) )
+  assert x == 0x53
+  x.assign_field( 0, 1, 0 )
+  x.assign_field( 1, 3, -1 )
+  assert x == 0x56
+
+  with pytest.raises( ValueError ):
+    x.iadd( Bits( 4, 1 ) )
+  with pytest.raises( ValueError ):
+    x.assign_add( a, 0x100 )
+  with pytest.raises( ValueError ):
+    x.isub( -1 )
+  with pytest.raises( ValueError ):
+    x.assign_field( 4, 8, b )
+  with pytest.raises( ValueError ):
+    x.assign_field( 4, 8, 16 )
+  with pytest.raises( IndexError ):
+    x.assign_field( 4, 9, 0 )
+  assert x == 0x56
+
+  # Two int operands are checked like x @= a + b
+  with pytest.raises( ValueError ):
+    x.assign_add( 200, 100 )
+  with pytest.raises( ValueError ):
+    x.assign_sub( 3, 200 )
+  assert x == 0x56
+  x.assign_add( 200, 55 )
+  assert x == 0xff
+  x.assign_sub( 0, 2 )
+  assert x == 0xfe
@@ -19,6 +19,7 @@ from ..bitstructs import (
     get_bitstruct_inst_all_classes,
     is_bitstruct_class,
     is_bitstruct_inst,
+    is_packed_bitstruct_class,
     mk_bitstruct,
 )
 
@@ -604,3 +605,91 @@ def test_imatmul_ilshift():
   assert c == B(0x1234567890abcd0f,[A(2),A(3),A(4)], A(5) )
   c._flip()
   assert c.to_bits() == Bits164(0xf0dcba09876543210005000400030002)
+
+#-------------------------------------------------------------------------
+# Packed bitstructs
+#-------------------------------------------------------------------------
+
+@bitstruct(packed=True)
+class PackedPoint:
+  x : Bits8
+  y : Bits8
+
+@bitstruct(packed=True)
+class PackedMsg:
+  pt   : PackedPoint
+  data : [ Bits4 ] * 3
+  en   : Bits1
+
+def test_packed_to_from_bits():
+  Msg = mk_bitstruct( "Msg", {
+    'pt'  : Point,
+    'data': [ Bits4 ] * 3,
+    'en'  : Bits1,
+  })
+  assert is_packed_bitstruct_class( PackedMsg )
+  assert not is_packed_bitstruct_class( Msg )
+  assert PackedMsg.nbits == Msg.nbits == 29
+
+  a = PackedMsg( PackedPoint(1,2), [b4(3),b4(4),b4(5)], 1 )
+  b = Msg( Point(1,2), [b4(3),b4(4),b4(5)], 1 )
+  assert a.to_bits() == b.to_bits()
+  assert PackedMsg.from_bits( b.to_bits() ) == a
+  assert a.pt == PackedPoint(1,2)
+  assert a.pt.y == 2
+  assert a.data[2] == 5
+  assert a.clone() == a
+  assert hash( a.clone() ) == hash( a )
+
+def test_packed_field_views():
+  a = PackedMsg( PackedPoint(1,2), [b4(3),b4(4),b4(5)], 0 )
+
+  # Writes through nested fields and list elements update the struct
+  a.pt.x @= 0xff
+  a.data[0] @= 9
+  a.en = Bits1(1)
+  assert a == PackedMsg( PackedPoint(0xff,2), [b4(9),b4(4),b4(5)], 1 )
+
+  # Fields are views: a reference sees later writes to the struct
+  pt = a.pt
+  a @= PackedMsg()
+  assert pt == PackedPoint()
+
+  # Sequential updates are only visible after _flip
+  a <<= PackedMsg( PackedPoint(7,8), [b4(1),b4(2),b4(3)], 1 )
+  assert a == PackedMsg()
+  a._flip()
+  assert a.pt.y == 8
+
+  with pytest.raises( ValueError ):
+    a.pt.x @= Bits16(1)
+
+def test_packed_unpacked_field():
+  with pytest.raises( TypeError ):
+    @bitstruct(packed=True)
+    class Bad:
+      pt : Point
+
+  with pytest.raises( TypeError ):
+    @bitstruct(packed=True)
+    class BadList:
+      pts : [ Point ] * 2
+
+def test_packed_component():
+  class A( Component ):
+    def construct( s ):
+      s.in_ = InPort( PackedMsg )
+      s.out = OutPort( PackedMsg )
+
+      @update
+      def up_packed():
+        s.out @= s.in_
+        s.out.pt.x @= s.in_.pt.y
+        s.out.data[1] @= s.in_.data[0] + 1
+
+  dut = A()
+  dut.elaborate()
+  dut.apply( simple_sim_pass )
+  dut.in_ @= PackedMsg( PackedPoint(1,2), [b4(3),b4(4),b4(5)], 1 )
+  dut.tick()
+  assert dut.out == PackedMsg( PackedPoint(2,2), [b4(3),b4(4),b4(5)], 1 )
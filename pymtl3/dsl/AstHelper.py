@@ -9,7 +9,60 @@ Date   : Jan 17, 2018
 """
 
 import ast
-
+import copy
+
+from .errors import InplaceTargetError
+
+#-------------------------------------------------------------------------
+# Fused in-place Bits operations
+#-------------------------------------------------------------------------
+# A statement like s.x.iadd(y) is the same as s.x @= s.x + y. The DSL and
+# the RTLIR generator turn such a call into the equivalent @= assignment,
+# so it is scheduled and translated like the assignment itself. The
+# receiver must be a signal, i.e. an attribute or an indexed element: a
+# slice like s.x[0:8] is a temporary Bits in simulation.
+
+def _store( node ):
+  ret = copy.copy( node )
+  ret.ctx = ast.Store()
+  return ret
+
+_inplace_methods = {
+  # name         : ( nargs, (target, *args) -> (lhs, rhs) )
+  'iadd'         : ( 1, lambda x, v: ( _store(x), ast.BinOp( x, ast.Add(), v ) ) ),
+  'isub'         : ( 1, lambda x, v: ( _store(x), ast.BinOp( x, ast.Sub(), v ) ) ),
+  'assign_add'   : ( 2, lambda x, a, b: ( _store(x), ast.BinOp( a, ast.Add(), b ) ) ),
+  'assign_sub'   : ( 2, lambda x, a, b: ( _store(x), ast.BinOp( a, ast.Sub(), b ) ) ),
+  'assign_field' : ( 3, lambda x, lo, hi, v: ( ast.Subscript( x, ast.Slice( lo, hi, None ), ast.Store() ), v ) ),
+}
+
+def _is_inplace_target( node ):
+  while isinstance( node, ast.Subscript ) and not isinstance( node.slice, ast.Slice ):
+    node = node.value
+  return isinstance( node, ast.Attribute )
+
+def get_inplace_assign( node, hostobj, blk ):
+  """Return the @= assignment performed by a statement that calls a fused
+  in-place Bits method, or None if node is not such a statement. Raise
+  InplaceTargetError if the receiver of the call is not a signal."""
+  if not isinstance( node, ast.Expr ):
+    return None
+
+  call = node.value
+  if not isinstance( call, ast.Call ) or not isinstance( call.func, ast.Attribute ) or \
+     call.func.attr not in _inplace_methods or call.keywords:
+    return None
+
+  nargs, mk_assign = _inplace_methods[ call.func.attr ]
+  if len(call.args) != nargs or any( isinstance( x, ast.Starred ) for x in call.args ):
+    return None
+
+  if not _is_inplace_target( call.func.value ):
+    raise InplaceTargetError( hostobj, blk, call.func.attr, node.lineno )
+
+  target, value = mk_assign( call.func.value, *call.args )
+  ret = ast.AugAssign( target=target, op=ast.MatMult(), value=value )
+  return ast.fix_missing_locations( ast.copy_location( ret, node ) )
 
 class DetectVarNames( ast.NodeVisitor ):
 
@@ -163,6 +216,13 @@ class DetectReadsWritesCalls( DetectVarNames ):
 
     self.visit( node.slice )
 
+  def visit_Expr( self, node ): # s.x.iadd(y) writes s.x with @=
+    assign = get_inplace_assign( node, self.obj, self.upblk )
+    if assign is None:
+      self.generic_visit( node )
+    else:
+      self.visit( assign )
+
   def visit_Call( self, node ):
     obj_name, nodelist = self._get_full_name( node.func )
     if not obj_name:  return
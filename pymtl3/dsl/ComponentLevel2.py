@@ -19,10 +19,11 @@ import re
 from collections import defaultdict
 
 from pymtl3.datatypes import Bits, is_bitstruct_class
+from pymtl3.extra.disk_cache import get_disk_cache
 
 from . import AstHelper
 from .ComponentLevel1 import ComponentLevel1
-from .Connectable import Connectable, Const, InPort, Interface, OutPort, Signal, Wire
+from .Connectable import Connectable, Const, InPort, Interface, MemArray, OutPort, Signal, Wire
 from .ConstraintTypes import RD, WR, U, ValueConstraint
 from .errors import (
     InvalidConstraintError,
@@ -100,6 +101,25 @@ class ComponentLevel2( ComponentLevel1 ):
       AstHelper.extract_reads_writes_calls( s, func, _ast, _rd, _wr, _fc )
 
     elif name not in name_info:
+      # The parsed source and the extracted names only depend on the
+      # source file, on which names are globals/closure variables, and on
+      # the AstHelper that extracts them, so they can be persisted across
+      # runs if the disk cache is enabled.
+      cache = get_disk_cache()
+      if cache is not None:
+        code   = func.__code__
+        digest = cache.file_digest( code.co_filename )
+        helper_digest = cache.file_digest( AstHelper.__file__ )
+        if digest is not None and helper_digest is not None:
+          key = cache.key( 'upblk', digest, helper_digest,
+                           code.co_filename, code.co_firstlineno,
+                           func.__qualname__, code.co_freevars,
+                           sorted( func.__globals__ ) )
+          cached = cache.load( 'upblk', key )
+          if cached is not None:
+            name_info[ name ], name_rd[ name ], name_wr[ name ], name_fc[ name ] = cached
+            return
+
       _src, _line = inspect.getsourcelines( func )
       _src = "".join( _src )
       _ast = ast.parse( compiled_re.sub( r'\2', _src ) )
@@ -110,6 +130,160 @@ class ComponentLevel2( ComponentLevel1 ):
       name_fc[ name ]   = _fc   = []
       AstHelper.extract_reads_writes_calls( s, func, _ast, _rd, _wr, _fc )
 
+      if cache is not None and digest is not None and helper_digest is not None:
+        cache.store( 'upblk', key, ( name_info[ name ], _rd, _wr, _fc ) )
+
+  #-----------------------------------------------------------------------
+  # Memoization of read/write resolution
+  #-----------------------------------------------------------------------
+  # Instances with the same class and construction arguments usually
+  # read and write the same objects relative to themselves. The first
+  # instance records the objects it resolved as paths of attribute names
+  # and indices, and the others rebind these paths instead of resolving
+  # all names again. An instance falls back to full resolution if its
+  # functions capture different closure values or a path cannot be
+  # rebound.
+
+  def _rw_template_key( s ):
+    sd = s._dsl
+    if sd.param_tree is not None:
+      return None
+    key = ( s.__class__, sd.args, tuple( sorted( sd.kwargs.items() ) ) )
+    try:
+      hash( key )
+    except TypeError:
+      return None
+    return key
+
+  def _rw_path( s, obj ):
+    steps = []
+    while obj is not s:
+      od = obj._dsl
+      sl = getattr( od, 'slice', None )
+      if sl is not None:
+        steps.append( sl )
+      else:
+        if od._my_indices:
+          steps.extend( reversed( od._my_indices ) )
+        steps.append( od._my_name )
+      obj = od.parent_obj
+    steps.reverse()
+    return tuple( steps )
+
+  def _rw_rebind( s, steps ):
+    obj = s
+    for x in steps:
+      obj = getattr( obj, x ) if x.__class__ is str else obj[ x ]
+    return obj
+
+  def _make_rw_template( s ):
+    sd = s._dsl
+    func_name = { func: name for name, func in sd.name_func.items() }
+
+    def to_paths( objs ):
+      ret = []
+      for obj in objs:
+        if isinstance( obj, NamedObject ):
+          ret.append( s._rw_path( obj ) )
+        else: # A function called in the update block
+          ret.append( func_name[ obj ] )
+      return ret
+
+    try:
+      funcs = {}
+      for name, func in sd.name_func.items():
+        funcs[ name ] = ( to_paths( sd.func_reads[ func ] ),
+                          to_paths( sd.func_writes[ func ] ),
+                          to_paths( sd.func_calls[ func ] ) )
+      upblks = {}
+      for name, blk in sd.name_upblk.items():
+        upblks[ name ] = ( blk in sd.update_ff,
+                           to_paths( sd.upblk_reads[ blk ] ),
+                           to_paths( sd.upblk_writes[ blk ] ),
+                           to_paths( sd.upblk_calls[ blk ] ) )
+    except ( AttributeError, KeyError ):
+      # Some objects are not under this component
+      return None
+    return s, funcs, upblks
+
+  def _same_closure( s, tpl, func, tpl_func ):
+    if func.__code__ is not tpl_func.__code__:
+      return False
+    if func.__closure__ is None:
+      return tpl_func.__closure__ is None
+
+    tpl_funcs = tpl._dsl.name_func
+    for x, y in zip( func.__closure__, tpl_func.__closure__ ):
+      try:
+        a, b = x.cell_contents, y.cell_contents
+      except ValueError: # empty cell
+        continue
+      if a is b:
+        continue
+      if b is tpl:
+        if a is not s:
+          return False
+      elif a.__class__ is not b.__class__:
+        return False
+      elif isinstance( b, (int, str, float, Bits) ):
+        if not a == b:
+          return False
+      elif callable( b ) and tpl_funcs.get( getattr( b, '__name__', None ) ) is b:
+        if s._dsl.name_func.get( b.__name__ ) is not a:
+          return False
+      else:
+        return False
+    return True
+
+  def _stamp_read_write_func( s, template ):
+    tpl, funcs, upblks = template
+    sd  = s._dsl
+    tpd = tpl._dsl
+
+    if funcs.keys() != sd.name_func.keys() or upblks.keys() != sd.name_upblk.keys():
+      return False
+    for name, func in sd.name_func.items():
+      if not s._same_closure( tpl, func, tpd.name_func[ name ] ):
+        return False
+    for name, blk in sd.name_upblk.items():
+      if not s._same_closure( tpl, blk, tpd.name_upblk[ name ] ) or \
+         ( blk in sd.update_ff ) != upblks[ name ][0]:
+        return False
+
+    def rebind( paths ):
+      return { sd.name_func[ x ] if x.__class__ is str else s._rw_rebind( x )
+               for x in paths }
+
+    try:
+      func_reads  = {}
+      func_writes = {}
+      func_calls  = {}
+      for name, func in sd.name_func.items():
+        rd, wr, fc = funcs[ name ]
+        func_reads [ func ] = rebind( rd )
+        func_writes[ func ] = rebind( wr )
+        func_calls [ func ] = rebind( fc )
+
+      upblk_reads  = {}
+      upblk_writes = {}
+      upblk_calls  = {}
+      for name, blk in sd.name_upblk.items():
+        is_ff, rd, wr, fc = upblks[ name ]
+        upblk_reads [ blk ] = rebind( rd )
+        upblk_writes[ blk ] = rebind( wr )
+        upblk_calls [ blk ] = rebind( fc )
+    except ( AttributeError, IndexError, KeyError, TypeError, AssertionError ):
+      return False
+
+    for blk, objs in upblk_writes.items():
+      if blk in sd.update_ff:
+        for x in objs:
+          x._dsl.needs_double_buffer = True
+
+    sd.func_reads,  sd.func_writes,  sd.func_calls  = func_reads,  func_writes,  func_calls
+    sd.upblk_reads, sd.upblk_writes, sd.upblk_calls = upblk_reads, upblk_writes, upblk_calls
+    return True
+
   def _elaborate_read_write_func( s ):
 
     # We have parsed AST to extract every read/write variable name.
@@ -125,6 +299,11 @@ class ComponentLevel2( ComponentLevel1 ):
           lookup_variable( obj, name_depth+1, node_depth+1 )
           return
 
+        # Any element of a MemArray is the MemArray itself
+        if isinstance( obj, MemArray ):
+          objs.add( obj )
+          return
+
         current_idx = idx[ idx_depth ]
 
         if current_idx == "*": # special case, materialize all objects
@@ -280,6 +459,19 @@ class ComponentLevel2( ComponentLevel1 ):
 
     """ elaborate_read_write_func """
 
+    # Reuse the resolution of an identical instance
+    key = s._rw_template_key()
+    if key is not None:
+      top_d = s._dsl.elaborate_top._dsl
+      try:
+        templates = top_d.rw_templates
+      except AttributeError:
+        templates = top_d.rw_templates = {}
+
+      template = templates.get( key )
+      if template is not None and s._stamp_read_write_func( template ):
+        return
+
     # Access cached data in this component
 
     cls = s.__class__
@@ -307,6 +499,9 @@ class ComponentLevel2( ComponentLevel1 ):
                                     update_ff = blk in s._dsl.update_ff, is_write=True )
       s._dsl.upblk_calls [ blk ] = extract_obj_from_names( blk, name_fc[ name ] )
 
+    if key is not None and key not in templates:
+      templates[ key ] = s._make_rw_template()
+
   # Override
   def _collect_vars( s, m ):
     super()._collect_vars( m )
@@ -15,7 +15,7 @@ Date   : Jan 29, 2020
 import ast
 import inspect
 import linecache
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from pymtl3.datatypes import Bits, is_bitstruct_inst
 from pymtl3.extra.pypy import custom_exec
@@ -27,6 +27,7 @@ from .Connectable import (
     Const,
     InPort,
     Interface,
+    MemArray,
     OutPort,
     Signal,
     Wire,
@@ -207,6 +208,9 @@ class ComponentLevel3( ComponentLevel2 ):
     return blk
 
   def _connect_signal_const( s, o1, o2 ):
+    if isinstance( o1, MemArray ):
+      raise InvalidConnectionError( f"MemArray {o1} cannot be connected to a constant.\n"
+                                    f"Suggestion: access the elements of {o1} in update blocks instead." )
     Type = o1._dsl.Type
     if isinstance( o2, int ):
       if not issubclass( Type, (int, Bits) ):
@@ -252,6 +256,11 @@ class ComponentLevel3( ComponentLevel2 ):
     s._dsl.connect_order.append( (o1, o2) )
 
   def _connect_signal_signal( s, o1, o2 ):
+    if isinstance( o1, MemArray ) or isinstance( o2, MemArray ):
+      raise InvalidConnectionError( f"MemArray cannot be connected to other signals\n"
+                                    f"- In class {type(s)}\n- When connecting {o1} <-> {o2}\n"
+                                    f"Suggestion: access the elements of the MemArray in update blocks instead." )
+
     if not (o1._dsl.Type is o2._dsl.Type):
       raise InvalidConnectionError( f"Bitwidth mismatch {o1._dsl.Type.__name__} != {o2._dsl.Type.__name__}\n"
                                     f"- In class {type(s)}\n- When connecting {o1} <-> {o2}\n"
@@ -344,36 +353,61 @@ class ComponentLevel3( ComponentLevel2 ):
 
   @staticmethod
   def _floodfill_nets( signal_list, adjacency ):
-    """ Floodfill to find out connected nets. Return a list of sets. """
-
-    nets = []
-    visited = set()
-    pred    = {} # detect cycle that has >=3 nodes
-    for obj in signal_list:
-      # If obj has adjacent signals
-      if obj in adjacency and obj not in visited:
-        net = set()
-        Q   = [ obj ]
-        while Q:
-          u = Q.pop()
-          visited.add( u )
-          net.add( u )
-          for v in adjacency[u]:
-            if v not in visited:
-              pred[v] = u
-              Q.append( v )
-            elif v is not pred[u]:
-              raise InvalidConnectionError(repr(v)+" is in a connection loop.")
-        if len(net) == 1:
+    """ Find out the connected nets of the signals in signal_list with
+    union-find. Return a list of sets. """
+
+    parent = {}
+    size   = {}
+
+    def find( x ):
+      root = x
+      while parent[root] is not root:
+        root = parent[root]
+      # Path compression
+      while parent[x] is not root:
+        parent[x], x = root, parent[x]
+      return root
+
+    done = set()
+    for u in signal_list:
+      if u not in adjacency:
+        continue
+      if u not in parent:
+        parent[u] = u
+        size[u]   = 1
+
+      for v in adjacency[u]:
+        if v in done: # already merged from the other end
           continue
-        nets.append( net )
-    return nets
+        if v not in parent:
+          parent[v] = v
+          size[v]   = 1
+
+        ru, rv = find( u ), find( v )
+        # An edge between two signals that are already connected closes
+        # a loop
+        if ru is rv:
+          raise InvalidConnectionError(repr(v)+" is in a connection loop.")
+        if size[ru] < size[rv]:
+          ru, rv = rv, ru
+        parent[rv] = ru
+        size[ru]  += size[rv]
+      done.add( u )
+
+    nets = {}
+    for x in parent:
+      root = find( x )
+      if size[root] > 1:
+        if root not in nets:
+          nets[root] = set()
+        nets[root].add( x )
+    return list(nets.values())
 
   def _resolve_value_connections( s ):
     """ The case of nested data struct: the writer of a net can be one of
     the three: signal itself (s.x.a), ancestor (s.x), descendant (s.x.b)
 
-    An iterative algorithm is required to mark the writers. The example
+    A worklist algorithm is required to mark the writers. The example
     is the following. Net 1's writer is s.x and one reader is s.y.
     Net 2's writer is s.y.a (known ONLY after Net 1's writer is clear),
     one reader is s.z. Net 3's writer is s.z.a (known ...), and so forth
@@ -392,7 +426,7 @@ class ComponentLevel3( ComponentLevel2 ):
     may _intersect_, so they need to check sibling slices' write/read
     status as well. """
 
-    # First of all, bfs the "forest" to find out all nets
+    # First of all, union-find the "forest" to find out all nets
 
     nets = s._floodfill_nets( s._dsl.all_signals, s._dsl.all_adjacency )
 
@@ -423,16 +457,38 @@ class ComponentLevel3( ComponentLevel2 ):
            ( isinstance( member, OutPort ) and isinstance( host, Placeholder ) ):
           writer_prop[ member ] = True
 
-    headless = nets
-    headed   = []
+    # Index the nets so that a new writer only revisits the nets it can
+    # affect: the net of the signal itself, the nets of its descendants,
+    # and the nets of its sibling slices.
+
+    net_id      = {}
+    nets_under  = defaultdict(list)
+    nets_sliced = defaultdict(list)
+
+    for i, net in enumerate( nets ):
+      for v in net:
+        net_id[ v ] = i
+        if isinstance( v, Signal ):
+          obj = v.get_parent_object()
+          if v._dsl.slice is not None:
+            nets_sliced[ obj ].append( i )
+          while obj.is_signal():
+            nets_under[ obj ].append( i )
+            obj = obj.get_parent_object()
 
     # Convention: we store a net in a tuple ( writer, set([readers]) )
     # The first element is writer; it should be None if there is no
     # writer. The second element is a set of signals including the writer.
 
-    while headless:
-      new_headless = []
-      wcount = len(writer_prop)
+    headed   = []
+    resolved = [ False ] * len(nets)
+    queued   = [ True ] * len(nets)
+    worklist = deque( range(len(nets)) )
+
+    while worklist:
+      i = worklist.popleft()
+      queued[i] = False
+      net = nets[i]
 
       # For each net, figure out the writer among all vars and their
       # ancestors. Moreover, if x's ancestor has a writer in another net,
@@ -448,73 +504,83 @@ class ComponentLevel3( ComponentLevel2 ):
       # be a unpropagatable writer because we don't want x[5:15] to
       # propagate to x[12:17] later.
 
-      for net in headless:
-        has_writer = False
+      has_writer = False
 
-        for v in net:
-          obj = None
-          try:
-            # Check if itself is a writer or a constant
-            if v in writer_prop or isinstance( v, Const ):
-              assert not has_writer
-              has_writer, writer = True, v
-
-            else:
-              # Check if an ancestor is a propagatable writer
-              obj = v.get_parent_object()
-              while obj.is_signal():
-                if obj in writer_prop and writer_prop[ obj ]:
-                  assert not has_writer
-                  has_writer, writer = True, v
-                  break
-                obj = obj.get_parent_object()
-
-              # Check sibling slices
-              for obj in v.get_sibling_slices():
-                if obj.slice_overlap( v ):
-                  if obj in writer_prop and writer_prop[ obj ]:
-                    assert not has_writer
-                    has_writer, writer = True, v
-                    # Shunning: is breaking out of here enough? If we
-                    # don't break the loop, we might a list here storing
-                    # "why the writer became writer" and do some sibling
-                    # overlap checks when we enter the loop body later
-                    break
-
-          except AssertionError:
-            raise MultiWriterError( \
-            "Two-writer conflict \"{}\"{}, \"{}\" in the following net:\n - {}".format(
-              repr(v), "" if not obj else "(as \"{}\" is written somewhere else)".format( repr(obj) ),
-              repr(writer), "\n - ".join([repr(x) for x in net])) )
-
-        if not has_writer:
-          new_headless.append( net )
-          continue
-
-        # Child s.x.y of some propagatable s.x, or sibling of some
-        # propagatable s[a:b].
-        # This means that at least other variables are able to see s.x/s[a:b]
-        # so it doesn't matter if s.x.y is not in writer_prop
-        if writer not in writer_prop:
-          pass
-
-        for v in net:
-          if v != writer:
-            writer_prop[ v ] = True # The reader becomes new writer
+      for v in net:
+        obj = None
+        try:
+          # Check if itself is a writer or a constant
+          if v in writer_prop or isinstance( v, Const ):
+            assert not has_writer
+            has_writer, writer = True, v
 
+          else:
+            # Check if an ancestor is a propagatable writer
             obj = v.get_parent_object()
             while obj.is_signal():
-              if obj not in writer_prop:
-                writer_prop[ obj ] = False
+              if obj in writer_prop and writer_prop[ obj ]:
+                assert not has_writer
+                has_writer, writer = True, v
+                break
               obj = obj.get_parent_object()
 
-        headed.append( (writer, net) )
-
-      if wcount == len(writer_prop): # no more new writers
-        break
-      headless = new_headless
+            # Check sibling slices
+            for obj in v.get_sibling_slices():
+              if obj.slice_overlap( v ):
+                if obj in writer_prop and writer_prop[ obj ]:
+                  assert not has_writer
+                  has_writer, writer = True, v
+                  # Shunning: is breaking out of here enough? If we
+                  # don't break the loop, we might a list here storing
+                  # "why the writer became writer" and do some sibling
+                  # overlap checks when we enter the loop body later
+                  break
 
-    return headed + [ (None, x) for x in headless ]
+        except AssertionError:
+          raise MultiWriterError( \
+          "Two-writer conflict \"{}\"{}, \"{}\" in the following net:\n - {}".format(
+            repr(v), "" if not obj else "(as \"{}\" is written somewhere else)".format( repr(obj) ),
+            repr(writer), "\n - ".join([repr(x) for x in net])) )
+
+      if not has_writer:
+        continue
+
+      resolved[i] = True
+      headed.append( (writer, net) )
+
+      # Child s.x.y of some propagatable s.x, or sibling of some
+      # propagatable s[a:b].
+      # This means that at least other variables are able to see s.x/s[a:b]
+      # so it doesn't matter if s.x.y is not in writer_prop
+
+      new_writers = []
+      for v in net:
+        if v != writer:
+          writer_prop[ v ] = True # The reader becomes new writer
+          new_writers.append( v )
+
+          obj = v.get_parent_object()
+          while obj.is_signal():
+            if obj not in writer_prop:
+              writer_prop[ obj ] = False
+              new_writers.append( obj )
+            obj = obj.get_parent_object()
+
+      for x in new_writers:
+        affected = []
+        if x in net_id:
+          affected.append( net_id[ x ] )
+        if writer_prop[ x ]:
+          affected.extend( nets_under.get( x, () ) )
+          if isinstance( x, Signal ) and x._dsl.slice is not None:
+            affected.extend( nets_sliced.get( x.get_parent_object(), () ) )
+
+        for j in affected:
+          if not resolved[j] and not queued[j]:
+            queued[j] = True
+            worklist.append( j )
+
+    return headed + [ (None, net) for i, net in enumerate( nets ) if not resolved[i] ]
 
   def _check_port_in_nets( s ):
     nets = s._dsl.all_value_nets
@@ -10,7 +10,7 @@ Date   : Apr 16, 2018
 import types
 from collections import deque
 
-from pymtl3.datatypes import Bits, Bits1, is_bitstruct_class, mk_bits
+from pymtl3.datatypes import Bits, Bits1, BitsArray, is_bitstruct_class, mk_bits
 
 from .errors import InvalidConnectionError
 from .NamedObject import DSLMetadata, NamedObject
@@ -366,6 +366,40 @@ class OutPort( Signal ):
   def is_output_value_port( s ):
     return True
 
+# MemArray is an array of nelems Bits elements, e.g., a register file or
+# an SRAM, that is a single signal for elaboration, scheduling and
+# dependency analysis. Any access to an element in an update block is an
+# access to the whole array. A MemArray cannot be connected; its elements
+# can only be accessed in update blocks. During simulation it is backed by
+# a BitsArray, and it is translated to an unpacked array.
+
+class MemArray( Wire ):
+  def __init__( s, Type, nelems ):
+    if isinstance( Type, int ):
+      Type = mk_bits(Type)
+    else:
+      assert isinstance( Type, type ) and issubclass( Type, Bits ), \
+              f"MemArray can only have elements of Bits type, not {Type}.\n" \
+              f"Note: an integer is also accepted: MemArray(32, n) is equivalent to MemArray(Bits32, n)"
+    assert isinstance( nelems, int ) and nelems >= 1, \
+            f"MemArray needs a positive integer number of elements, not {nelems}."
+
+    super().__init__( Type )
+    s._dsl.nelems = nelems
+
+  def inverse( s ):
+    return MemArray( s._dsl.Type, s._dsl.nelems )
+
+  def __getitem__( s, idx ):
+    raise InvalidConnectionError( "We don't allow connecting or slicing the elements of a MemArray.\n"
+                                  "Suggestion: access the elements in an update block instead." )
+
+  def get_nelems( s ):
+    return s._dsl.nelems
+
+  def default_value( s ):
+    return BitsArray( s._dsl.Type, s._dsl.nelems )
+
 class Interface( NamedObject, Connectable ):
 
   def inverse( s ):
@@ -24,6 +24,7 @@ from .Connectable import (
     Const,
     InPort,
     Interface,
+    MemArray,
     MethodPort,
     NonBlockingIfc,
     OutPort,
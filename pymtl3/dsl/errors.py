@@ -137,6 +137,33 @@ In file {}:{} in {}
       )
     )
 
+class InplaceTargetError( Exception ):
+  """ In update, raise when a fused in-place Bits method is not called on a signal """
+  def __init__( self, hostobj, blk, method, lineno ):
+    filepath = inspect.getfile( hostobj.__class__ )
+    blk_src, base_lineno  = inspect.getsourcelines( blk )
+
+    # Shunning: we need to subtract 1 from inspect's lineno when we add it
+    # to base_lineno because it starts from 1!
+    lineno -= 1
+    error_lineno = base_lineno + lineno
+
+    return super().__init__( \
+"""
+In file {}:{} in {}
+
+{} {}
+^^^ {}() can only be called on a signal or an element of a signal list, not on a slice
+    or another temporary value, because the result would be dropped in simulation
+(when constructing instance {} of class \"{}\" in the hierarchy)
+
+Suggestion: Line {} use an '@=' assignment (or assign_field for a slice) instead""".format( \
+      filepath, error_lineno, blk.__name__,
+      error_lineno, blk_src[ lineno ].lstrip(''), method,
+      repr(hostobj), hostobj.__class__.__name__,
+      error_lineno )
+    )
+
 class VarNotDeclaredError( Exception ):
   """ Raise when a variable in an update block is not declared """
   def __init__( self, obj, field, blk=None, blk_hostobj=None, lineno=0 ):
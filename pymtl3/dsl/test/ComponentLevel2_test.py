@@ -14,6 +14,7 @@ from pymtl3.dsl.ComponentLevel2 import ComponentLevel2, update_ff
 from pymtl3.dsl.Connectable import InPort, Interface, OutPort, Wire
 from pymtl3.dsl.ConstraintTypes import RD, WR, U
 from pymtl3.dsl.errors import (
+    InplaceTargetError,
     InvalidConstraintError,
     InvalidFuncCallError,
     MultiWriterError,
@@ -778,3 +779,118 @@ def test_write_interface_update_ff():
     print("{} is thrown\n{}".format( e.__class__.__name__, e ))
     return
   raise Exception("Should've thrown WriteNonSignalError.")
+
+def test_identical_instances_rebind_reads_writes():
+
+  offsets = [ 0, 0, 1 ]
+
+  class Tile(ComponentLevel2):
+    def construct( s ):
+      s.x = [ Wire(Bits16) for _ in range(4) ]
+      s.y = Wire(Bits16)
+      s.z = Wire(Bits16)
+      # The last tile captures a different closure value
+      k = offsets.pop(0)
+
+      @update
+      def up_y():
+        s.y @= s.x[k] + s.x[2][0:8]
+
+      @update_ff
+      def up_z():
+        s.z <<= s.y
+
+  class Top(ComponentLevel2):
+    def construct( s ):
+      s.tiles = [ Tile() for _ in range(3) ]
+
+  top = Top()
+  top.elaborate()
+
+  for i, t in enumerate( top.tiles ):
+    reads  = top._dsl.all_upblk_reads [ t._dsl.name_upblk['up_y'] ]
+    writes = top._dsl.all_upblk_writes[ t._dsl.name_upblk['up_z'] ]
+    k = 1 if i == 2 else 0
+    assert set(reads) == { t.x[k], t.x[2][0:8] }
+    assert set(writes) == { t.z }
+    assert t.z._dsl.needs_double_buffer
+
+def test_fused_inplace_reads_writes():
+
+  class Top(ComponentLevel2):
+    def construct( s ):
+      s.in0 = InPort(Bits16)
+      s.in1 = InPort(Bits16)
+      s.x   = Wire(Bits16)
+      s.y   = Wire(Bits16)
+      s.out = OutPort(Bits16)
+
+      @update
+      def up_out():
+        s.out @= s.y
+        s.out.assign_field( 12, 16, s.in1[0:4] )
+
+      @update
+      def up_y():
+        s.y @= s.in1
+        s.y.iadd( s.x )
+
+      @update
+      def up_x():
+        s.x.assign_add( s.in0, s.in1 )
+
+  A = Top()
+  A.elaborate()
+
+  reads  = A._dsl.all_upblk_reads
+  writes = A._dsl.all_upblk_writes
+  up_out, up_y, up_x = [ A._dsl.name_upblk[x] for x in [ 'up_out', 'up_y', 'up_x' ] ]
+  assert set(writes[up_x]) == { A.x }
+  assert set(reads[up_x])  == { A.in0, A.in1 }
+  assert set(writes[up_y]) == { A.y }
+  assert set(reads[up_y])  == { A.in1, A.x, A.y }
+  assert set(writes[up_out]) == { A.out, A.out[12:16] }
+
+  # The fused writes order the blocks like @= does
+  simple_sim_pass( A, 0x123 )
+  A.in0 @= 0x0102
+  A.in1 @= 0x0a04
+  A.tick()
+  assert A.x == 0x0b06
+  assert A.out == 0x450a
+
+def test_fused_inplace_update_ff():
+
+  class Top(ComponentLevel2):
+    def construct( s ):
+      s.wire0 = Wire(Bits32)
+
+      @update_ff
+      def up_ff():
+        s.wire0.iadd( 1 )
+
+  try:
+    _test_model( Top )
+  except UpdateFFBlockWriteError as e:
+    print("{} is thrown\n{}".format( e.__class__.__name__, e ))
+    return
+  raise Exception("Should've thrown UpdateFFBlockWriteError.")
+
+def test_fused_inplace_slice_target():
+
+  class Top(ComponentLevel2):
+    def construct( s ):
+      s.in_ = InPort(Bits16)
+      s.out = OutPort(Bits16)
+
+      @update
+      def up_out():
+        s.out @= 0
+        s.out[0:8].iadd( s.in_[0:8] )
+
+  try:
+    _test_model( Top )
+  except InplaceTargetError as e:
+    print("{} is thrown\n{}".format( e.__class__.__name__, e ))
+    return
+  raise Exception("Should've thrown InplaceTargetError.")
@@ -1028,3 +1028,55 @@ def test_slice_over_slice():
   a = A()
   a.elaborate()
   assert str(a._dsl.connect_order) == "[(s.out, s.in_[20:28])]"
+
+def test_connection_loop():
+  class A( ComponentLevel3 ):
+    def construct( s ):
+      s.x = Wire( Bits8 )
+      s.y = Wire( Bits8 )
+      s.z = Wire( Bits8 )
+      connect( s.x, s.y )
+      connect( s.y, s.z )
+      connect( s.z, s.x )
+  a = A()
+  try:
+    a.elaborate()
+  except InvalidConnectionError as e:
+    assert "connection loop" in str(e)
+    return
+  raise Exception("Should've thrown InvalidConnectionError")
+
+def test_struct_field_forwarding_chain():
+
+  @bitstruct
+  class SomeMsg:
+    a: Bits8
+    b: Bits32
+
+  class Stage( ComponentLevel3 ):
+    def construct( s ):
+      s.in_ = InPort( SomeMsg )
+      s.out = OutPort( SomeMsg )
+      connect( s.out.a, s.in_.a )
+      connect( s.out.b, s.in_.b )
+
+  class Top( ComponentLevel3 ):
+    def construct( s ):
+      s.in_ = InPort( SomeMsg )
+      s.out = OutPort( SomeMsg )
+      s.stages = [ Stage() for _ in range(50) ]
+      connect( s.stages[0].in_, s.in_ )
+      for i in range(1, 50):
+        connect( s.stages[i].in_, s.stages[i-1].out )
+      connect( s.out, s.stages[-1].out )
+
+  a = Top()
+  a.elaborate()
+
+  # Every net gets its writer from the net before it
+  nets = a._dsl.all_value_nets
+  assert all( writer is not None for writer, _ in nets )
+  writers = { x: writer for writer, net in nets for x in net }
+  assert writers[ a.out ] is a.stages[-1].out
+  assert writers[ a.stages[-1].out.b ] is a.stages[-1].in_.b
+  assert writers[ a.stages[0].in_ ] is a.in_
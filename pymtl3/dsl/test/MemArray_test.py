@@ -0,0 +1,75 @@
+"""
+========================================================================
+MemArray_test.py
+========================================================================
+Test the elaboration of MemArray signals.
+"""
+import pytest
+
+from pymtl3.datatypes import Bits32
+from pymtl3.dsl.Component import Component
+from pymtl3.dsl.ComponentLevel1 import update
+from pymtl3.dsl.Connectable import MemArray, OutPort
+from pymtl3.dsl.errors import InvalidConnectionError
+from pymtl3.passes.testcases import CaseMemArrayRegFileComp
+
+
+def test_mem_array_single_signal():
+  a = CaseMemArrayRegFileComp.DUT()
+  a.elaborate()
+
+  # The 8 registers are a single signal besides clk, reset and ports
+  assert len(a._dsl.all_signals) == 8
+  assert a.regs.get_nelems() == 8
+  assert a.regs._dsl.needs_double_buffer
+
+  upblk = a._dsl.name_upblk['upblk']
+  assert a.regs in a._dsl.all_upblk_reads [ upblk ]
+  assert a.regs in a._dsl.all_upblk_writes[ upblk ]
+
+def test_mem_array_constant_index():
+
+  class Top( Component ):
+    def construct( s ):
+      s.out  = OutPort( Bits32 )
+      s.regs = MemArray( Bits32, 4 )
+      @update
+      def up_zero():
+        s.out @= s.regs[0]
+
+  a = Top()
+  a.elaborate()
+
+  # A constant index also accesses the whole array
+  assert a.regs in a._dsl.all_upblk_reads[ a._dsl.name_upblk['up_zero'] ]
+
+def test_mem_array_connect():
+
+  class Top( Component ):
+    def construct( s ):
+      s.out  = OutPort( Bits32 )
+      s.regs = MemArray( Bits32, 4 )
+      s.out //= s.regs
+
+  with pytest.raises( InvalidConnectionError ):
+    Top().elaborate()
+
+def test_mem_array_connect_element():
+
+  class Top( Component ):
+    def construct( s ):
+      s.out  = OutPort( Bits32 )
+      s.regs = MemArray( Bits32, 4 )
+      s.out //= s.regs[0]
+
+  with pytest.raises( InvalidConnectionError ):
+    Top().elaborate()
+
+def test_mem_array_invalid_type():
+
+  class Top( Component ):
+    def construct( s ):
+      s.regs = MemArray( [ Bits32 ], 4 )
+
+  with pytest.raises( AssertionError ):
+    Top().elaborate()
@@ -0,0 +1,111 @@
+#=========================================================================
+# disk_cache.py
+#=========================================================================
+# A content-addressed on-disk cache for data that is recomputed every
+# time a design is elaborated and simulated: parsed update block sources
+# with their read/write sets, and the code objects of generated blocks.
+#
+# The cache is disabled by default. Set PYMTL_CACHE_DIR to a directory,
+# or call enable_disk_cache( path ), to turn it on. Every entry is keyed
+# by a hash of everything it is derived from, so stale entries are never
+# hit and the directory can be deleted at any time.
+
+import marshal
+import os
+import pickle
+import sys
+import types
+from hashlib import blake2b
+
+# Code objects are only valid for the interpreter that generated them
+_MAGIC = f"{sys.implementation.cache_tag}-{sys.version}"
+
+class DiskCache:
+
+  def __init__( s, path ):
+    s.path = os.path.abspath( os.path.expanduser( path ) )
+    s.file_digests = {}
+    s.hits   = 0
+    s.misses = 0
+
+  @staticmethod
+  def key( *parts ):
+    h = blake2b( _MAGIC.encode(), digest_size=20 )
+    for x in parts:
+      if not isinstance( x, bytes ):
+        x = str(x).encode()
+      h.update( len(x).to_bytes( 8, 'little' ) )
+      h.update( x )
+    return h.hexdigest()
+
+  def file_digest( s, filename ):
+    """Return the digest of a source file's contents, None if unreadable."""
+    try:
+      return s.file_digests[ filename ]
+    except KeyError:
+      try:
+        with open( filename, 'rb' ) as fd:
+          ret = blake2b( fd.read(), digest_size=20 ).hexdigest()
+      except OSError:
+        ret = None
+      s.file_digests[ filename ] = ret
+      return ret
+
+  def _entry_path( s, kind, key ):
+    return os.path.join( s.path, kind, key[:2], key )
+
+  def load( s, kind, key, loads=pickle.loads ):
+    try:
+      with open( s._entry_path( kind, key ), 'rb' ) as fd:
+        ret = loads( fd.read() )
+    except Exception:
+      # Missing, truncated, or from an incompatible version; treat all of
+      # them as a miss and let the caller regenerate the entry
+      s.misses += 1
+      return None
+    s.hits += 1
+    return ret
+
+  def store( s, kind, key, obj, dumps=pickle.dumps ):
+    path = s._entry_path( kind, key )
+    try:
+      data = dumps( obj )
+      os.makedirs( os.path.dirname( path ), exist_ok=True )
+      # Write to a private file first so that concurrent runs never see
+      # a partially written entry
+      tmp = f"{path}.{os.getpid()}.tmp"
+      with open( tmp, 'wb' ) as fd:
+        fd.write( data )
+      os.replace( tmp, path )
+    except Exception:
+      pass
+
+  def compile( s, src, filename, mode ):
+    key  = s.key( 'code', filename, mode, src )
+    code = s.load( 'code', key, marshal.loads )
+    if not isinstance( code, types.CodeType ):
+      code = compile( src, filename=filename, mode=mode )
+      s.store( 'code', key, code, marshal.dumps )
+    return code
+
+_disk_cache = None
+if os.getenv("PYMTL_CACHE_DIR"):
+  _disk_cache = DiskCache( os.getenv("PYMTL_CACHE_DIR") )
+
+def get_disk_cache():
+  return _disk_cache
+
+def enable_disk_cache( path ):
+  global _disk_cache
+  _disk_cache = DiskCache( path )
+  return _disk_cache
+
+def disable_disk_cache():
+  global _disk_cache
+  _disk_cache = None
+
+def cached_compile( src, filename, mode="exec" ):
+  """Drop-in replacement of compile() that persists the code object."""
+  if _disk_cache is None:
+    return compile( src, filename=filename, mode=mode )
+  return _disk_cache.compile( src, filename, mode )
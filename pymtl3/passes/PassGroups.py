@@ -1,20 +1,50 @@
+import sys
+from importlib import import_module
+
 from .autotick.OpenLoopCLPass import OpenLoopCLPass
 from .BasePass import BasePass
 from .sim.DynamicSchedulePass import DynamicSchedulePass
+from .sim.EventDrivenSchedulePass import EventDrivenSchedulePass
 from .sim.GenDAGPass import GenDAGPass
 from .sim.PrepareSimPass import PrepareSimPass
+from .sim.ProfileSimPass import ProfileSimPass
 from .sim.SimpleSchedulePass import SimpleSchedulePass
 from .sim.SimpleTickPass import SimpleTickPass
 from .sim.WrapGreenletPass import WrapGreenletPass
-from .tracing.CLLineTracePass import CLLineTracePass
-from .tracing.LineTraceParamPass import LineTraceParamPass
-from .tracing.PrintTextWavePass import PrintTextWavePass
-from .tracing.VcdGenerationPass import VcdGenerationPass
+
+# The tracing passes are imported when a pass group is applied, which
+# keeps them out of "import pymtl3". They are still module attributes
+# through __getattr__.
+_tracing_passes = ( 'CLLineTracePass', 'LineTraceParamPass',
+                    'PrintTextWavePass', 'VcdGenerationPass' )
+
+def _import_tracing_passes():
+  g = globals()
+  for name in _tracing_passes:
+    if name not in g:
+      g[ name ] = getattr( import_module( f".tracing.{name}", __package__ ), name )
+  return tuple( g[ name ] for name in _tracing_passes )
+
+def __getattr__( name ):
+  if name not in _tracing_passes:
+    raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
+  _import_tracing_passes()
+  return globals()[ name ]
+
+# No module __getattr__ before Python 3.7 (PEP 562)
+if sys.version_info < ( 3, 7 ):
+  _import_tracing_passes()
 
 
 # SimpleSim can be used when the UDG is a DAG
 class SimpleSimPass( BasePass ):
+  def __init__( s, *, print_line_trace=True ):
+    s.print_line_trace = print_line_trace
+
   def __call__( s, top ):
+    CLLineTracePass, LineTraceParamPass, PrintTextWavePass, VcdGenerationPass = \
+      _import_tracing_passes()
+
     LineTraceParamPass()( top )
     GenDAGPass()( top )
     WrapGreenletPass()( top )
@@ -23,21 +53,27 @@ class SimpleSimPass( BasePass ):
     VcdGenerationPass()( top )
     PrintTextWavePass()( top )
 
-    PrepareSimPass(print_line_trace=True)( top )
+    PrepareSimPass(print_line_trace=s.print_line_trace)( top )
 
 class DefaultPassGroup( BasePass ):
-  def __init__( s, *, vcdwave=None, textwave=False,
-                      print_line_trace=True, reset_active_high=True ):
+  def __init__( s, *, vcdwave=None, textwave=False, wave_format="vcd",
+                      print_line_trace=True, reset_active_high=True,
+                      profile=False ):
 
     s.vcdwave = vcdwave
+    s.wave_format = wave_format
     s.textwave = textwave
     s.print_line_trace = print_line_trace
     s.reset_active_high = reset_active_high
+    s.profile = profile
 
   def __call__( s, top ):
+    CLLineTracePass, LineTraceParamPass, PrintTextWavePass, VcdGenerationPass = \
+      _import_tracing_passes()
 
     if s.vcdwave:
       top.set_metadata( VcdGenerationPass.vcdwave, s.vcdwave )
+      top.set_metadata( VcdGenerationPass.wave_format, s.wave_format )
 
     if s.textwave:
       top.set_metadata( PrintTextWavePass.enable, True )
@@ -50,6 +86,42 @@ class DefaultPassGroup( BasePass ):
     VcdGenerationPass()( top )
     PrintTextWavePass()( top )
 
+    if s.profile:
+      ProfileSimPass()( top )
+
+    PrepareSimPass(print_line_trace=s.print_line_trace,
+                   reset_active_high=s.reset_active_high)( top )
+
+# EventDrivenSimPass only re-executes update blocks whose inputs changed
+class EventDrivenSimPass( BasePass ):
+  def __init__( s, *, vcdwave=None, textwave=False, wave_format="vcd",
+                      print_line_trace=True, reset_active_high=True ):
+
+    s.vcdwave = vcdwave
+    s.wave_format = wave_format
+    s.textwave = textwave
+    s.print_line_trace = print_line_trace
+    s.reset_active_high = reset_active_high
+
+  def __call__( s, top ):
+    CLLineTracePass, LineTraceParamPass, PrintTextWavePass, VcdGenerationPass = \
+      _import_tracing_passes()
+
+    if s.vcdwave:
+      top.set_metadata( VcdGenerationPass.vcdwave, s.vcdwave )
+      top.set_metadata( VcdGenerationPass.wave_format, s.wave_format )
+
+    if s.textwave:
+      top.set_metadata( PrintTextWavePass.enable, True )
+
+    LineTraceParamPass()( top )
+    GenDAGPass()( top )
+    WrapGreenletPass()( top )
+    CLLineTracePass()( top )
+    EventDrivenSchedulePass()( top )
+    VcdGenerationPass()( top )
+    PrintTextWavePass()( top )
+
     PrepareSimPass(print_line_trace=s.print_line_trace,
                    reset_active_high=s.reset_active_high)( top )
 
@@ -1 +1,10 @@
+from . import PassGroups
 from .PassGroups import *
+
+# The tracing passes are imported on first access, see PassGroups.py
+def __getattr__( name ):
+  if name not in PassGroups._tracing_passes:
+    raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
+  Pass = getattr( PassGroups, name )
+  globals()[ name ] = Pass
+  return Pass
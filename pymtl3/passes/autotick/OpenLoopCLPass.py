@@ -23,9 +23,6 @@ from ..errors import PassOrderError
 from ..sim.PrepareSimPass import PrepareSimPass
 from ..sim.SimpleSchedulePass import SimpleSchedulePass, dump_dag
 from ..sim.SimpleTickPass import SimpleTickPass
-from ..tracing.CLLineTracePass import CLLineTracePass
-from ..tracing.PrintTextWavePass import PrintTextWavePass
-from ..tracing.VcdGenerationPass import VcdGenerationPass
 
 
 class OpenLoopCLPass( BasePass ):
@@ -340,6 +337,11 @@ class OpenLoopCLPass( BasePass ):
         update_schedule.append( gen_wrapped_SCCblk( top, tmp_schedule, scc_block_src ) )
 
     # Shunning: we call line trace related pass here.
+    # The tracing passes are imported here to keep them out of "import pymtl3"
+    from ..tracing.CLLineTracePass import CLLineTracePass
+    from ..tracing.PrintTextWavePass import PrintTextWavePass
+    from ..tracing.VcdGenerationPass import VcdGenerationPass
+
     CLLineTracePass()( top )
     VcdGenerationPass()( top )
     PrintTextWavePass()( top )
@@ -0,0 +1,223 @@
+#=========================================================================
+# CImportPass.py
+#=========================================================================
+"""Provide a pass that compiles pure-RTL components to C and imports them.
+
+Components with ``CImportPass.enable`` set are lowered to plain C by
+``CTranslator``, compiled with the system C compiler into a shared
+library, and replaced by a wrapper component that loads the library
+through cffi. This gives compiled simulation speed without a Verilog
+translation and Verilator build.
+"""
+
+import linecache
+import os
+import subprocess
+import timeit
+from hashlib import blake2b
+
+from cffi import FFI
+
+from pymtl3 import MetadataKey
+from pymtl3.dsl import Component, InPort, Interface, OutPort, update, update_ff
+from pymtl3.extra.pypy import custom_exec
+from pymtl3.passes.BasePass import BasePass
+from pymtl3.passes.rtlir import RTLIRGetter
+from pymtl3.passes.sim.GenDAGPass import GenDAGPass
+from pymtl3.passes.sim.SimpleSchedulePass import SimpleSchedulePass
+
+from ..verilog.util.utility import get_component_unique_name
+from .errors import CImportError
+from .translation.CTranslator import CTranslator
+
+
+class CImportPass( BasePass ):
+  """Compile pure-RTL components to C and import them as PyMTL components."""
+
+  #: Enable import on a component.
+  #:
+  #: Type: ``bool``; input
+  #:
+  #: Default value: ``False``
+  enable   = MetadataKey(bool)
+
+  #: Print out extra debug information during import.
+  #:
+  #: Type: ``bool``; input
+  #:
+  #: Default value: ``False``
+  verbose  = MetadataKey(bool)
+
+  #: Flags to be passed to the C compiler.
+  #:
+  #: Type: ``str``; input
+  #:
+  #: Default value: ``'-O1'``
+  c_flags  = MetadataKey(str)
+
+  #: Path of the generated C source.
+  #:
+  #: Type: ``str``; output
+  c_src_path = MetadataKey(str)
+
+  def __call__( s, top ):
+    """Import the PyMTL component hierarhcy rooted at ``top``."""
+    s.top = top
+    if not top._dsl.constructed:
+      raise CImportError( top,
+        f"please elaborate design {top} before applying the import pass!" )
+    ret = s.traverse_hierarchy( top )
+    if ret is None:
+      ret = top
+    else:
+      ret.elaborate()
+    return ret
+
+  def traverse_hierarchy( s, m ):
+    c = s.__class__
+    if m.has_metadata( c.enable ) and m.get_metadata( c.enable ):
+      return s.do_import( m )
+
+    else:
+      for child in m.get_child_components(repr):
+        s.traverse_hierarchy( child )
+
+  def do_import( s, m ):
+    imp = s.get_imported_object( m )
+    if m is s.top:
+      return imp
+    else:
+      s.top.replace_component_with_obj( m, imp )
+
+  def vprint( s, m, msg ):
+    c = s.__class__
+    if m.has_metadata( c.verbose ) and m.get_metadata( c.verbose ):
+      print( msg )
+
+  #-----------------------------------------------------------------------
+  # get_imported_object
+  #-----------------------------------------------------------------------
+
+  def get_imported_object( s, m ):
+    c = s.__class__
+
+    # Elaborate a fresh copy of m as a top component to get its nets and
+    # a serial schedule
+
+    ref = m.__class__( *m._dsl.args, **m._dsl.kwargs )
+    ref.elaborate()
+    GenDAGPass()( ref )
+    SimpleSchedulePass()( ref )
+
+    src, nslots, slot = CTranslator( ref ).translate()
+
+    name = get_component_unique_name( RTLIRGetter(cache=False).get_component_ifc_rtlir( m ) )
+    c_flags = m.get_metadata( c.c_flags ) if m.has_metadata( c.c_flags ) else '-O1'
+    lib_path = s.create_shared_lib( m, name, src, c_flags )
+
+    ports = [ (repr(x), slot[x], x.is_input_value_port())
+              for x in sorted( ref._dsl.all_signals, key=repr )
+              if x.is_top_level_signal() and x.get_host_component() is ref and
+                 isinstance( x, (InPort, OutPort) ) ]
+
+    return s.import_component( m, name, lib_path, nslots, ports )
+
+  #-----------------------------------------------------------------------
+  # create_shared_lib
+  #-----------------------------------------------------------------------
+
+  def create_shared_lib( s, m, name, src, c_flags ):
+    c = s.__class__
+
+    # The hash of the source is part of the library name because dlopen
+    # returns the already loaded library if the path is the same
+
+    src_hash = blake2b( (src + c_flags).encode('ascii'), digest_size=8 ).hexdigest()
+    c_path   = f"{name}__c.c"
+    lib_path = os.path.abspath( f"lib{name}__c_{src_hash}.so" )
+    m.set_metadata( c.c_src_path, c_path )
+
+    with open( c_path, 'w' ) as fd:
+      fd.write( src )
+
+    if os.path.exists( lib_path ):
+      s.vprint( m, f"{name} not compiled because it's cached!" )
+      return lib_path
+
+    cmd = f"cc {c_flags} -fPIC -shared -o {lib_path} {c_path}"
+    s.vprint( m, f"Compiling {name} with command:\n  {cmd}" )
+    try:
+      t0 = timeit.default_timer()
+      subprocess.check_output( cmd, stderr=subprocess.STDOUT, shell=True )
+      s.vprint( m, f"compile time: {timeit.default_timer()-t0}" )
+    except subprocess.CalledProcessError as e:
+      raise CImportError( m, f"fail to compile {c_path}:\n{e.output.decode('utf-8')}" )
+
+    return lib_path
+
+  #-----------------------------------------------------------------------
+  # import_component
+  #-----------------------------------------------------------------------
+
+  def import_component( s, m, name, lib_path, nslots, ports ):
+    ffi = FFI()
+    ffi.cdef("""
+      void model_init( uint64_t * );
+      void comb_eval( uint64_t * );
+      void seq_eval( uint64_t *, uint64_t * );
+    """)
+    lib = ffi.dlopen( lib_path )
+
+    # Rebuild the same port/interface fields as m in the wrapper
+
+    fields = [ (k, v) for k, v in m.__dict__.items()
+               if k[0] != '_' and k not in ( 'clk', 'reset' ) and _is_ifc( v ) ]
+
+    set_inputs  = [ f"    _v[{k}] = int({x})" for x, k, is_input in ports if is_input ]
+    set_outputs = [ f"    {x} @= _v[{k}]" for x, k, is_input in ports if not is_input ]
+
+    src = f"""
+def construct( s ):
+  for name, obj in _fields:
+    setattr( s, name, _clone( obj ) )
+
+  _v = _ffi.new( "uint64_t[]", {nslots} )
+  _n = _ffi.new( "uint64_t[]", {nslots} )
+  _lib.model_init( _v )
+  _lib.model_init( _n )
+  _comb_eval = _lib.comb_eval
+  _seq_eval  = _lib.seq_eval
+
+  @update
+  def comb_upblk():
+{chr(10).join( set_inputs ) or "    pass"}
+    _comb_eval( _v )
+{chr(10).join( set_outputs )}
+
+  @update_ff
+  def seq_upblk():
+    _seq_eval( _v, _n )
+"""
+    filename = f"C wrapper of {name}"
+    _globals = { '_fields': fields, '_clone': _clone, '_ffi': ffi, '_lib': lib,
+                 'update': update, 'update_ff': update_ff }
+    _locals  = {}
+    custom_exec( compile( src, filename=filename, mode="exec" ), _globals, _locals )
+    linecache.cache[ filename ] = (len(src), None, src.splitlines( True ), filename)
+
+    imp_class = type( f"C{name}", (Component,), { 'construct': _locals['construct'],
+                                                  '_c_lib': lib, '_c_ffi': ffi } )
+    return imp_class()
+
+def _is_ifc( obj ):
+  if isinstance( obj, list ):
+    return len(obj) > 0 and all( _is_ifc( x ) for x in obj )
+  return isinstance( obj, (InPort, OutPort, Interface) )
+
+def _clone( obj ):
+  if isinstance( obj, list ):
+    return [ _clone( x ) for x in obj ]
+  ret = obj.__class__( *obj._dsl.args, **obj._dsl.kwargs )
+  if getattr( obj._dsl, 'inversed', False ):
+    ret.inverse()
+  return ret
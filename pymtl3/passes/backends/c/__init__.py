@@ -0,0 +1 @@
+from .CImportPass import CImportPass
@@ -0,0 +1,19 @@
+#=========================================================================
+# errors.py
+#=========================================================================
+"""Exception classes for the C backend."""
+
+
+class CTranslationError( Exception ):
+  """Error while lowering a component to C."""
+  def __init__( self, obj, msg ):
+    obj = getattr( obj, '__name__', str(obj) )
+    return super().__init__(
+      f"\nError trying to lower {obj} to C:\n- {msg}")
+
+class CImportError( Exception ):
+  """Error while compiling or importing the C model."""
+  def __init__( self, obj, msg ):
+    obj = str(obj)
+    return super().__init__(
+      f"\nError trying to perform import on {obj}:\n- {msg}")
@@ -0,0 +1,225 @@
+#=========================================================================
+# CImportPass_test.py
+#=========================================================================
+"""Test that C-imported components simulate exactly like the originals."""
+
+import random
+import shutil
+
+import pytest
+
+from pymtl3 import *
+from pymtl3.passes.testcases import CaseMemArrayRegFileComp
+from pymtl3.stdlib.basic_rtl import Reg, RegEnRst
+
+from .. import CImportPass
+from ..errors import CTranslationError
+
+pytestmark = pytest.mark.skipif( shutil.which('cc') is None,
+                                 reason="requires a C compiler" )
+
+def _run( m, inputs, outputs, ncycles, seed ):
+  rng = random.Random( seed )
+  m.apply( DefaultPassGroup(print_line_trace=False) )
+  m.sim_reset()
+  trace = []
+  for _ in range(ncycles):
+    for name, nbits in inputs:
+      port = getattr( m, name )
+      port @= rng.randint( 0, (1 << nbits) - 1 )
+    m.sim_eval_combinational()
+    trace.append( [ int( getattr( m, name ) ) for name in outputs ] )
+    m.sim_tick()
+  return trace
+
+def _check_import( cls, inputs, outputs, ncycles=50, child=None ):
+  ref = _run( cls(), inputs, outputs, ncycles, 0xdeadbeef )
+
+  m = cls()
+  m.elaborate()
+  target = getattr( m, child ) if child else m
+  target.set_metadata( CImportPass.enable, True )
+  m = CImportPass()( m )
+  if child:
+    assert getattr( m, child )._c_lib is not None
+  else:
+    assert m._c_lib is not None
+
+  assert _run( m, inputs, outputs, ncycles, 0xdeadbeef ) == ref
+
+class Acc( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.en  = InPort()
+    s.out = OutPort( Bits8 )
+    s.acc = Wire( Bits8 )
+
+    @update_ff
+    def up_acc():
+      if s.reset:
+        s.acc <<= 0
+      elif s.en:
+        s.acc <<= s.acc + s.in_
+
+    s.out //= s.acc
+
+class RegFile( Component ):
+  def construct( s, nregs=4 ):
+    s.raddr = InPort( Bits2 )
+    s.waddr = InPort( Bits2 )
+    s.wdata = InPort( Bits16 )
+    s.wen   = InPort()
+    s.rdata = OutPort( Bits16 )
+    s.rbit  = OutPort()
+    s.regs  = [ Wire( Bits16 ) for _ in range(nregs) ]
+
+    @update_ff
+    def up_write():
+      if s.wen:
+        s.regs[ s.waddr ] <<= s.wdata
+
+    @update
+    def up_read():
+      s.rdata @= s.regs[ s.raddr ]
+      s.rbit  @= s.wdata[ zext( s.raddr, 4 ) ]
+
+class Datapath( Component ):
+  def construct( s ):
+    s.a   = InPort( Bits8 )
+    s.b   = InPort( Bits8 )
+    s.sel = InPort( Bits2 )
+    s.x   = OutPort( Bits16 )
+    s.y   = OutPort( Bits16 )
+    s.z   = OutPort( Bits8 )
+    s.r   = OutPort()
+    s.hi  = OutPort( Bits4 )
+
+    @update
+    def up_x():
+      s.x @= concat( s.a, s.b[0:4], s.b[4:8] )
+      s.y @= sext( s.a, 16 ) + zext( s.b, 16 )
+      s.r @= reduce_xor( s.a ) | ( s.a == s.b )
+
+    @update
+    def up_z():
+      tmp = Bits8(0)
+      for i in range(4):
+        if s.sel == i:
+          tmp = s.a >> i
+      s.z @= tmp if s.sel != 3 else ~s.b - 1
+
+    s.hi //= s.x[12:16]
+
+class Hier( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits32 )
+    s.en  = InPort()
+    s.out = OutPort( Bits32 )
+    s.cnt = OutPort( Bits8 )
+
+    s.reg0 = RegEnRst( Bits32 )
+    s.reg0.in_ //= s.in_
+    s.reg0.en  //= s.en
+    s.reg1 = Reg( Bits32 )
+    s.reg1.in_ //= s.reg0.out
+    s.out //= s.reg1.out
+
+    s.acc = Acc()
+    s.acc.in_ //= s.in_[0:8]
+    s.acc.en  //= s.en
+    s.cnt //= s.acc.out
+
+def test_accumulator():
+  _check_import( Acc, [ ('in_', 8), ('en', 1) ], [ 'out' ] )
+
+def test_regfile_dynamic_index():
+  _check_import( RegFile, [ ('raddr', 2), ('waddr', 2), ('wdata', 16), ('wen', 1) ],
+                 [ 'rdata', 'rbit' ] )
+
+def test_mem_array():
+  _check_import( CaseMemArrayRegFileComp.DUT,
+                 [ ('wen', 1), ('waddr', 3), ('wdata', 32), ('raddr', 3) ], [ 'rdata' ] )
+
+def test_comb_datapath():
+  _check_import( Datapath, [ ('a', 8), ('b', 8), ('sel', 2) ],
+                 [ 'x', 'y', 'z', 'r', 'hi' ] )
+
+def test_hierarchy():
+  _check_import( Hier, [ ('in_', 32), ('en', 1) ], [ 'out', 'cnt' ] )
+
+def test_import_child():
+  _check_import( Hier, [ ('in_', 32), ('en', 1) ], [ 'out', 'cnt' ], child='acc' )
+
+def test_wide_signal_not_supported():
+
+  class Wide( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits96 )
+      s.out = OutPort( Bits96 )
+      s.out //= s.in_
+
+  m = Wide()
+  m.elaborate()
+  m.set_metadata( CImportPass.enable, True )
+  with pytest.raises( CTranslationError ):
+    CImportPass()( m )
+
+def test_out_of_range_semantics():
+
+  class OutOfRange( Component ):
+    def construct( s ):
+      s.raddr = InPort( Bits2 )
+      s.waddr = InPort( Bits2 )
+      s.wdata = InPort( Bits8 )
+      s.bits  = InPort( Bits6 )
+      s.bidx  = InPort( Bits3 )
+      s.div   = InPort( Bits8 )
+      s.rdata = OutPort( Bits8 )
+      s.rbit  = OutPort()
+      s.quot  = OutPort( Bits8 )
+      s.rem   = OutPort( Bits8 )
+      s.regs  = [ Wire( Bits8 ) for _ in range(3) ]
+
+      @update_ff
+      def up_write():
+        s.regs[ s.waddr ] <<= s.wdata
+
+      @update
+      def up_read():
+        s.rdata @= s.regs[ s.raddr ]
+        s.rbit  @= s.bits[ s.bidx ]
+        s.quot  @= s.wdata / s.div
+        s.rem   @= s.wdata % s.div
+
+  m = OutOfRange()
+  m.elaborate()
+  m.set_metadata( CImportPass.enable, True )
+  m = CImportPass()( m )
+  m.apply( DefaultPassGroup(print_line_trace=False) )
+  m.sim_reset()
+
+  for i in range(3):
+    m.waddr @= i
+    m.wdata @= i + 1
+    m.sim_tick()
+
+  # Out-of-range writes are dropped instead of aliasing an element
+  m.waddr @= 3
+  m.wdata @= 0xff
+  m.sim_tick()
+
+  for i in range(3):
+    m.raddr @= i
+    m.sim_eval_combinational()
+    assert m.rdata == i + 1
+
+  # Out-of-range reads and division by zero return zero
+  m.raddr @= 3
+  m.bits  @= 0x3f
+  m.bidx  @= 7
+  m.div   @= 0
+  m.sim_eval_combinational()
+  assert m.rdata == 0
+  assert m.rbit  == 0
+  assert m.quot  == 0
+  assert m.rem   == 0
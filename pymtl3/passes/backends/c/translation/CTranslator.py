@@ -0,0 +1,480 @@
+#=========================================================================
+# CTranslator.py
+#=========================================================================
+"""Lower an elaborated pure-RTL component to a plain C model.
+
+The state of the model is an array of ``uint64_t`` with one slot per top
+level signal, or one slot per element of a MemArray. Like ``lock_in_simulation``, top level signals in the same
+net share one slot, so only nets with slices need copy statements. The
+update blocks are lowered from their behavioral RTLIR in the order of
+the schedule generated by SimpleSchedulePass. Update_ff blocks write the
+next-state array which is flipped into the state array at the end of
+``seq_eval``.
+
+The model does not trap where the Python simulation raises IndexError or
+ZeroDivisionError. A read with an out-of-range dynamic index returns
+zero, and a write with an out-of-range dynamic index is dropped like in
+Verilog. Division and modulo by zero return zero.
+"""
+
+from pymtl3.datatypes import Bits
+from pymtl3.dsl import Const, MemArray, Signal
+from pymtl3.passes.rtlir import BehavioralRTLIR as bir
+from pymtl3.passes.rtlir import BehavioralRTLIRGenPass, BehavioralRTLIRTypeCheckPass
+from pymtl3.passes.rtlir import RTLIRDataType as rdt
+from pymtl3.passes.rtlir import RTLIRType as rt
+
+from ..errors import CTranslationError
+
+c_prelude = """\
+#include <stdint.h>
+
+static uint64_t _pow( uint64_t a, uint64_t b ) {
+  uint64_t r = 1;
+  while ( b ) { if ( b & 1 ) r *= a; a *= a; b >>= 1; }
+  return r;
+}
+"""
+
+def _mask( nbits ):
+  return f"UINT64_C({hex((1 << nbits) - 1)})"
+
+class CTranslator:
+
+  def __init__( s, top ):
+    s.top = top
+
+  def translate( s ):
+    """Return the C source of the model and the slot of every top level
+    signal. ``top`` must have gone through GenDAGPass and
+    SimpleSchedulePass."""
+    top = s.top
+    s.gen_slots()
+
+    s.tables = []
+    funcs    = []
+    calls    = { 'comb': [], 'seq': [] }
+
+    # Nets with slices become copy statements
+
+    net_of_reader = {}
+    for writer, signals in top.get_all_value_nets():
+      readers = [ x for x in signals if x is not writer ]
+      if readers:
+        net_of_reader[ readers[0] ] = (writer, signals)
+
+    for i, blk in enumerate( top._sched.update_schedule ):
+      if blk in top._dag.genblks:
+        writer, signals = net_of_reader[ top._dag.genblk_writes[ blk ][0] ]
+        body = s.gen_net_copy( writer, signals )
+      else:
+        body = s.gen_upblk( blk, nonblocking=False )
+      if body:
+        funcs.append( s.gen_func( f"comb{i}", blk.__name__, body ) )
+        calls['comb'].append( f"  comb{i}( v );" )
+
+    for i, blk in enumerate( top._sched.schedule_ff ):
+      funcs.append( s.gen_func( f"seq{i}", blk.__name__, s.gen_upblk( blk, nonblocking=True ),
+                                nonblocking=True ) )
+      calls['seq'].append( f"  seq{i}( v, n );" )
+
+    flips = sorted({ s.gen_flip( x ) for x in s.slot if x._dsl.needs_double_buffer })
+    inits = [ f"  v[{k}] = {hex(v)}ull;" for k, v in sorted( s.const_slots.items() ) ]
+
+    src = [ c_prelude ] + s.tables + funcs + [
+      "void model_init( uint64_t *v ) {", *inits, "}", "",
+      "void comb_eval( uint64_t *v ) {", *calls['comb'], "}", "",
+      "void seq_eval( uint64_t *v, uint64_t *n ) {", *calls['seq'], *flips, "}", "",
+    ]
+    return "\n".join( src ), s.nslots, s.slot
+
+  #-----------------------------------------------------------------------
+  # Slots
+  #-----------------------------------------------------------------------
+
+  def gen_slots( s ):
+    top = s.top
+    s.slot = {}
+    s.const_slots = {}
+
+    s.nslots = 0
+    for x in sorted( top._dsl.all_signals, key=repr ):
+      if x.is_top_level_signal():
+        Type = x._dsl.Type
+        if not issubclass( Type, Bits ) or Type.nbits > 64:
+          raise CTranslationError( x, f"only Bits signals up to 64 bits are supported, not {Type.__name__}" )
+        s.slot[ x ] = s.nslots
+        s.nslots += x.get_nelems() if isinstance( x, MemArray ) else 1
+
+    # Consolidate top level signals in the same net like lock_in_simulation
+
+    for writer, signals in top.get_all_value_nets():
+      residence = None
+      if isinstance( writer, Const ) or writer.is_top_level_signal():
+        residence = writer
+      else:
+        for x in signals:
+          if x.is_top_level_signal():
+            residence = x
+            break
+      if residence is None:
+        continue
+
+      if isinstance( residence, Const ):
+        k = s.nslots
+        s.nslots += 1
+        s.const_slots[ k ] = int( residence._dsl.const )
+      else:
+        k = s.slot[ residence ]
+
+      for x in signals:
+        if x is not residence and x.is_top_level_signal():
+          s.slot[ x ] = k
+
+    # Out-of-range dynamic indices read the zero slot and write the sink
+    # slot which is never read
+    s.zero_slot = s.nslots
+    s.sink_slot = s.nslots + 1
+    s.nslots += 2
+
+  def gen_flip( s, x ):
+    k = s.slot[ x ]
+    if isinstance( x, MemArray ):
+      return f"  for ( int _i = {k}; _i < {k + x.get_nelems()}; _i++ ) v[_i] = n[_i];"
+    return f"  v[{k}] = n[{k}];"
+
+  def gen_func( s, name, blk_name, body, nonblocking=False ):
+    args = "uint64_t *v, uint64_t *n" if nonblocking else "uint64_t *v"
+    return "\n".join( [ f"// {blk_name}", f"static void {name}( {args} ) {{" ] +
+                      [ "  " + x for x in body ] + [ "}", "" ] )
+
+  #-----------------------------------------------------------------------
+  # Net copies
+  #-----------------------------------------------------------------------
+
+  def gen_net_copy( s, writer, signals ):
+    if isinstance( writer, Const ):
+      value = f"UINT64_C({hex(int(writer._dsl.const))})"
+    else:
+      value = s.read_signal( writer )
+
+    # Top level readers share the slot of the writer unless the writer
+    # is a slice, in which case they share the slot of one reader
+
+    body  = [ f"uint64_t x = {value};" ]
+    done  = set()
+    whole = isinstance( writer, Const ) or writer.is_top_level_signal()
+    for x in signals:
+      if x is writer:
+        continue
+      if x.is_top_level_signal():
+        if whole or s.slot[ x ] in done:
+          continue
+        done.add( s.slot[ x ] )
+      body.append( s.write_signal( x, "x" ) )
+    return body if len(body) > 1 else []
+
+  def read_signal( s, x ):
+    k = s.slot[ x.get_top_level_signal() ]
+    if x.is_top_level_signal():
+      return f"v[{k}]"
+    sl = x._dsl.slice
+    return f"((v[{k}] >> {sl.start}) & {_mask(sl.stop - sl.start)})"
+
+  def write_signal( s, x, value ):
+    k = s.slot[ x.get_top_level_signal() ]
+    if x.is_top_level_signal():
+      return f"v[{k}] = {value};"
+    sl = x._dsl.slice
+    m  = _mask( sl.stop - sl.start )
+    return f"v[{k}] = (v[{k}] & ~({m} << {sl.start})) | ((({value}) & {m}) << {sl.start});"
+
+  #-----------------------------------------------------------------------
+  # Update blocks
+  #-----------------------------------------------------------------------
+
+  def gen_upblk( s, blk, nonblocking ):
+    m = s.top.get_update_block_host_component( blk )
+    if not m.has_metadata( BehavioralRTLIRGenPass.rtlir_upblks ):
+      BehavioralRTLIRGenPass( s.top )( m )
+      BehavioralRTLIRTypeCheckPass( s.top )( m )
+    rtlir = m.get_metadata( BehavioralRTLIRGenPass.rtlir_upblks )[ blk ]
+    return CBehavioralGenerator( s, blk, nonblocking ).enter( rtlir )
+
+#-------------------------------------------------------------------------
+# CBehavioralGenerator
+#-------------------------------------------------------------------------
+
+class CBehavioralGenerator( bir.BehavioralRTLIRNodeVisitor ):
+
+  binops = {
+    bir.Add: '+', bir.Sub: '-', bir.Mult: '*', bir.BitAnd: '&', bir.BitOr: '|',
+    bir.BitXor: '^', bir.Eq: '==', bir.NotEq: '!=', bir.Lt: '<', bir.LtE: '<=',
+    bir.Gt: '>', bir.GtE: '>=',
+  }
+
+  def __init__( s, translator, blk, nonblocking ):
+    s.tr          = translator
+    s.blk         = blk
+    s.nonblocking = nonblocking
+
+  def enter( s, rtlir ):
+    s.tmpvars = {}
+    body = s.gen_stmts( rtlir.body )
+    return [ f"uint64_t _tmp_{x} = 0;" for x in s.tmpvars ] + body
+
+  def error( s, msg ):
+    return CTranslationError( s.blk, msg )
+
+  def get_nbits( s, node ):
+    dtype = node.Type.get_dtype()
+    if not isinstance( dtype, ( rdt.Vector, rdt.Bool ) ):
+      raise s.error( f"data type {dtype} is not supported" )
+    return dtype.get_length()
+
+  #-----------------------------------------------------------------------
+  # Statements
+  #-----------------------------------------------------------------------
+
+  def gen_stmts( s, stmts ):
+    lines = []
+    for stmt in stmts:
+      lines.extend( s.visit( stmt ) )
+    return lines
+
+  def visit_Assign( s, node ):
+    lines = [ "{", f"  uint64_t _rhs = {s.visit( node.value )};" ]
+    for target in node.targets:
+      if isinstance( target, bir.TmpVar ):
+        s.tmpvars[ target.name ] = s.get_nbits( target )
+        lines.append( f"  _tmp_{target.name} = _rhs;" )
+      else:
+        lines.append( "  " + s.gen_target( target, "_rhs" ) )
+    return lines + [ "}" ]
+
+  def gen_target( s, node, value ):
+    array = "n" if s.nonblocking else "v"
+
+    if isinstance( node, bir.Index ) and isinstance( node.value.Type, rt.Signal ):
+      lo_node, nbits = node.idx, 1
+    elif isinstance( node, bir.Slice ):
+      if node.base is None:
+        lo_node, nbits = node.lower, s.get_nbits( node )
+      else:
+        lo_node, nbits = node.base, node.size
+    else:
+      return f"{s.signal_ref( node, array, write=True )} = {value} & {_mask(s.get_nbits(node))};"
+
+    lo  = s.visit( lo_node )
+    dst = s.signal_ref( node.value, array, write=True )
+    m   = _mask( nbits )
+    ret = f"{dst} = ({dst} & ~({m} << ({lo}))) | ((({value}) & {m}) << ({lo}));"
+    if hasattr( lo_node, '_value' ):
+      return ret
+    return f"if ( {s.part_in_range( node.value, lo, nbits )} ) {ret}"
+
+  def visit_If( s, node ):
+    lines = [ f"if ( {s.visit( node.cond )} ) {{" ]
+    lines.extend( "  " + x for x in s.gen_stmts( node.body ) )
+    if node.orelse:
+      lines.append( "} else {" )
+      lines.extend( "  " + x for x in s.gen_stmts( node.orelse ) )
+    return lines + [ "}" ]
+
+  def visit_For( s, node ):
+    var = f"_i_{node.var.name}"
+    try:
+      step = int( node.step._value )
+    except AttributeError:
+      raise s.error( "the step of a for loop must be a constant" )
+    cmp = '<' if step > 0 else '>'
+    start, end = s.visit( node.start ), s.visit( node.end )
+    lines = [ f"for ( int64_t {var} = {start}; {var} {cmp} (int64_t)({end}); {var} += {step} ) {{" ]
+    lines.extend( "  " + x for x in s.gen_stmts( node.body ) )
+    return lines + [ "}" ]
+
+  #-----------------------------------------------------------------------
+  # Signal references
+  #-----------------------------------------------------------------------
+  # We walk the attribute/index chain on the elaborated objects. Indices
+  # that are not constant turn the candidate objects into a table that is
+  # indexed at run time. Every dynamic index adds a range check, and the
+  # table has one more entry for out-of-range indices. The elements of a
+  # MemArray are ( array, index ) pairs.
+
+  def resolve( s, node ):
+    if isinstance( node, bir.Base ):
+      return [ node.base ], None, []
+
+    if isinstance( node, bir.FreeVar ):
+      return [ node.obj ], None, []
+
+    if isinstance( node, bir.Attribute ):
+      objs, idx, checks = s.resolve( node.value )
+      if isinstance( objs[0], Signal ):
+        raise s.error( f"bitstruct field {node.attr} is not supported" )
+      return [ getattr( x, node.attr ) for x in objs ], idx, checks
+
+    if isinstance( node, bir.Index ):
+      objs, idx, checks = s.resolve( node.value )
+      if isinstance( objs[0], MemArray ):
+        return s.resolve_mem_array( node, objs, idx, checks )
+      if hasattr( node.idx, '_value' ):
+        i = int( node.idx._value )
+        return [ x[i] for x in objs ], idx, checks
+      length = len( objs[0] )
+      i = s.visit( node.idx )
+      objs = [ y for x in objs for y in x ]
+      checks = checks + [ f"(uint64_t)({i}) < {length}" ]
+      return objs, ( i if idx is None else f"({idx})*{length} + ({i})" ), checks
+
+    raise s.error( f"{node.__class__.__name__} cannot be used as a signal" )
+
+  def resolve_mem_array( s, node, objs, idx, checks ):
+    if hasattr( node.idx, '_value' ):
+      i = int( node.idx._value )
+      return [ ( x, i ) for x in objs ], idx, checks
+    length = objs[0].get_nelems()
+    i = s.visit( node.idx )
+    objs = [ ( x, j ) for x in objs for j in range( length ) ]
+    checks = checks + [ f"(uint64_t)({i}) < {length}" ]
+    return objs, ( i if idx is None else f"({idx})*{length} + ({i})" ), checks
+
+  def table_index( s, idx, checks, n ):
+    return f"(({' && '.join( checks )}) ? ({idx}) : {n})"
+
+  def signal_ref( s, node, array="v", write=False ):
+    objs, idx, checks = s.resolve( node )
+    slots = []
+    for x in objs:
+      if isinstance( x, tuple ):
+        slots.append( s.tr.slot[ x[0] ] + x[1] )
+      elif isinstance( x, Signal ):
+        slots.append( s.tr.slot[ x ] )
+      else:
+        raise s.error( f"{x} is not a signal" )
+    if idx is None:
+      return f"{array}[{slots[0]}]"
+    n = len( slots )
+    slots.append( s.tr.sink_slot if write else s.tr.zero_slot )
+    name = f"_tbl{len(s.tr.tables)}"
+    s.tr.tables.append( f"static const uint32_t {name}[] = {{ {', '.join(map(str, slots))} }};\n" )
+    return f"{array}[{name}[{s.table_index( idx, checks, n )}]]"
+
+  def const_table_ref( s, node ):
+    objs, idx, checks = s.resolve( node )
+    values = [ hex(int(x)) + 'ull' for x in objs ] + [ '0ull' ]
+    name = f"_tbl{len(s.tr.tables)}"
+    s.tr.tables.append( f"static const uint64_t {name}[] = {{ {', '.join( values )} }};\n" )
+    return f"{name}[{s.table_index( idx, checks, len(objs) )}]"
+
+  def part_in_range( s, value, lo, nbits ):
+    return f"(uint64_t)({lo}) <= {s.get_nbits( value ) - nbits}"
+
+  #-----------------------------------------------------------------------
+  # Expressions
+  #-----------------------------------------------------------------------
+
+  def visit( s, node ):
+    if hasattr( node, '_value' ) and isinstance( node.Type, rt.Signal ):
+      return f"UINT64_C({hex(int(node._value) & ((1 << s.get_nbits(node)) - 1))})"
+    return super().visit( node )
+
+  def generic_visit( s, node ):
+    raise s.error( f"{node.__class__.__name__} is not supported" )
+
+  def visit_Number( s, node ):
+    return f"UINT64_C({hex(int(node.value))})"
+
+  def visit_LoopVar( s, node ):
+    return f"((uint64_t)_i_{node.name})"
+
+  def visit_TmpVar( s, node ):
+    return f"_tmp_{node.name}"
+
+  def visit_Attribute( s, node ):
+    if isinstance( node.Type, rt.Const ):
+      objs, idx, checks = s.resolve( node )
+      return f"UINT64_C({hex(int(objs[0]))})"
+    return s.signal_ref( node )
+
+  def visit_FreeVar( s, node ):
+    return s.signal_ref( node )
+
+  def visit_Index( s, node ):
+    if isinstance( node.value.Type, rt.Array ):
+      if isinstance( node.Type, rt.Const ):
+        return s.const_table_ref( node )
+      return s.signal_ref( node )
+    ret = f"(({s.visit( node.value )} >> ({s.visit( node.idx )})) & 1)"
+    if hasattr( node.idx, '_value' ):
+      return ret
+    return f"({s.part_in_range( node.value, s.visit( node.idx ), 1 )} ? {ret} : 0)"
+
+  def visit_Slice( s, node ):
+    nbits = s.get_nbits( node )
+    lo = s.visit( node.lower ) if node.base is None else s.visit( node.base )
+    ret = f"(({s.visit( node.value )} >> ({lo})) & {_mask(nbits)})"
+    if node.base is None or hasattr( node.base, '_value' ):
+      return ret
+    return f"({s.part_in_range( node.value, lo, nbits )} ? {ret} : 0)"
+
+  def visit_BinOp( s, node ):
+    a, b  = s.visit( node.left ), s.visit( node.right )
+    nbits = s.get_nbits( node )
+    m     = _mask( nbits )
+    op    = node.op.__class__
+
+    if op is bir.ShiftLeft:
+      return f"(({b}) >= {nbits} ? 0 : (({a}) << ({b})) & {m})"
+    if op is bir.ShiftRightLogic:
+      return f"(({b}) >= {nbits} ? 0 : ({a}) >> ({b}))"
+    if op is bir.Div:
+      return f"(({b}) ? ({a}) / ({b}) : 0)"
+    if op is bir.Mod:
+      return f"(({b}) ? ({a}) % ({b}) : 0)"
+    if op is bir.Pow:
+      return f"(_pow( {a}, {b} ) & {m})"
+    return f"((({a}) {s.binops[op]} ({b})) & {m})"
+
+  def visit_Compare( s, node ):
+    return f"((uint64_t)(({s.visit( node.left )}) {s.binops[ node.op.__class__ ]} ({s.visit( node.right )})))"
+
+  def visit_UnaryOp( s, node ):
+    a, m = s.visit( node.operand ), _mask( s.get_nbits( node ) )
+    op   = node.op.__class__
+    if op is bir.Invert: return f"(~({a}) & {m})"
+    if op is bir.USub:   return f"((0 - ({a})) & {m})"
+    return a
+
+  def visit_IfExp( s, node ):
+    return f"(({s.visit( node.cond )}) ? ({s.visit( node.body )}) : ({s.visit( node.orelse )}))"
+
+  def visit_Concat( s, node ):
+    terms, shift = [], 0
+    for x in reversed( node.values ):
+      terms.append( f"(({s.visit( x )}) << {shift})" )
+      shift += s.get_nbits( x )
+    return "(" + " | ".join( reversed( terms ) ) + ")"
+
+  def visit_ZeroExt( s, node ):
+    return s.visit( node.value )
+
+  def visit_SignExt( s, node ):
+    old, new = s.get_nbits( node.value ), s.get_nbits( node )
+    a   = s.visit( node.value )
+    ext = hex( ((1 << new) - 1) ^ ((1 << old) - 1) )
+    return f"(((({a}) >> {old-1}) & 1) ? (({a}) | UINT64_C({ext})) : ({a}))"
+
+  def visit_Truncate( s, node ):
+    return f"(({s.visit( node.value )}) & {_mask(s.get_nbits(node))})"
+
+  def visit_SizeCast( s, node ):
+    return f"(({s.visit( node.value )}) & {_mask(s.get_nbits(node))})"
+
+  def visit_Reduce( s, node ):
+    a, m = s.visit( node.value ), _mask( s.get_nbits( node.value ) )
+    op   = node.op.__class__
+    if op is bir.BitAnd: return f"((uint64_t)(({a}) == {m}))"
+    if op is bir.BitOr:  return f"((uint64_t)(({a}) != 0))"
+    return f"((uint64_t)__builtin_parityll({a}))"
@@ -11,6 +11,8 @@ class BaseRTLIRTranslator:
 
   def __init__( s, top ):
     s.top = top
+    s.cached_components = {}
+    s.deferred_components = ()
 
   def clear( s, tr_top ):
     s.tr_top = tr_top
@@ -5,12 +5,49 @@
 # Date   : March 15, 2019
 """Provide translators that convert RTLIR to backend representation."""
 
+import multiprocessing
+import pickle
+
+from pymtl3.passes.rtlir.structural.StructuralRTLIRGenL1Pass import (
+    StructuralRTLIRGenL1Pass,
+)
+
 from .BaseRTLIRTranslator import TranslatorMetadata
 from .behavioral import BehavioralTranslator
 from .errors import RTLIRTranslationError
 from .structural import StructuralTranslator
 
 
+# The translator of the worker processes, which inherit it through fork
+_worker_translator = None
+
+def _translate_behavioral_worker( i ):
+  """Translate the behavioral part of the i-th deferred component and
+  return the result, or None if it has to be translated by the main
+  process."""
+  s = _worker_translator
+  m = s._deferred_reps[i]
+  nstructs = len(s.structural.decl_type_struct)
+  nvectors = len(s.structural.decl_type_vector)
+
+  try:
+    s.translate_component_behavioral( m )
+  except Exception:
+    # The main process translates it again to report the error
+    return None
+
+  # Struct types have to be registered by the main process
+  if len(s.structural.decl_type_struct) != nstructs:
+    return None
+
+  result = { name: metadata_d[m] for name, metadata_d in vars(s.behavioral).items()
+             if m in metadata_d and name not in ( 'rtlir', 'freevars' ) }
+  vectors = list(s.structural.decl_type_vector.items())[nvectors:]
+  try:
+    return pickle.dumps( ( result, vectors ) )
+  except Exception:
+    return None
+
 def mk_RTLIRTranslator( _StructuralTranslator, _BehavioralTranslator ):
   """Return an RTLIRTranslator from the two given translators."""
   class _RTLIRTranslator( _StructuralTranslator, _BehavioralTranslator ):
@@ -21,12 +58,84 @@ def mk_RTLIRTranslator( _StructuralTranslator, _BehavioralTranslator ):
     code layout of the backend representation.
     """
 
+    # The number of processes that translate the behavioral part of
+    # unique components in parallel
+    jobs = 1
+
+    # Fewer unique components are translated by the main process because
+    # starting the worker processes costs more than it saves
+    min_parallel_components = 16
+
     # Override
     def clear( s, tr_top, tr_cfgs ):
       s.tr_cfgs = tr_cfgs
       s.hierarchy = TranslatorMetadata()
+      # Components whose backend representation is reused from a previous
+      # translation. Their behavioral part is not translated.
+      s.cached_components = s.rtlir_tr_load_cached_components( tr_top )
+      # Components whose behavioral part is translated once per unique
+      # name after the structural metadata is available
+      s.deferred_components = s._get_deferred_components( tr_top )
       super().clear( tr_top )
 
+    def _get_deferred_components( s, tr_top ):
+      if s.jobs <= 1 or \
+         'fork' not in multiprocessing.get_all_start_methods():
+        return ()
+
+      ret = {}
+      def traverse( m ):
+        if m not in s.cached_components:
+          ret[m] = None
+        for child in m.get_child_components(repr):
+          traverse( child )
+      traverse( tr_top )
+      return ret
+
+    def translate_deferred_components( s ):
+      """Translate the behavioral part of the deferred components.
+
+      Only one component of each unique name is translated, by a pool of
+      worker processes if there are enough of them. The results are
+      merged in hierarchy order, and the other components of the same
+      name share them.
+      """
+      global _worker_translator
+
+      groups = {}
+      for m in s.deferred_components:
+        m_rtype = m.get_metadata( StructuralRTLIRGenL1Pass.rtlir_type )
+        name = s.rtlir_tr_component_unique_name( m_rtype )
+        groups.setdefault( name, [] ).append( m )
+      groups = list(groups.values())
+      s._deferred_reps = [ ms[0] for ms in groups ]
+
+      results = [ None ] * len(groups)
+      if len(groups) >= s.min_parallel_components:
+        _worker_translator = s
+        try:
+          ctx = multiprocessing.get_context( 'fork' )
+          with ctx.Pool( min( s.jobs, len(groups) ) ) as pool:
+            results = pool.map( _translate_behavioral_worker, range(len(groups)) )
+        finally:
+          _worker_translator = None
+
+      for ms, result in zip( groups, results ):
+        rep = ms[0]
+        if result is None:
+          s.translate_component_behavioral( rep )
+        else:
+          result, vectors = pickle.loads( result )
+          for name, data in result.items():
+            getattr( s.behavioral, name )[rep] = data
+          for dtype, data in vectors:
+            s.structural.decl_type_vector.setdefault( dtype, data )
+
+        for m in ms[1:]:
+          for metadata_d in vars(s.behavioral).values():
+            if rep in metadata_d:
+              metadata_d[m] = metadata_d[rep]
+
     def _gen_hierarchy_metadata( s, structural_ns, hierarchy_ns ):
       metadata = getattr( s.structural, structural_ns, {} )
       result = getattr( s.hierarchy, hierarchy_ns )
@@ -50,12 +159,17 @@ def mk_RTLIRTranslator( _StructuralTranslator, _BehavioralTranslator ):
         for child in m.get_child_components(repr):
           translate_component( child, components )
 
-        name = s.structural.component_unique_name[m]
+        m_rtype = m.get_metadata( StructuralRTLIRGenL1Pass.rtlir_type )
+        name = s.rtlir_tr_component_unique_name( m_rtype )
         if name not in components:
-          components[name] = s.rtlir_tr_component(
-              get_component_nspace( s.behavioral, m ),
-              get_component_nspace( s.structural, m ),
-          )
+          if m in s.cached_components:
+            components[name] = s.cached_components[m][0]
+          else:
+            components[name] = s.rtlir_tr_component(
+                get_component_nspace( s.behavioral, m ),
+                get_component_nspace( s.structural, m ),
+            )
+            s.rtlir_tr_store_cached_component( m, components[name] )
         s._gen_hierarchy_metadata( 'decl_type_vector', 'decl_type_vector' )
         s._gen_hierarchy_metadata( 'decl_type_array', 'decl_type_array'   )
         s._gen_hierarchy_metadata( 'decl_type_struct', 'decl_type_struct' )
@@ -72,6 +186,7 @@ def mk_RTLIRTranslator( _StructuralTranslator, _BehavioralTranslator ):
 
       try:
         s.rtlir_tr_initialize()
+        s.translate_deferred_components()
         s.translate_behavioral( s.tr_top )
         s.translate_structural( s.tr_top )
         translate_component( s.tr_top, s.hierarchy.components )
@@ -101,6 +216,15 @@ def mk_RTLIRTranslator( _StructuralTranslator, _BehavioralTranslator ):
     def rtlir_tr_component( s, behavioral, structural ):
       raise NotImplementedError()
 
+    # The following methods are optional
+
+    def rtlir_tr_load_cached_components( s, tr_top ):
+      """Return a dict that maps components to their cached ( src, accessed )."""
+      return {}
+
+    def rtlir_tr_store_cached_component( s, m, src ):
+      pass
+
   return _RTLIRTranslator
 
 RTLIRTranslator = mk_RTLIRTranslator( BehavioralTranslator, StructuralTranslator )
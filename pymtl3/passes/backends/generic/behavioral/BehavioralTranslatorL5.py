@@ -28,6 +28,16 @@ class BehavioralTranslatorL5( BehavioralTranslatorL4 ):
 
   # Override
   def _gen_behavioral_trans_metadata( s, m ):
+    # Cached and deferred components skip behavioral RTLIR generation and
+    # type checking here
+    if m not in s.cached_components and m not in s.deferred_components:
+      s._gen_component_behavioral_trans_metadata( m )
+
+    # Visit the whole component hierarchy because now we have subcomponents
+    for child in m.get_child_components(repr):
+      s._gen_behavioral_trans_metadata( child )
+
+  def _gen_component_behavioral_trans_metadata( s, m ):
     m.apply( BehavioralRTLIRGenL5Pass( s.tr_top ) )
     m.apply( BehavioralRTLIRTypeCheckL5Pass( s.tr_top ) )
     s.behavioral.rtlir[m] = \
@@ -37,16 +47,22 @@ class BehavioralTranslatorL5( BehavioralTranslatorL4 ):
     s.behavioral.tmpvars[m] =\
         m.get_metadata( BehavioralRTLIRTypeCheckL5Pass.rtlir_tmpvars )
 
-    # Visit the whole component hierarchy because now we have subcomponents
-    for child in m.get_child_components(repr):
-      s._gen_behavioral_trans_metadata( child )
-
   #-----------------------------------------------------------------------
   # translate_behavioral
   #-----------------------------------------------------------------------
 
   # Override
   def translate_behavioral( s, m ):
-    super().translate_behavioral( m )
+    if m in s.cached_components:
+      # The structural translation still needs the accessed names
+      s.behavioral.accessed[m] = s.cached_components[m][1]
+    elif m not in s.deferred_components:
+      super().translate_behavioral( m )
     for child in m.get_child_components(repr):
       s.translate_behavioral( child )
+
+  def translate_component_behavioral( s, m ):
+    """Generate the metadata of and translate the behavioral part of `m`
+    but not its subcomponents."""
+    s._gen_component_behavioral_trans_metadata( m )
+    super().translate_behavioral( m )
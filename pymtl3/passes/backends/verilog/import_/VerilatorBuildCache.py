@@ -0,0 +1,130 @@
+#=========================================================================
+# VerilatorBuildCache.py
+#=========================================================================
+"""Provide a build cache of verilated shared libraries that is shared by
+all working directories and processes.
+
+Each entry is a directory named by the hash of everything that goes into
+the shared library: the translated Verilog, the generated C wrapper, the
+import configuration, the verilator and C compiler commands, and the
+Verilator version. Concurrent builds of the same entry are serialized
+with file locks, so only one process builds it and the others reuse the
+result. The least recently used entries are evicted when the cache grows
+beyond its size limit."""
+
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from hashlib import blake2b
+
+_verilator_version = None
+
+def get_verilator_version():
+  global _verilator_version
+  if _verilator_version is None:
+    try:
+      _verilator_version = subprocess.check_output(
+          "verilator --version", stderr = subprocess.STDOUT, shell = True,
+          universal_newlines = True ).strip()
+    except subprocess.CalledProcessError:
+      _verilator_version = ""
+  return _verilator_version
+
+class VerilatorBuildCache:
+
+  lib_name = "lib.so"
+
+  def __init__( s, cache_dir, max_size ):
+    s.cache_dir = os.path.abspath( os.path.expanduser( cache_dir ) )
+    s.max_size  = max_size
+    os.makedirs( s.cache_dir, exist_ok = True )
+
+  def get_key( s, ip_cfg, cfg_d ):
+    """Return the hash of all inputs of the shared library of ip_cfg."""
+    cfg_d = dict( cfg_d )
+    # The make directory does not change the shared library
+    cfg_d.pop( 'vl_mk_dir', None )
+
+    h = blake2b( digest_size = 20 )
+    h.update( json.dumps( cfg_d, sort_keys = True, default = repr ).encode() )
+    h.update( ip_cfg.translated_top_module.encode() )
+    h.update( get_verilator_version().encode() )
+    h.update( ip_cfg.create_vl_cmd().encode() )
+    h.update( ip_cfg.create_cc_cmd().encode() )
+    for path in [ ip_cfg.translated_source_file, ip_cfg.get_c_wrapper_path() ] + \
+                list( ip_cfg.c_srcs ):
+      with open( path, 'rb' ) as fd:
+        h.update( fd.read() )
+    return h.hexdigest()
+
+  @contextmanager
+  def _flock( s, name ):
+    with open( os.path.join( s.cache_dir, name ), 'a' ) as fd:
+      fcntl.flock( fd, fcntl.LOCK_EX )
+      try:
+        yield
+      finally:
+        fcntl.flock( fd, fcntl.LOCK_UN )
+
+  def lock( s, key ):
+    """Hold this lock while looking up and building the entry of key so
+    that each entry is only built once."""
+    return s._flock( f"{key}.lock" )
+
+  def fetch( s, key, lib_path ):
+    """Copy the cached shared library of key to lib_path. Return False if
+    key is not in the cache."""
+    entry = os.path.join( s.cache_dir, key )
+    lib = os.path.join( entry, s.lib_name )
+
+    # Copy then rename so that an existing library that has been loaded
+    # by this process is not overwritten in place
+    tmp = f"{lib_path}.tmp{os.getpid()}"
+    try:
+      shutil.copyfile( lib, tmp )
+      # The modification time of the entry records its last use
+      os.utime( entry )
+    except FileNotFoundError:
+      # Not cached, or evicted by another process
+      return False
+
+    os.replace( tmp, lib_path )
+    return True
+
+  def store( s, key, lib_path ):
+    """Add the shared library at lib_path to the cache as key and evict
+    the least recently used entries if the cache is full."""
+    entry = os.path.join( s.cache_dir, key )
+    tmp_dir = tempfile.mkdtemp( dir = s.cache_dir, prefix = ".tmp" )
+    shutil.copyfile( lib_path, os.path.join( tmp_dir, s.lib_name ) )
+
+    with s._flock( ".lock" ):
+      if os.path.exists( entry ):
+        shutil.rmtree( entry )
+      os.rename( tmp_dir, entry )
+      s.evict()
+
+  def evict( s ):
+    entries = []
+    total = 0
+    for name in os.listdir( s.cache_dir ):
+      path = os.path.join( s.cache_dir, name )
+      lib = os.path.join( path, s.lib_name )
+      if name.startswith( "." ) or not os.path.exists( lib ):
+        continue
+      size = os.path.getsize( lib )
+      entries.append( ( os.path.getmtime( path ), size, name ) )
+      total += size
+
+    # Always keep the most recently used entry
+    entries.sort()
+    for _, size, name in entries[:-1]:
+      if total <= s.max_size:
+        break
+      # Lock files are kept because other processes may be waiting on them
+      shutil.rmtree( os.path.join( s.cache_dir, name ), ignore_errors = True )
+      total -= size
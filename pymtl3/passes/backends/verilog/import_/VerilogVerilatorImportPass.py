@@ -14,9 +14,10 @@ import shutil
 import subprocess
 import sys
 import timeit
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 from importlib import reload
-from itertools import cycle
+from itertools import cycle, product
 from textwrap import indent
 
 from pymtl3 import MetadataKey
@@ -41,6 +42,7 @@ from ..util.utility import (
 from ..VerilogPlaceholderPass import VerilogPlaceholderPass
 from .verilator_wrapper_c_template import template as c_template
 from .verilator_wrapper_py_template import template as py_template
+from .VerilatorBuildCache import VerilatorBuildCache
 
 
 class VerilogVerilatorImportPass( BasePass ):
@@ -230,6 +232,31 @@ class VerilogVerilatorImportPass( BasePass ):
   #: Default value: ``''``
   ld_libs             = MetadataKey(str)
 
+  #: Maximum number of components that are verilated and compiled at the
+  #: same time. Only the value on the top component is used.
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: the number of CPUs
+  vl_jobs             = MetadataKey(int)
+
+  #: Directory of the build cache shared by all working directories and
+  #: processes. Only the value on the top component is used.
+  #:
+  #: Type: ``str``; input
+  #:
+  #: Default value: ``$PYMTL_VL_CACHE_DIR`` if set, otherwise no shared
+  #: build cache
+  vl_cache_dir        = MetadataKey(str)
+
+  #: Size limit in bytes of the shared build cache. The least recently
+  #: used builds are evicted beyond this size.
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: ``$PYMTL_VL_CACHE_SIZE`` if set, otherwise 4GB
+  vl_cache_size       = MetadataKey(int)
+
   # Import pass output pass data
 
   #: An instnace of :class:`VerilatorImportConfigs` containing the parsed options.
@@ -243,7 +270,19 @@ class VerilogVerilatorImportPass( BasePass ):
     if not top._dsl.constructed:
       raise VerilogImportError( top,
         f"please elaborate design {top} before applying the import pass!" )
-    ret = s.traverse_hierarchy( top )
+
+    # Collect all components to import first so that the verilator
+    # models of different components can be built concurrently
+    s.to_import = []
+    s.traverse_hierarchy( top )
+    s.build_all( s.to_import )
+
+    ret = None
+    for m in s.to_import:
+      imp = s.do_import( m )
+      if m is top:
+        ret = imp
+
     if ret is None:
       ret = top
     else:
@@ -256,12 +295,62 @@ class VerilogVerilatorImportPass( BasePass ):
     # Import can only be performed on Placeholders
     if m.has_metadata( ph_pass.enable ) and m.get_metadata( ph_pass.enable ):
       m.set_metadata( c.import_config, c.get_import_config()( m ) )
-      return s.do_import( m )
+      s.to_import.append( m )
 
     else:
       for child in m.get_child_components(repr):
         s.traverse_hierarchy( child )
 
+  def build_all( s, ms ):
+    """Verilate and compile the components in ms using up to vl_jobs
+    concurrent builds. Components with the same top module name and
+    configuration share one build. A component whose top module name
+    clashes with a different configuration is built when it is imported
+    instead, after all concurrent builds finish."""
+    c = s.__class__
+    s.build_cache = s.get_build_cache()
+
+    builds = {}
+    shared = {}
+    for m in ms:
+      try:
+        info = s.prepare_import( m )
+      except AssertionError as e:
+        msg = '' if e.args[0] is None else e.args[0]
+        raise VerilogImportError( m, msg )
+
+      name = info[1].translated_top_module
+      if name not in builds:
+        builds[ name ] = ( m, info )
+        shared[ m ] = ( info, name )
+      elif s.is_same_cfg( builds[ name ][1][-1], info[-1] ):
+        shared[ m ] = ( info, name )
+
+    if s.top.has_metadata( c.vl_jobs ):
+      njobs = s.top.get_metadata( c.vl_jobs )
+    else:
+      njobs = os.cpu_count() or 1
+
+    # Each build mostly waits for verilator and the C compiler, so one
+    # thread per build is enough to keep njobs processes busy
+    if njobs <= 1 or len(builds) <= 1:
+      results = [ ( m, lambda m=m, info=info: s.build( m, info ) )
+                  for m, info in builds.values() ]
+    else:
+      with ThreadPoolExecutor( max_workers=njobs ) as executor:
+        results = [ ( m, executor.submit( s.build, m, info ).result )
+                    for m, info in builds.values() ]
+
+    port_cdefs = {}
+    for name, ( m, get_result ) in zip( builds, results ):
+      try:
+        port_cdefs[ name ] = get_result()
+      except AssertionError as e:
+        msg = '' if e.args[0] is None else e.args[0]
+        raise VerilogImportError( m, msg )
+
+    s._builds = { m: ( info, port_cdefs[ name ] ) for m, ( info, name ) in shared.items() }
+
   def do_import( s, m ):
     try:
       imp = s.get_imported_object( m )
@@ -337,6 +426,35 @@ class VerilogVerilatorImportPass( BasePass ):
   #-----------------------------------------------------------------------
 
   def get_imported_object( s, m ):
+    builds = getattr( s, '_builds', {} )
+    if m in builds:
+      info, port_cdefs = builds[ m ]
+    else:
+      info = s.prepare_import( m )
+      port_cdefs = s.build( m, info )
+
+    ph_cfg, ip_cfg, rtype, ports, cached, config_file, cfg_d = info
+
+    symbols = s.create_py_wrapper( m, ph_cfg, ip_cfg, rtype, ports, copy.copy(port_cdefs), cached )
+
+    imp = s.import_component( m, ph_cfg, ip_cfg, symbols )
+
+    imp._ip_cfg = ip_cfg
+    imp._ph_cfg = ph_cfg
+    imp._ports = ports
+
+    # Dump configuration dict to config_file
+    with open( config_file, 'w' ) as fd:
+      json.dump( cfg_d, fd, indent = 4 )
+
+    return imp
+
+  #-----------------------------------------------------------------------
+  # prepare_import
+  #-----------------------------------------------------------------------
+  # Collect everything needed to build the verilator model of `m`.
+
+  def prepare_import( s, m ):
     c = s.__class__
     ph_cfg = m.get_metadata( c.get_placeholder_pass().placeholder_config )
     ip_cfg = m.get_metadata( c.import_config )
@@ -352,25 +470,61 @@ class VerilogVerilatorImportPass( BasePass ):
 
     cached, config_file, cfg_d = s.is_cached( m, ip_cfg )
 
-    s.create_verilator_model( m, ph_cfg, ip_cfg, cached )
+    return ph_cfg, ip_cfg, rtype, ports, cached, config_file, cfg_d
 
-    port_cdefs = s.create_verilator_c_wrapper( m, ph_cfg, ip_cfg, ports, cached )
+  #-----------------------------------------------------------------------
+  # build
+  #-----------------------------------------------------------------------
+  # Verilate `m` and compile it into a shared library. This only touches
+  # the files of `m` so it can run concurrently with other builds.
 
-    s.create_shared_lib( m, ph_cfg, ip_cfg, cached )
+  def build( s, m, info ):
+    ph_cfg, ip_cfg, _, ports, cached, _, cfg_d = info
+    cache = getattr( s, 'build_cache', None )
 
-    symbols = s.create_py_wrapper( m, ph_cfg, ip_cfg, rtype, ports, port_cdefs, cached )
+    if cached or cache is None:
+      s.create_verilator_model( m, ph_cfg, ip_cfg, cached )
 
-    imp = s.import_component( m, ph_cfg, ip_cfg, symbols )
+      port_cdefs = s.create_verilator_c_wrapper( m, ph_cfg, ip_cfg, ports, cached )
 
-    imp._ip_cfg = ip_cfg
-    imp._ph_cfg = ph_cfg
-    imp._ports = ports
+      s.create_shared_lib( m, ph_cfg, ip_cfg, cached )
 
-    # Dump configuration dict to config_file
-    with open( config_file, 'w' ) as fd:
-      json.dump( cfg_d, fd, indent = 4 )
+    else:
+      # The C wrapper is part of the cache key
+      port_cdefs = s.create_verilator_c_wrapper( m, ph_cfg, ip_cfg, ports, cached )
+
+      key = cache.get_key( ip_cfg, cfg_d )
+      with cache.lock( key ):
+        if cache.fetch( key, ip_cfg.get_shared_lib_path() ):
+          ip_cfg.vprint(f"{ip_cfg.translated_top_module} not built because it's "
+                        f"in the build cache {cache.cache_dir}!", 2)
+        else:
+          s.create_verilator_model( m, ph_cfg, ip_cfg, cached )
+          s.create_shared_lib( m, ph_cfg, ip_cfg, cached )
+          cache.store( key, ip_cfg.get_shared_lib_path() )
 
-    return imp
+    return port_cdefs
+
+  #-----------------------------------------------------------------------
+  # get_build_cache
+  #-----------------------------------------------------------------------
+
+  def get_build_cache( s ):
+    c = s.__class__
+    if s.top.has_metadata( c.vl_cache_dir ):
+      cache_dir = s.top.get_metadata( c.vl_cache_dir )
+    else:
+      cache_dir = os.environ.get( 'PYMTL_VL_CACHE_DIR', '' )
+
+    if not cache_dir:
+      return None
+
+    if s.top.has_metadata( c.vl_cache_size ):
+      cache_size = s.top.get_metadata( c.vl_cache_size )
+    else:
+      cache_size = int( os.environ.get( 'PYMTL_VL_CACHE_SIZE', 4 << 30 ) )
+
+    return VerilatorBuildCache( cache_dir, cache_size )
 
   #-----------------------------------------------------------------------
   # create_verilator_model
@@ -457,6 +611,14 @@ class VerilogVerilatorImportPass( BasePass ):
     make_indent( port_inits, 1 )
     port_inits = '\n'.join( port_inits )
 
+    # Generate the port copies of run_cycles
+    run_cycles_inputs, run_cycles_outputs, nin_words, nout_words = \
+        s.gen_run_cycles_c( ports )
+    make_indent( run_cycles_inputs, 2 )
+    make_indent( run_cycles_outputs, 2 )
+    run_cycles_inputs  = '\n'.join( run_cycles_inputs )
+    run_cycles_outputs = '\n'.join( run_cycles_outputs )
+
     # Fill in the C wrapper template
     with open( wrapper_name, 'w' ) as output:
       output.write( c_template.format( **locals() ) )
@@ -519,6 +681,7 @@ class VerilogVerilatorImportPass( BasePass ):
     ip_cfg.vprint("\n=====Generate PyMTL wrapper=====")
 
     wrapper_name = ip_cfg.get_py_wrapper_path()
+    s._port_buffers = {}
 
     # Port definitions of verilated model
     make_indent( port_cdefs, 4 )
@@ -541,6 +704,17 @@ class VerilogVerilatorImportPass( BasePass ):
     # Internal line trace
     in_line_trace = s.gen_internal_line_trace_py( ports )
 
+    # Port layout of run_cycles
+    run_cycles_inputs, run_cycles_outputs = s.gen_run_cycles_ports( ports )
+
+    # Buffers over the C ports, which are used to copy wide ports and
+    # are exposed as port_buffers
+    port_buffer_defs = [ f"{name} = {buf}" for name, buf in s._port_buffers.items() ]
+    port_buffers = [ f"{v_name!r}: s.ffi.buffer( _ffi_m.{c_name}, {s._get_c_nbytes(nbits)} )"
+                     for v_name, c_name, nbits in run_cycles_inputs + run_cycles_outputs ]
+    make_indent( port_buffer_defs, 2 )
+    make_indent( port_buffers, 3 )
+
     # External trace function definition
     if ip_cfg.vl_line_trace:
       external_trace_c_def = f'void trace( V{ip_cfg.translated_top_module}_t *, char * );'
@@ -568,6 +742,12 @@ class VerilogVerilatorImportPass( BasePass ):
         vl_trace_filename     = ip_cfg.vl_trace_filename,
         external_trace        = int(ip_cfg.vl_line_trace),
         trace_c_def           = external_trace_c_def,
+        port_buffer_defs      = '\n'.join( port_buffer_defs ),
+        port_buffers          = ',\n'.join( port_buffers ),
+        run_cycles_inputs     = [ ( x[0], x[2] ) for x in run_cycles_inputs ],
+        run_cycles_outputs    = [ ( x[0], x[2] ) for x in run_cycles_outputs ],
+        nin_words             = sum( (x[2]+31)//32 for x in run_cycles_inputs ),
+        nout_words            = sum( (x[2]+31)//32 for x in run_cycles_outputs ),
       )
       output.write( py_wrapper )
 
@@ -715,6 +895,65 @@ m->{name}{sub} = {deference}model->{name}{sub};
 
     return ret
 
+  #-------------------------------------------------------------------------
+  # gen_run_cycles_ports
+  #-------------------------------------------------------------------------
+  # Return the input and output ports exchanged by run_cycles in buffer
+  # order as lists of ( verilog name, C field name, nbits ). Arrays of
+  # ports are flattened and the clock is driven by seq_eval.
+
+  def gen_run_cycles_ports( s, ports ):
+    inputs, outputs = [], []
+    for pnames, v_name, port, _ in ports:
+      if not v_name or pnames == ['clk']:
+        continue
+      name   = s._verilator_name( v_name )
+      nbits  = s._get_c_nbits( port )
+      target = inputs if s._get_direction( port ) == 'InPort' else outputs
+      for idx in product( *[ range(n) for n in s._get_c_n_dim( port ) ] ):
+        sub = "".join( f"[{i}]" for i in idx )
+        target.append( ( v_name + sub, name + sub, nbits ) )
+    return inputs, outputs
+
+  #-------------------------------------------------------------------------
+  # gen_run_cycles_c
+  #-------------------------------------------------------------------------
+  # Return the C statements that copy the ports of one cycle from/to the
+  # word buffers of run_cycles, and the number of words per cycle.
+
+  def gen_run_cycles_c( s, ports ):
+    inputs, outputs = s.gen_run_cycles_ports( ports )
+
+    def mask( nbits ):
+      return f"0x{(1 << nbits) - 1:x}U"
+
+    in_srcs, k = [], 0
+    for _, name, nbits in inputs:
+      if nbits <= 32:
+        in_srcs.append( f"model->{name} = in[{k}] & {mask(nbits)};" )
+      elif nbits <= 64:
+        in_srcs.append( f"model->{name} = ( (QData) ( in[{k+1}] & {mask(nbits-32)} ) << 32 ) | in[{k}];" )
+      else:
+        for w in range( (nbits+31)//32 ):
+          in_srcs.append( f"model->{name}[{w}] = in[{k+w}] & {mask(min(32, nbits-32*w))};" )
+      k += (nbits+31)//32
+    nin_words = k
+
+    out_srcs, k = [], 0
+    for _, name, nbits in outputs:
+      if nbits <= 32:
+        out_srcs.append( f"out[{k}] = model->{name};" )
+      elif nbits <= 64:
+        out_srcs.append( f"out[{k}] = (uint32_t) model->{name};" )
+        out_srcs.append( f"out[{k+1}] = (uint32_t) ( model->{name} >> 32 );" )
+      else:
+        for w in range( (nbits+31)//32 ):
+          out_srcs.append( f"out[{k+w}] = model->{name}[{w}];" )
+      k += (nbits+31)//32
+    nout_words = k
+
+    return in_srcs, out_srcs, nin_words, nout_words
+
   #-------------------------------------------------------------------------
   # gen_signal_decl_py
   #-------------------------------------------------------------------------
@@ -1185,6 +1424,11 @@ m->{name}{sub} = {deference}model->{name}{sub};
   def _gen_ref_write( s, lhs, rhs, nbits, equal='=' ):
     if nbits <= 64:
       return [ '', f"{lhs}[0] {equal} int({rhs})" ]
+    elif sys.byteorder == 'little':
+      # Verilator stores wide signals as little-endian 32-bit words, so
+      # the whole value can be copied as bytes through a buffer
+      buf, nbytes = s._gen_port_buffer( lhs, nbits )
+      return [ '', f"{buf}[:] = int({rhs}).to_bytes( {nbytes}, 'little' )" ]
     else:
       ret = [ '', f'x = {lhs}' ]
       ITEM_BITWIDTH = 32
@@ -1198,6 +1442,9 @@ m->{name}{sub} = {deference}model->{name}{sub};
   def _gen_ref_read( s, lhs, rhs, nbits, equal='=' ):
     if nbits <= 64:
       return [ '', f"{lhs} {equal} {rhs}[0]" ]
+    elif sys.byteorder == 'little':
+      buf, _ = s._gen_port_buffer( rhs, nbits )
+      return [ '', f"{lhs} {equal} int.from_bytes( {buf}, 'little' )" ]
     else:
       ret = [ '', f'x = {rhs}' ]
       ITEM_BITWIDTH = 32
@@ -1209,6 +1456,21 @@ m->{name}{sub} = {deference}model->{name}{sub};
         ret.append( f"{lhs}[{l}:{r}] @= x[{idx}]" )
       return ret
 
+  def _gen_port_buffer( s, ref, nbits ):
+    # Create a buffer over the C port ref once in construct
+    name = '_buf' + s._pymtl_name_mangle( ref )
+    nbytes = s._get_c_nbytes( nbits )
+    s._port_buffers[ name ] = f"s.ffi.buffer( {ref}, {nbytes} )"
+    return name, nbytes
+
+  def _get_c_nbytes( s, nbits ):
+    # Size of the C type of a port in gen_signal_decl_c
+    if   nbits <= 8:  return 1
+    elif nbits <= 16: return 2
+    elif nbits <= 32: return 4
+    elif nbits <= 64: return 8
+    else:             return (nbits+31)//32*4
+
   def _gen_bits_decl( s, nbits ):
     if nbits < 256:
       return f'Bits{nbits}'
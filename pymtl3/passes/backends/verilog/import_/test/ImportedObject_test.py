@@ -6,13 +6,23 @@
 """Test if the imported object works correctly."""
 
 import gc
+from array import array
 from os.path import dirname
 
 import pytest
 
 from pymtl3 import DefaultPassGroup, Interface
 from pymtl3.datatypes import Bits1, Bits32, Bits48, Bits64, clog2, mk_bits
-from pymtl3.dsl import Component, InPort, Interface, OutPort, connect
+from pymtl3.dsl import (
+    Component,
+    InPort,
+    Interface,
+    OutPort,
+    Wire,
+    connect,
+    update,
+    update_ff,
+)
 from pymtl3.passes.backends.verilog import (
     VerilogPlaceholder,
     VerilogPlaceholderPass,
@@ -486,3 +496,105 @@ def test_reg_infer_external_trace( do_test ):
   assert a.line_trace() == 'q = 4294967295'
   a.sim_tick()
   a.finalize()
+
+def test_parallel_build():
+  # Multiple imported components are verilated concurrently, and
+  # instances of the same module share one build
+  class Adder( Component ):
+    def construct( s, n ):
+      s.in_ = InPort( Bits32 )
+      s.out = OutPort( Bits32 )
+      @update
+      def upblk():
+        s.out @= s.in_ + n
+  class Chain( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits32 )
+      s.out = OutPort( Bits32 )
+      s.adders = [ Adder( i % 3 ) for i in range(6) ]
+      s.adders[0].in_ //= s.in_
+      for i in range(5):
+        s.adders[i+1].in_ //= s.adders[i].out
+      s.out //= s.adders[5].out
+  m = Chain()
+  m.elaborate()
+  for adder in m.adders:
+    adder.set_metadata( VerilogTranslationImportPass.enable, True )
+  m.set_metadata( VerilogVerilatorImportPass.vl_jobs, 4 )
+  m.apply( VerilogPlaceholderPass() )
+  m = VerilogTranslationImportPass()( m )
+  m.apply( DefaultPassGroup() )
+  m.sim_reset()
+  for i in range(4):
+    m.in_ @= i
+    m.sim_eval_combinational()
+    assert m.out == i + 6
+  for adder in m.adders:
+    adder.finalize()
+
+def test_run_cycles():
+  # Batched stepping in C matches the cycle-by-cycle PyMTL simulation
+  class Acc( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits48 )
+      s.out = OutPort( Bits48 )
+      s.acc = Wire( Bits48 )
+      s.out //= s.acc
+      @update_ff
+      def upblk():
+        if s.reset:
+          s.acc <<= 0
+        else:
+          s.acc <<= s.acc + s.in_
+  m = Acc()
+  m.elaborate()
+  m.set_metadata( VerilogTranslationImportPass.enable, True )
+  m.apply( VerilogPlaceholderPass() )
+  m = VerilogTranslationImportPass()( m )
+  m.apply( DefaultPassGroup() )
+  m.sim_reset()
+
+  assert m.run_cycles_inputs == [ ( 'in_', 48 ), ( 'reset', 1 ) ]
+  assert m.run_cycles_outputs == [ ( 'out', 48 ) ]
+
+  n = 10
+  inputs  = array( 'I', [0] * (3*n) )
+  outputs = array( 'I', [0] * (2*n) )
+  assert inputs.itemsize == 4
+  for i in range(n):
+    x = (i + 1) << 40 | i
+    inputs[3*i], inputs[3*i+1] = x & 0xffffffff, x >> 32
+  m.run_cycles( inputs, outputs, n )
+
+  acc = 0
+  for i in range(n):
+    assert outputs[2*i] | outputs[2*i+1] << 32 == acc
+    acc = ( acc + ( (i + 1) << 40 | i ) ) & ((1 << 48) - 1)
+  m.finalize()
+
+def test_wide_port_buffers():
+  # Wide ports are copied as bytes and exposed through port_buffers
+  class Wide( Component ):
+    def construct( s ):
+      s.in_ = InPort( mk_bits(512) )
+      s.out = OutPort( mk_bits(512) )
+      @update
+      def upblk():
+        s.out @= ~s.in_
+  m = Wide()
+  m.elaborate()
+  m.set_metadata( VerilogTranslationImportPass.enable, True )
+  m.apply( VerilogPlaceholderPass() )
+  m = VerilogTranslationImportPass()( m )
+  m.apply( DefaultPassGroup() )
+  m.sim_reset()
+
+  x = ( 0xdeadbeef << 480 ) | ( 0x1234 << 100 ) | 42
+  m.in_ @= x
+  m.sim_eval_combinational()
+  assert m.out == ~mk_bits(512)( x )
+
+  assert len(m.port_buffers['in_']) == 64
+  assert int.from_bytes( m.port_buffers['in_'], 'little' ) == x
+  assert int.from_bytes( m.port_buffers['out'], 'little' ) == int(m.out)
+  m.finalize()
@@ -0,0 +1,82 @@
+#=========================================================================
+# VerilatorBuildCache_test.py
+#=========================================================================
+"""Test the shared build cache of the Verilator import pass."""
+
+import os
+import threading
+import time
+
+from ..VerilatorBuildCache import VerilatorBuildCache
+
+
+def _make_lib( path, nbytes ):
+  with open( path, 'wb' ) as fd:
+    fd.write( os.urandom( nbytes ) )
+  with open( path, 'rb' ) as fd:
+    return fd.read()
+
+def test_store_fetch( tmp_path ):
+  cache = VerilatorBuildCache( str(tmp_path / "cache"), 1 << 20 )
+  lib = str(tmp_path / "libA_v.so")
+  content = _make_lib( lib, 100 )
+
+  assert not cache.fetch( "a", lib )
+  cache.store( "a", lib )
+
+  os.remove( lib )
+  assert cache.fetch( "a", lib )
+  with open( lib, 'rb' ) as fd:
+    assert fd.read() == content
+
+def test_lru_eviction( tmp_path ):
+  cache = VerilatorBuildCache( str(tmp_path / "cache"), 250 )
+  lib = str(tmp_path / "lib.so")
+
+  now = time.time()
+  for i, key in enumerate( "abc" ):
+    _make_lib( lib, 100 )
+    cache.store( key, lib )
+    # Make the order of use independent of the timer resolution
+    os.utime( os.path.join( cache.cache_dir, key ), ( now + i, now + i ) )
+
+  # a was evicted when c was stored
+  assert not cache.fetch( "a", lib )
+  assert cache.fetch( "b", lib )
+  assert cache.fetch( "c", lib )
+
+  # b is used after c, so c is evicted next
+  os.utime( os.path.join( cache.cache_dir, "b" ), ( now + 10, now + 10 ) )
+  _make_lib( lib, 100 )
+  cache.store( "d", lib )
+  assert cache.fetch( "b", lib )
+  assert not cache.fetch( "c", lib )
+  assert cache.fetch( "d", lib )
+
+def test_lock_builds_once( tmp_path ):
+  cache_dir = str(tmp_path / "cache")
+  builds = []
+
+  def build( i ):
+    # Each worker has its own cache object like separate processes
+    cache = VerilatorBuildCache( cache_dir, 1 << 20 )
+    lib = str(tmp_path / f"lib{i}.so")
+    with cache.lock( "key" ):
+      if not cache.fetch( "key", lib ):
+        time.sleep( 0.05 )
+        builds.append( i )
+        _make_lib( lib, 100 )
+        cache.store( "key", lib )
+
+  threads = [ threading.Thread( target=build, args=(i,) ) for i in range(4) ]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+
+  assert len(builds) == 1
+  with open( tmp_path / f"lib{builds[0]}.so", 'rb' ) as fd:
+    content = fd.read()
+  for i in range(4):
+    with open( tmp_path / f"lib{i}.so", 'rb' ) as fd:
+      assert fd.read() == content
@@ -57,6 +57,7 @@ extern "C" {{
   void destroy_model( V{component_name}_t *);
   void comb_eval( V{component_name}_t * );
   void seq_eval( V{component_name}_t * );
+  void run_cycles( V{component_name}_t *, const uint32_t *, uint32_t *, unsigned int );
   void assert_en( bool en );
 
   #if VLINETRACE
@@ -233,6 +234,38 @@ void seq_eval( V{component_name}_t * m ) {{
   #endif
 }}
 
+//------------------------------------------------------------------------
+// run_cycles()
+//------------------------------------------------------------------------
+// Simulate n cycles without returning to Python. Each cycle reads
+// {nin_words} words of input port values from in and writes {nout_words}
+// words of output port values to out. The inputs are applied, the outputs
+// are recorded once the combinational logic settles, and then the clock
+// ticks, which is the same as one cycle of the PyMTL wrapper.
+
+void run_cycles( V{component_name}_t * m, const uint32_t * in, uint32_t * out,
+                 unsigned int n ) {{
+
+  V{component_name} * model = (V{component_name} *) m->model;
+
+  for ( unsigned int i = 0; i < n; i++ ) {{
+
+    // set inputs
+{run_cycles_inputs}
+
+    model->eval();
+
+    // record outputs
+{run_cycles_outputs}
+
+    seq_eval( m );
+
+    in  += {nin_words};
+    out += {nout_words};
+  }}
+
+}}
+
 //------------------------------------------------------------------------
 // assert_en()
 //------------------------------------------------------------------------
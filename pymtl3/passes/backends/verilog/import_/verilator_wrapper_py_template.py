@@ -23,6 +23,11 @@ from pymtl3.dsl import Component, connect, InPort, OutPort, Wire, update, update
 class {component_name}( Component ):
   id_ = 0
 
+  # Ports read and written by run_cycles as ( verilog name, nbits ) in
+  # buffer order. Each port takes (nbits+31)//32 32-bit words per cycle.
+  run_cycles_inputs  = {run_cycles_inputs}
+  run_cycles_outputs = {run_cycles_outputs}
+
   def __init__( s, *args, **kwargs ):
     s._finalization_count = 0
 
@@ -43,6 +48,7 @@ class {component_name}( Component ):
       void destroy_model( V{component_name}_t *);
       void comb_eval( V{component_name}_t * );
       void seq_eval( V{component_name}_t * );
+      void run_cycles( V{component_name}_t *, const uint32_t *, uint32_t *, unsigned int );
       void assert_en( bool en );
       {trace_c_def}
 
@@ -117,6 +123,19 @@ class {component_name}( Component ):
     _ffi_inst_comb_eval = s._ffi_inst.comb_eval
     _ffi_inst_seq_eval  = s._ffi_inst.seq_eval
 
+    # Zero-copy views of the ports of the verilated model keyed by the
+    # Verilog port names. Wide ports are little-endian arrays of 32-bit
+    # words, e.g., numpy.frombuffer( s.port_buffers['data'], numpy.uint32 ).
+    # Writes to input ports take effect at the next evaluation of the
+    # model, and are overwritten by the values of the PyMTL ports when the
+    # PyMTL simulation evaluates this component.
+    s.port_buffers = {{
+{port_buffers}
+    }}
+
+    # Buffers used to copy wide ports
+{port_buffer_defs}
+
     # declare the port interface
 {port_defs}
 
@@ -140,6 +159,20 @@ class {component_name}( Component ):
       # seq_eval will automatically tick clock in C land
       _ffi_inst_seq_eval( _ffi_m )
 
+  def run_cycles( s, inputs, outputs, n ):
+    """Simulate n cycles inside the verilated model.
+
+    inputs and outputs are buffers of 32-bit words such as uint32 NumPy
+    arrays of shape (n, {nin_words}) and (n, {nout_words}), laid out as
+    run_cycles_inputs and run_cycles_outputs. The ports of this component
+    are bypassed, so the values they hold are stale until the next cycle
+    of the PyMTL simulation."""
+    in_buf  = s.ffi.from_buffer( "uint32_t[]", inputs )
+    out_buf = s.ffi.from_buffer( "uint32_t[]", outputs, require_writable=True )
+    assert len(in_buf)  >= n * {nin_words},  "inputs is too small for n cycles!"
+    assert len(out_buf) >= n * {nout_words}, "outputs is too small for n cycles!"
+    s._ffi_inst.run_cycles( s._ffi_m, in_buf, out_buf, n )
+
   def assert_en( s, en ):
     # TODO: for verilator, any assertion failure will cause the C simulator
     # to abort, which results in a Python internal error. A better approach
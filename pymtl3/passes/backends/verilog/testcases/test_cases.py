@@ -60,6 +60,7 @@ from pymtl3.passes.testcases import (
     CaseFixedSizeSliceComp,
     CaseForLoopEmptySequenceComp,
     CaseForRangeLowerUpperStepPassThroughComp,
+    CaseFusedInplaceArithComp,
     CaseHeteroCompArrayComp,
     CaseIfBasicComp,
     CaseIfBoolOpInForStmtComp,
@@ -73,6 +74,7 @@ from pymtl3.passes.testcases import (
     CaseIntToBits32FooComp,
     CaseLambdaConnectComp,
     CaseLambdaConnectWithListComp,
+    CaseMemArrayRegFileComp,
     CaseNestedIfComp,
     CaseNestedStructPackedArrayUpblkComp,
     CasePartSelOverBitSelComp,
@@ -1435,6 +1437,71 @@ CaseFixedSizeSliceComp = set_attributes( CaseFixedSizeSliceComp,
     '''
 )
 
+CaseFusedInplaceArithComp = set_attributes( CaseFusedInplaceArithComp,
+    'REF_UPBLK',
+    '''\
+        always_comb begin : upblk
+          out = in0 + in1;
+          out = out - 8'd1;
+          out[3'd7:3'd4] = in1[3'd3:3'd0];
+        end
+    ''',
+    'REF_SRC',
+    '''\
+        module DUT_noparam
+        (
+          input logic [0:0] clk,
+          input logic [7:0] in0,
+          input logic [7:0] in1,
+          output logic [7:0] out,
+          input logic [0:0] reset
+        );
+
+          always_comb begin : upblk
+            out = in0 + in1;
+            out = out - 8'd1;
+            out[3'd7:3'd4] = in1[3'd3:3'd0];
+          end
+
+        endmodule
+    '''
+)
+
+CaseMemArrayRegFileComp = set_attributes( CaseMemArrayRegFileComp,
+    'REF_UPBLK',
+    '''\
+        always_ff @(posedge clk) begin : upblk
+          if ( wen ) begin
+            regs[waddr] <= wdata;
+          end
+          rdata <= regs[raddr];
+        end
+    ''',
+    'REF_SRC',
+    '''\
+        module DUT__use_mem_array_True
+        (
+          input logic [0:0] clk,
+          input logic [2:0] raddr,
+          output logic [31:0] rdata,
+          input logic [0:0] reset,
+          input logic [2:0] waddr,
+          input logic [31:0] wdata,
+          input logic [0:0] wen
+        );
+          logic [31:0] regs [0:7];
+
+          always_ff @(posedge clk) begin : upblk
+            if ( wen ) begin
+              regs[waddr] <= wdata;
+            end
+            rdata <= regs[raddr];
+          end
+
+        endmodule
+    '''
+)
+
 CaseBits32FooInBits32OutComp = set_attributes( CaseBits32FooInBits32OutComp,
     'REF_UPBLK',
     '''\
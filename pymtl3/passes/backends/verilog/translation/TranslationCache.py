@@ -0,0 +1,259 @@
+#=========================================================================
+# TranslationCache.py
+#=========================================================================
+"""Provide an on-disk cache of translated component definitions.
+
+Each entry is keyed by a hash of everything that determines the module
+definition of a component: its unique module name, its structural RTLIR
+type, the source files of its class, the arguments it was constructed
+with, the values of the globals and closure variables its update blocks
+use, its translation configs, the keys of all its children, and the
+source of the translator itself. A component whose
+key hits the cache skips behavioral RTLIR generation, type checking and
+code emission during translation."""
+
+import ast
+import builtins
+import inspect
+import json
+import os
+import tempfile
+from hashlib import blake2b
+from types import ModuleType
+
+from pymtl3.datatypes import is_bitstruct_class
+from pymtl3.dsl import Component
+from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.passes.rtlir import RTLIRDataType as rdt
+from pymtl3.passes.rtlir import RTLIRGetter
+from pymtl3.passes.rtlir import RTLIRType as rt
+from pymtl3.passes.rtlir import get_rtlir_dtype
+from pymtl3.passes.rtlir.RTLIRPass import RTLIRPass
+
+from ..util.utility import get_component_unique_name
+
+_translator_digests = {}
+
+def _hash_files( h, paths ):
+  for path in sorted( paths ):
+    h.update( path.encode() )
+    with open( path, 'rb' ) as fd:
+      h.update( fd.read() )
+
+def get_translator_digest( translator ):
+  """Return the hash of the source code of the translator and the RTLIR
+  passes it relies on."""
+  tr_type = type( translator )
+  if tr_type not in _translator_digests:
+    import pymtl3.passes.rtlir as rtlir
+
+    paths = set()
+    for cls in tr_type.__mro__:
+      if cls.__module__.startswith( 'pymtl3' ):
+        cls_dir = os.path.dirname( inspect.getsourcefile( cls ) )
+        paths.update( os.path.join( cls_dir, x ) for x in os.listdir( cls_dir )
+                      if x.endswith( '.py' ) )
+
+    rtlir_dir = os.path.dirname( rtlir.__file__ )
+    for dirpath, dirnames, filenames in os.walk( rtlir_dir ):
+      dirnames[:] = [ x for x in dirnames if x != 'test' ]
+      paths.update( os.path.join( dirpath, x ) for x in filenames
+                    if x.endswith( '.py' ) )
+
+    h = blake2b( digest_size = 20 )
+    _hash_files( h, paths )
+    _translator_digests[ tr_type ] = h.hexdigest()
+  return _translator_digests[ tr_type ]
+
+def get_rtype_desc( m, rtype ):
+  """Return a string that describes the structural RTLIR type of m.
+
+  Child components are only described by their names because their keys
+  are part of the key of m. Constants are described by their values."""
+
+  def describe( obj, rtype ):
+    if isinstance( rtype, rt.Component ):
+      return str( rtype )
+    if isinstance( rtype, rt.Const ):
+      return f"{rtype!r} = {obj!r}"
+    if isinstance( rtype, rt.Array ):
+      return f"Array{rtype.get_dim_sizes()} of " + \
+             " ".join( describe( x, y ) for x, y in _flatten( obj, rtype ) )
+    if isinstance( rtype, rt.InterfaceView ):
+      return f"{rtype!r}({describe_properties( obj, rtype )})"
+    return repr( rtype )
+
+  def describe_properties( obj, rtype ):
+    return ", ".join( f"{name}:{describe( getattr( obj, name ), prop )}"
+                      for name, prop in sorted( rtype.properties.items() ) )
+
+  return describe_properties( m, rtype )
+
+def _flatten( obj, rtype ):
+  if isinstance( obj, list ):
+    return [ x for y in obj for x in _flatten( y, rtype ) ]
+  return [ ( obj, rtype.get_sub_type() ) ]
+
+class _UpblkFreeVarCollector( ast.NodeVisitor ):
+  """Collect the values of the names and module attributes read by an
+  update block that are not signals or components."""
+
+  def __init__( s, blk ):
+    s.globals = blk.__globals__
+    s.closure = {}
+    for name, cell in zip( blk.__code__.co_freevars, blk.__closure__ or () ):
+      try:
+        s.closure[ name ] = cell.cell_contents
+      except ValueError:
+        pass
+    s.values = []
+
+  def resolve( s, node ):
+    """Return the ( name, value ) of a name or a module attribute."""
+    if isinstance( node, ast.Name ):
+      for ns in ( s.closure, s.globals, vars(builtins) ):
+        if node.id in ns:
+          return node.id, ns[ node.id ]
+    elif isinstance( node, ast.Attribute ):
+      parent = s.resolve( node.value )
+      if parent is not None and isinstance( parent[1], ModuleType ) and \
+         hasattr( parent[1], node.attr ):
+        return f"{parent[0]}.{node.attr}", getattr( parent[1], node.attr )
+    return None
+
+  def visit_Name( s, node ):
+    s.add( s.resolve( node ) )
+
+  def visit_Attribute( s, node ):
+    entry = s.resolve( node )
+    if entry is None:
+      s.generic_visit( node )
+    else:
+      s.add( entry )
+
+  def add( s, entry ):
+    if entry is not None and not isinstance( entry[1], ( ModuleType, NamedObject ) ):
+      s.values.append( ( entry[0], _describe_value( entry[1] ) ) )
+
+def _describe_value( value ):
+  if isinstance( value, type ):
+    if is_bitstruct_class( value ):
+      return get_rtlir_dtype( value() ).get_name()
+    return f"{value.__module__}.{value.__qualname__}"
+  if callable( value ) and hasattr( value, '__qualname__' ):
+    return f"{getattr( value, '__module__', '' )}.{value.__qualname__}"
+  return repr( value )
+
+def get_upblk_freevars( m ):
+  """Return a string that describes the values of the globals and closure
+  variables used by the update blocks of m."""
+  ret = []
+  for blk in sorted( m.get_update_blocks(), key = lambda x: x.__name__ ):
+    info = m.get_update_block_info( blk )
+    if info is None:
+      continue
+    collector = _UpblkFreeVarCollector( blk )
+    collector.visit( info[-1] )
+    ret.append( ( blk.__name__, sorted( set( collector.values ) ) ) )
+  return repr( ret )
+
+def has_struct_tmpvars( tmpvars ):
+  """Return True if any temporary variable is not a plain vector.
+
+  Struct types of temporary variables are only registered while the
+  behavioral part of a component is translated, so such components
+  cannot be loaded from the cache."""
+  return any( not isinstance( rtype.get_dtype(), rdt.Vector )
+              for rtype in tmpvars.values() )
+
+class TranslationCache:
+
+  def __init__( s, cache_dir ):
+    s.cache_dir = os.path.abspath( os.path.expanduser( cache_dir ) )
+    os.makedirs( s.cache_dir, exist_ok = True )
+
+  def get_keys( s, tr_top, tr_cfgs, translator, is_placeholder ):
+    """Return a dict that maps each component under tr_top to its key.
+
+    The key of a component is None if it cannot be cached, which is also
+    the case for all of its parents."""
+    tr_digest = get_translator_digest( translator )
+    # Share the RTLIR types with the structural RTLIR generation
+    if not tr_top.has_metadata( RTLIRPass.rtlir_getter ):
+      tr_top.set_metadata( RTLIRPass.rtlir_getter, RTLIRGetter(cache=True) )
+    rtlir_getter = tr_top.get_metadata( RTLIRPass.rtlir_getter )
+    file_digests = {}
+    keys = {}
+
+    def get_file_digest( path ):
+      if path not in file_digests:
+        h = blake2b( digest_size = 20 )
+        _hash_files( h, [ path ] )
+        file_digests[ path ] = h.hexdigest()
+      return file_digests[ path ]
+
+    def get_key( m ):
+      child_keys = [ get_key( child ) for child in m.get_child_components(repr) ]
+      keys[m] = None
+
+      if is_placeholder( m ) or None in child_keys:
+        return None
+
+      # Any module-level code of the class and its bases may affect the
+      # translation, so hash the whole source files
+      try:
+        files = [ get_file_digest( inspect.getsourcefile( cls ) )
+                  for cls in type(m).__mro__
+                  if issubclass( cls, Component ) and cls is not Component ]
+      except ( TypeError, OSError ):
+        return None
+
+      params = repr( ( type(m).__qualname__, m._dsl.args,
+                       sorted( m._dsl.kwargs.items() ),
+                       None if m._dsl.param_tree is None else m._dsl.param_tree.leaf ) )
+      # The unique name encodes the field widths of bitstruct arguments
+      # and the structural type covers the ports, wires and constants
+      m_rtype = rtlir_getter.get_rtlir( m )
+      structure = repr( ( get_component_unique_name( m_rtype ),
+                          get_rtype_desc( m, m_rtype ) ) )
+      # Module-level constants and bitstructs read by the update blocks
+      # are not part of the structure
+      freevars = get_upblk_freevars( m )
+      # Objects without a stable repr would never hit the cache
+      if any( ' at 0x' in x for x in ( params, structure, freevars ) ):
+        return None
+
+      if tr_cfgs and m in tr_cfgs:
+        cfgs = repr( sorted( ( k, getattr( tr_cfgs[m], k ) )
+                             for k in tr_cfgs[m].Options ) )
+      else:
+        cfgs = ''
+
+      h = blake2b( digest_size = 20 )
+      for x in [ tr_digest, params, structure, freevars, cfgs ] + files + child_keys:
+        h.update( x.encode() )
+        h.update( b'\0' )
+      keys[m] = h.hexdigest()
+      return keys[m]
+
+    get_key( tr_top )
+    return keys
+
+  def load( s, key ):
+    """Return the ( src, accessed ) entry of key, or None if key is not in
+    the cache."""
+    try:
+      with open( os.path.join( s.cache_dir, f"{key}.json" ) ) as fd:
+        entry = json.load( fd )
+      return entry['src'], set( entry['accessed'] )
+    except ( OSError, ValueError, KeyError ):
+      return None
+
+  def store( s, key, src, accessed ):
+    """Add the definition src of a component to the cache as key, where
+    accessed is the set of names accessed in its update blocks."""
+    fd, tmp = tempfile.mkstemp( dir = s.cache_dir, prefix = ".tmp" )
+    with os.fdopen( fd, 'w' ) as output:
+      json.dump( { 'src': src, 'accessed': sorted( accessed ) }, output )
+    # Concurrent translations may store the same entry
+    os.replace( tmp, os.path.join( s.cache_dir, f"{key}.json" ) )
@@ -14,12 +14,16 @@ from pymtl3.passes.backends.verilog.util.utility import verilog_reserved
 from ..VerilogPlaceholderPass import VerilogPlaceholderPass
 from .behavioral import VBehavioralTranslator as V_BTranslator
 from .structural import VStructuralTranslator as V_STranslator
+from .TranslationCache import has_struct_tmpvars
 
 
 def mk_VTranslator( _RTLIRTranslator, _STranslator, _BTranslator ):
 
   class _VTranslator( _RTLIRTranslator, _STranslator, _BTranslator ):
 
+    # An instance of TranslationCache set by the translation pass
+    cache = None
+
     def get_pretty( s, namespace, attr, newline=True ):
       ret = getattr(namespace, attr, "")
       if newline and (ret and ret[-1] != '\n'):
@@ -81,6 +85,32 @@ def mk_VTranslator( _RTLIRTranslator, _STranslator, _BTranslator ):
       ret += hierarchy.component_src
       return ret
 
+    def rtlir_tr_load_cached_components( s, tr_top ):
+      s._cache_keys = {}
+      if s.cache is None:
+        return {}
+
+      def is_placeholder( m ):
+        return m.has_metadata( VerilogPlaceholderPass.placeholder_config )
+
+      s._cache_keys = s.cache.get_keys( tr_top, s.tr_cfgs, s, is_placeholder )
+      # The top component is always translated because its module name
+      # is recorded during translation
+      s._cache_keys.pop( tr_top )
+
+      cached = {}
+      for m, key in s._cache_keys.items():
+        if key is not None:
+          entry = s.cache.load( key )
+          if entry is not None:
+            cached[m] = entry
+      return cached
+
+    def rtlir_tr_store_cached_component( s, m, src ):
+      key = s._cache_keys.get( m )
+      if key is not None and not has_struct_tmpvars( s.behavioral.tmpvars[m] ):
+        s.cache.store( key, src, s.behavioral.accessed[m] )
+
     def rtlir_tr_components( s, components ):
       return "\n\n".join( components.values() )
 
@@ -10,6 +10,7 @@ from pymtl3 import MetadataKey
 from pymtl3.passes.BasePass import BasePass
 
 from ..util.utility import verilog_cmp
+from .TranslationCache import TranslationCache
 from .VTranslator import VTranslator
 
 
@@ -71,6 +72,25 @@ class VerilogTranslationPass( BasePass ):
   #: Default value: ``False``
   no_synthesis_no_reset = MetadataKey(bool)
 
+  #: Directory of the translation cache shared by all working directories
+  #: and processes. Components whose source, parameters and translation
+  #: configs have not changed reuse their cached module definitions.
+  #: Only the value on the top component is used.
+  #:
+  #: Type: ``str``; input
+  #:
+  #: Default value: ``$PYMTL_TRANSLATION_CACHE_DIR`` if set, otherwise no
+  #: translation cache
+  translation_cache_dir = MetadataKey(str)
+
+  #: The number of processes that translate the behavioral part of unique
+  #: components in parallel. Only the value on the top component is used.
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: the number of CPUs
+  translation_jobs      = MetadataKey(int)
+
   # Translation pass output pass data
 
   #: An instance of :class:`TranslationConfigs` that contains the parsed options.
@@ -115,6 +135,23 @@ class VerilogTranslationPass( BasePass ):
     )
     return VerilogTranslationConfigs
 
+  def get_translation_cache( s ):
+    c = s.__class__
+    if s.top.has_metadata( c.translation_cache_dir ):
+      cache_dir = s.top.get_metadata( c.translation_cache_dir )
+    else:
+      cache_dir = os.environ.get( 'PYMTL_TRANSLATION_CACHE_DIR', '' )
+
+    if not cache_dir:
+      return None
+    return TranslationCache( cache_dir )
+
+  def get_translation_jobs( s ):
+    c = s.__class__
+    if s.top.has_metadata( c.translation_jobs ):
+      return s.top.get_metadata( c.translation_jobs )
+    return os.cpu_count() or 1
+
   def gen_tr_cfgs( s, m ):
     tr_cfgs = {}
 
@@ -132,6 +169,8 @@ class VerilogTranslationPass( BasePass ):
 
     if m.has_metadata( c.enable ) and m.get_metadata( c.enable ):
       m.set_metadata( c.translate_config, s.gen_tr_cfgs(m) )
+      s.translator.cache = s.get_translation_cache()
+      s.translator.jobs  = s.get_translation_jobs()
       s.translator.translate( m, m.get_metadata( c.translate_config ) )
 
       module_name = s.translator._top_module_full_name
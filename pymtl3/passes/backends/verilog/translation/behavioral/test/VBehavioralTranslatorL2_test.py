@@ -17,6 +17,7 @@ from ....testcases import (
     CaseFixedSizeSliceComp,
     CaseForLoopEmptySequenceComp,
     CaseForRangeLowerUpperStepPassThroughComp,
+    CaseFusedInplaceArithComp,
     CaseIfBasicComp,
     CaseIfBoolOpInForStmtComp,
     CaseIfDanglingElseInnerComp,
@@ -27,6 +28,7 @@ from ....testcases import (
     CaseIfTmpVarInForStmtComp,
     CaseLambdaConnectComp,
     CaseLambdaConnectWithListComp,
+    CaseMemArrayRegFileComp,
     CaseNestedIfComp,
     CaseReducesInx3OutComp,
     CaseTmpVarInUpdateffComp,
@@ -64,10 +66,12 @@ def run_test( case, m ):
       CaseIfBoolOpInForStmtComp,
       CaseIfTmpVarInForStmtComp,
       CaseFixedSizeSliceComp,
+      CaseFusedInplaceArithComp,
       CaseLambdaConnectComp,
       CaseLambdaConnectWithListComp,
       CaseBoolTmpVarComp,
       CaseTmpVarInUpdateffComp,
+      CaseMemArrayRegFileComp,
     ]
 )
 def test_verilog_behavioral_L2( case ):
@@ -0,0 +1,25 @@
+#=========================================================================
+# MemArrayTranslation_test.py
+#=========================================================================
+"""Test translating MemArray signals to unpacked arrays."""
+
+from pymtl3.passes.testcases import CaseMemArrayRegFileComp
+
+from ..VerilogTranslationPass import VerilogTranslationPass
+
+
+def _translate( m ):
+  m.elaborate()
+  m.set_metadata( VerilogTranslationPass.enable, True )
+  m.apply( VerilogTranslationPass() )
+  return m.get_metadata( VerilogTranslationPass.translator ).hierarchy.src
+
+def test_mem_array_translation():
+  src = _translate( CaseMemArrayRegFileComp.DUT( True ) )
+  assert "logic [31:0] regs [0:7];" in src
+  assert "rdata <= regs[raddr];" in src
+  assert "regs[waddr] <= wdata;" in src
+
+  # Same as the translation of a list of wires
+  ref = _translate( CaseMemArrayRegFileComp.DUT( False ) )
+  assert src.replace( "use_mem_array_True", "" ) == ref.replace( "use_mem_array_False", "" )
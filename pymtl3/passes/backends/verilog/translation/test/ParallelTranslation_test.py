@@ -0,0 +1,66 @@
+#=========================================================================
+# ParallelTranslation_test.py
+#=========================================================================
+"""Test translating unique components in parallel processes."""
+
+import pytest
+
+from pymtl3.datatypes import Bits4, Bits8
+from pymtl3.dsl import Component, InPort, OutPort, update
+from pymtl3.passes.rtlir.errors import PyMTLTypeError
+
+from ..VerilogTranslationPass import VerilogTranslationPass
+from ..VTranslator import VTranslator
+from .TranslationCache_test import CachePoint, Inc, Swap
+
+
+class Chain( Component ):
+  def construct( s, n ):
+    s.in_ = InPort( Bits4 )
+    s.out = OutPort( Bits4 )
+    s.pt_in  = InPort( CachePoint )
+    s.pt_out = OutPort( CachePoint )
+    s.incs = [ Inc( 4 ) for _ in range(n) ]
+    s.swap = Swap()
+    s.incs[0].in_ //= s.in_
+    for i in range(1, n):
+      s.incs[i].in_ //= s.incs[i-1].out
+    s.swap.in_ //= s.pt_in
+    s.pt_out //= s.swap.out
+    @update
+    def upblk():
+      s.out @= s.incs[-1].out ^ s.in_
+
+class BadInc( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits4 )
+    s.out = OutPort( Bits8 )
+    @update
+    def upblk():
+      s.out @= s.in_
+
+class BadChain( Chain ):
+  def construct( s ):
+    super().construct( 8 )
+    s.bad = BadInc()
+
+def _translate( m, jobs ):
+  m.elaborate()
+  m.set_metadata( VerilogTranslationPass.enable, True )
+  m.set_metadata( VerilogTranslationPass.translation_jobs, jobs )
+  m.apply( VerilogTranslationPass() )
+  return m.get_metadata( VerilogTranslationPass.translator )
+
+def test_parallel_translation( monkeypatch ):
+  monkeypatch.setattr( VTranslator, "min_parallel_components", 2 )
+  src = _translate( Chain( 8 ), 1 ).hierarchy.src
+
+  tr = _translate( Chain( 8 ), 4 )
+  assert len(tr.deferred_components) == 10
+  assert tr.hierarchy.src == src
+  assert "typedef struct packed" in src
+
+def test_parallel_translation_error( monkeypatch ):
+  monkeypatch.setattr( VTranslator, "min_parallel_components", 2 )
+  with pytest.raises( PyMTLTypeError ):
+    _translate( BadChain(), 4 )
@@ -0,0 +1,155 @@
+#=========================================================================
+# TranslationCache_test.py
+#=========================================================================
+"""Test the translation cache of the SystemVerilog translation pass."""
+
+import importlib
+import os
+import sys
+
+from pymtl3.datatypes import Bits1, bitstruct, mk_bits
+from pymtl3.dsl import Component, InPort, OutPort, update
+
+from ..VerilogTranslationPass import VerilogTranslationPass
+
+
+@bitstruct
+class CachePoint:
+  x : Bits1
+  y : Bits1
+
+class Inc( Component ):
+  def construct( s, nbits ):
+    s.in_ = InPort( mk_bits(nbits) )
+    s.out = OutPort( mk_bits(nbits) )
+    @update
+    def upblk():
+      s.out @= s.in_ + 1
+
+class Swap( Component ):
+  def construct( s ):
+    s.in_ = InPort( CachePoint )
+    s.out = OutPort( CachePoint )
+    @update
+    def upblk():
+      tmp = CachePoint( s.in_.y, s.in_.x )
+      s.out @= tmp
+
+class Top( Component ):
+  def construct( s, nbits ):
+    s.in_ = InPort( mk_bits(nbits) )
+    s.out = OutPort( mk_bits(nbits) )
+    s.out4 = OutPort( mk_bits(4) )
+    s.pt_in  = InPort( CachePoint )
+    s.pt_out = OutPort( CachePoint )
+    s.a = Inc( nbits )
+    s.b = Inc( nbits )
+    s.c = Inc( 4 )
+    s.d = Swap()
+    s.a.in_ //= s.in_
+    s.b.in_ //= s.a.out
+    s.c.in_ //= s.in_[0:4]
+    s.d.in_ //= s.pt_in
+    s.out4 //= s.c.out
+    s.pt_out //= s.d.out
+    @update
+    def upblk():
+      s.out @= s.b.out ^ s.in_
+
+def _translate( nbits, cache_dir ):
+  m = Top( nbits )
+  m.elaborate()
+  m.set_metadata( VerilogTranslationPass.enable, True )
+  m.set_metadata( VerilogTranslationPass.translation_cache_dir, cache_dir )
+  m.apply( VerilogTranslationPass() )
+  tr = m.get_metadata( VerilogTranslationPass.translator )
+  return m, tr
+
+def test_translation_cache( tmp_path, monkeypatch ):
+  monkeypatch.chdir( tmp_path )
+  cache_dir = str(tmp_path / "cache")
+
+  m, tr = _translate( 8, cache_dir )
+  assert not tr.cached_components
+  src = tr.hierarchy.src
+  # Inc(8), Inc(4); the top and Swap with a struct temporary are not cached
+  assert len(os.listdir( cache_dir )) == 2
+
+  m, tr = _translate( 8, cache_dir )
+  assert tr.hierarchy.src == src
+  assert set( tr.cached_components ) == { m.a, m.b, m.c }
+  # The struct definition is still emitted
+  assert "typedef struct packed" in tr.hierarchy.src
+
+  # Only the components with changed parameters are translated again
+  m, tr = _translate( 16, cache_dir )
+  assert set( tr.cached_components ) == { m.c }
+  assert "Inc__nbits_16" in tr.hierarchy.src
+
+_msgs_src = """\
+from pymtl3.datatypes import Bits8, Bits16, bitstruct
+W = {w}
+@bitstruct
+class Msg:
+  a : {a_type}
+  b : Bits8
+"""
+
+_comps_src = """\
+import msgs
+from pymtl3.datatypes import Bits8
+from pymtl3.dsl import Component, InPort, OutPort, update
+class Child( Component ):
+  def construct( s, T ):
+    s.in_ = InPort( T )
+    s.out = OutPort( T )
+    s.x   = OutPort( Bits8 )
+    @update
+    def upblk():
+      s.out @= s.in_
+      s.x @= msgs.W
+class Parent( Component ):
+  def construct( s ):
+    s.in_ = InPort( msgs.Msg )
+    s.out = OutPort( msgs.Msg )
+    s.x   = OutPort( Bits8 )
+    s.c = Child( msgs.Msg )
+    s.c.in_ //= s.in_
+    s.out //= s.c.out
+    s.x //= s.c.x
+"""
+
+def test_translation_cache_dependency( tmp_path, monkeypatch ):
+  monkeypatch.chdir( tmp_path )
+  monkeypatch.syspath_prepend( str(tmp_path) )
+  monkeypatch.setattr( sys, 'dont_write_bytecode', True )
+  cache_dir = str(tmp_path / "cache")
+  (tmp_path / "comps.py").write_text( _comps_src )
+
+  def translate( w, a_type ):
+    (tmp_path / "msgs.py").write_text( _msgs_src.format( w=w, a_type=a_type ) )
+    for name in [ 'msgs', 'comps' ]:
+      monkeypatch.delitem( sys.modules, name, raising=False )
+    comps = importlib.import_module( 'comps' )
+    m = comps.Parent()
+    m.elaborate()
+    m.set_metadata( VerilogTranslationPass.enable, True )
+    m.set_metadata( VerilogTranslationPass.translation_cache_dir, cache_dir )
+    m.apply( VerilogTranslationPass() )
+    tr = m.get_metadata( VerilogTranslationPass.translator )
+    return m, tr
+
+  m, tr = translate( 8, 'Bits8' )
+  m, tr = translate( 8, 'Bits8' )
+  assert set( tr.cached_components ) == { m.c }
+
+  # A module-level constant read by the update block changed
+  m, tr = translate( 4, 'Bits8' )
+  assert not tr.cached_components
+  assert "8'd4" in tr.hierarchy.src
+
+  # A field of the bitstruct argument changed
+  m, tr = translate( 4, 'Bits16' )
+  assert not tr.cached_components
+  assert "module Child__T_Msg__a_16__b_8" in tr.hierarchy.src
+  assert "Msg__a_8__b_8" not in tr.hierarchy.src
@@ -0,0 +1,365 @@
+"""
+========================================================================
+GenLaneUpblkPass.py
+========================================================================
+Generate a vectorized version of every update block from its behavioral
+RTLIR. The generated block operates on LaneBits values and evaluates
+the update block once for all lanes:
+
+- if/else and conditional expressions become boolean lane masks, and
+  every assignment only updates the lanes whose mask is set;
+- for loops have constant bounds and stay Python loops;
+- indexing an array or a vector with a signal becomes a gather/scatter
+  across the elements.
+
+Only translatable (pure RTL) update blocks over Bits signals are
+supported.
+"""
+import linecache
+
+from pymtl3.extra.pypy import custom_exec
+from pymtl3.passes.BasePass import BasePass, PassMetadata
+from pymtl3.passes.errors import ModelTypeError
+from pymtl3.passes.rtlir import BehavioralRTLIR as bir
+from pymtl3.passes.rtlir import BehavioralRTLIRGenPass, BehavioralRTLIRTypeCheckPass
+from pymtl3.passes.rtlir import RTLIRDataType as rdt
+from pymtl3.passes.rtlir import RTLIRType as rt
+
+from .LaneBits import (
+    LaneBits,
+    concat,
+    gather,
+    lift,
+    mux,
+    reduce_and,
+    reduce_or,
+    reduce_xor,
+    scatter,
+    sext,
+    size_cast,
+    to_mask,
+    trunc,
+    zext,
+)
+
+
+class GenLaneUpblkPass( BasePass ):
+
+  def __init__( self, nlanes ):
+    self.nlanes = nlanes
+
+  def __call__( self, top ):
+    top._lanes = PassMetadata()
+    top._lanes.nlanes = self.nlanes
+    top._lanes.upblk_mapping = upblk_mapping = {}
+
+    for m in sorted( top._dsl.all_components, key=repr ):
+      if not m.get_update_blocks():
+        continue
+
+      BehavioralRTLIRGenPass( top )( m )
+      BehavioralRTLIRTypeCheckPass( top )( m )
+
+      rtlir_upblks = m.get_metadata( BehavioralRTLIRGenPass.rtlir_upblks )
+      for blk in m.get_update_blocks():
+        upblk_mapping[ blk ] = LaneUpblkGenerator( m, self.nlanes ).enter( blk, rtlir_upblks[ blk ] )
+
+#-------------------------------------------------------------------------
+# LaneUpblkGenerator
+#-------------------------------------------------------------------------
+
+class LaneUpblkGenerator( bir.BehavioralRTLIRNodeVisitor ):
+
+  binops = {
+    bir.Add: '+', bir.Sub: '-', bir.Mult: '*', bir.Div: '//', bir.Mod: '%',
+    bir.Pow: '**', bir.ShiftLeft: '<<', bir.ShiftRightLogic: '>>',
+    bir.BitAnd: '&', bir.BitOr: '|', bir.BitXor: '^',
+    bir.Eq: '==', bir.NotEq: '!=', bir.Lt: '<', bir.LtE: '<=',
+    bir.Gt: '>', bir.GtE: '>=',
+  }
+  unaryops = { bir.Invert: '~', bir.UAdd: '+', bir.USub: '-' }
+  reduces  = { bir.BitAnd: '_reduce_and', bir.BitOr: '_reduce_or',
+               bir.BitXor: '_reduce_xor' }
+
+  def __init__( s, component, nlanes ):
+    s.component = component
+    s.nlanes    = nlanes
+
+  def enter( s, blk, rtlir ):
+    s.blk      = blk
+    s.globals  = {
+      's'           : s.component,
+      '_lift'       : lift,
+      '_to_mask'    : to_mask,
+      '_and_mask'   : and_mask,
+      '_andnot_mask': andnot_mask,
+      '_mux'        : mux,
+      '_concat'     : concat,
+      '_zext'       : zext,
+      '_sext'       : sext,
+      '_trunc'      : trunc,
+      '_size_cast'  : size_cast,
+      '_reduce_and' : reduce_and,
+      '_reduce_or'  : reduce_or,
+      '_reduce_xor' : reduce_xor,
+      '_gather'     : gather,
+      '_scatter'    : scatter,
+      '_zeros'      : lambda nbits: LaneBits.zeros( nbits, s.nlanes ),
+    }
+    s.consts   = {}
+    s.tmpvars  = {}
+    s.n_masks  = 0
+    s.nonblocking = isinstance( rtlir, bir.SeqUpblk )
+
+    body = s.gen_stmts( rtlir.body, 'None', '  ' )
+    inits = [ f"  _tmp_{x} = _zeros({nbits})" for x, nbits in s.tmpvars.items() ]
+
+    name  = blk.__name__
+    lines = [ f"def {name}():" ] + inits + body + [ "  pass" ]
+    src   = "\n".join( lines )
+
+    filename = f"Lane upblk {s.component!r}.{name}"
+    _locals = {}
+    custom_exec( compile( src, filename=filename, mode="exec" ), s.globals, _locals )
+    linecache.cache[ filename ] = (len(src), None, lines, filename)
+    return _locals[ name ]
+
+  #-----------------------------------------------------------------------
+  # Helpers
+  #-----------------------------------------------------------------------
+
+  def error( s, node, msg ):
+    return ModelTypeError( f"Bits-only translatable update blocks. {s.blk.__name__}: {msg}" )
+
+  def get_nbits( s, node ):
+    dtype = node.Type.get_dtype()
+    if isinstance( dtype, rdt.Struct ):
+      raise s.error( node, f"bitstruct {dtype.get_name()} is not supported" )
+    return dtype.get_length()
+
+  def get_const( s, value, nbits ):
+    key = ( int(value), nbits )
+    if key not in s.consts:
+      name = f"_c{len(s.consts)}"
+      s.consts[ key ] = name
+      s.globals[ name ] = LaneBits.const( nbits, int(value) )
+    return s.consts[ key ]
+
+  def is_static( s, node ):
+    """ Return True if the value of node is the same in all lanes. """
+    if hasattr( node, '_value' ) or isinstance( node, bir.LoopVar ):
+      return True
+    if isinstance( node, bir.Attribute ) and isinstance( node.Type, rt.Const ):
+      return True
+    if isinstance( node, bir.BinOp ) or isinstance( node, bir.Compare ):
+      return s.is_static( node.left ) and s.is_static( node.right )
+    if isinstance( node, bir.UnaryOp ):
+      return s.is_static( node.operand )
+    if isinstance( node, bir.SizeCast ):
+      return s.is_static( node.value )
+    return False
+
+  def static_src( s, node ):
+    """ Return the source of a lane-invariant index as a Python int. """
+    if hasattr( node, '_value' ):
+      return str( int(node._value) )
+    if isinstance( node, bir.LoopVar ):
+      return node.name
+    return f"int({s.visit( node )})"
+
+  #-----------------------------------------------------------------------
+  # Statements
+  #-----------------------------------------------------------------------
+
+  def gen_stmts( s, stmts, mask, indent ):
+    lines = []
+    for stmt in stmts:
+      lines.extend( s.visit( stmt, mask, indent ) )
+    return lines
+
+  def visit_Assign( s, node, mask, indent ):
+    value = s.visit( node.value )
+    lines = []
+    if len( node.targets ) > 1:
+      lines.append( f"{indent}_v = {value}" )
+      value = "_v"
+
+    for target in node.targets:
+      if isinstance( target, bir.TmpVar ):
+        s.tmpvars[ target.name ] = s.get_nbits( target )
+        lines.append( f"{indent}_tmp_{target.name}.assign( {value}, {mask} )" )
+      else:
+        lines.append( f"{indent}{s.gen_target( target, value, mask )}" )
+    return lines
+
+  def gen_target( s, node, value, mask ):
+    nb = s.nonblocking
+
+    # Only the outermost index of a target can differ across lanes,
+    # otherwise gather would return a copy
+    x = node.value if isinstance( node, ( bir.Index, bir.Slice ) ) else node
+    while isinstance( x, ( bir.Attribute, bir.Index, bir.Slice ) ):
+      if isinstance( x, bir.Index ) and not s.is_static( x.idx ):
+        raise s.error( node, "signal index in the middle of an assignment target" )
+      x = x.value
+
+    if isinstance( node, bir.Index ):
+      obj = s.visit( node.value )
+      if isinstance( node.value.Type, rt.Array ):
+        if s.is_static( node.idx ):
+          return f"{obj}[{s.static_src( node.idx )}].{'assign_next' if nb else 'assign'}( {value}, {mask} )"
+        return f"_scatter( {obj}, {s.visit( node.idx )}, {value}, {mask}, {nb} )"
+
+      if s.is_static( node.idx ):
+        idx = s.static_src( node.idx )
+        return f"{obj}.assign_slice( {idx}, {idx}+1, {value}, {mask}, {nb} )"
+      return f"{obj}.assign_part( {s.visit( node.idx )}, 1, {value}, {mask}, {nb} )"
+
+    if isinstance( node, bir.Slice ):
+      obj = s.visit( node.value )
+      if node.base is None:
+        lo, hi = s.static_src( node.lower ), s.static_src( node.upper )
+        return f"{obj}.assign_slice( {lo}, {hi}, {value}, {mask}, {nb} )"
+      if s.is_static( node.base ):
+        base = s.static_src( node.base )
+        return f"{obj}.assign_slice( {base}, {base}+{node.size}, {value}, {mask}, {nb} )"
+      return f"{obj}.assign_part( {s.visit( node.base )}, {node.size}, {value}, {mask}, {nb} )"
+
+    s.get_nbits( node )
+    return f"{s.visit( node )}.{'assign_next' if nb else 'assign'}( {value}, {mask} )"
+
+  def visit_If( s, node, mask, indent ):
+    cond = s.visit( node.cond )
+    s.n_masks += 1
+    m = f"_m{s.n_masks}"
+    c = f"_cond{s.n_masks}"
+
+    # The condition is sampled once so that writes in the if-body cannot
+    # move lanes into the else-branch
+    lines = [ f"{indent}{c} = _to_mask( {cond} )",
+              f"{indent}{m} = _and_mask( {mask}, {c} )",
+              f"{indent}if {m}.any():" ]
+    lines.extend( s.gen_stmts( node.body, m, indent + '  ' ) )
+
+    if node.orelse:
+      lines.append( f"{indent}{m} = _andnot_mask( {mask}, {c} )" )
+      lines.append( f"{indent}if {m}.any():" )
+      lines.extend( s.gen_stmts( node.orelse, m, indent + '  ' ) )
+    return lines
+
+  def visit_For( s, node, mask, indent ):
+    if not ( s.is_static( node.start ) and s.is_static( node.end ) and
+             s.is_static( node.step ) ):
+      raise s.error( node, "for loop bounds must be constants" )
+
+    lines = [ f"{indent}for {node.var.name} in range( {s.static_src( node.start )}, "
+              f"{s.static_src( node.end )}, {s.static_src( node.step )} ):" ]
+    lines.extend( s.gen_stmts( node.body, mask, indent + '  ' ) )
+    return lines
+
+  #-----------------------------------------------------------------------
+  # Expressions
+  #-----------------------------------------------------------------------
+
+  def visit( s, node, *args ):
+    if not args and hasattr( node, '_value' ) and isinstance( node.Type, rt.Signal ):
+      return s.get_const( node._value, s.get_nbits( node ) )
+    return super().visit( node, *args )
+
+  def generic_visit( s, node, *args ):
+    raise s.error( node, f"{node.__class__.__name__} is not supported" )
+
+  def visit_Number( s, node ):
+    return s.get_const( node.value, s.get_nbits( node ) )
+
+  def visit_LoopVar( s, node ):
+    return f"_lift( {node.name}, {s.get_nbits( node )} )"
+
+  def visit_TmpVar( s, node ):
+    return f"_tmp_{node.name}"
+
+  def visit_FreeVar( s, node ):
+    name = f"_fv_{node.name}"
+    s.globals[ name ] = node.obj
+    return name
+
+  def visit_Base( s, node ):
+    return 's'
+
+  def visit_Attribute( s, node ):
+    if isinstance( node.value.Type, rt.Signal ):
+      raise s.error( node, f"bitstruct field {node.attr} is not supported" )
+
+    src = f"{s.visit( node.value )}.{node.attr}"
+    if isinstance( node.Type, rt.Const ) and isinstance( node.Type.get_dtype(), rdt.Vector ):
+      obj = node.Type.get_object()
+      if obj is not None:
+        return s.get_const( obj, s.get_nbits( node ) )
+      return f"_lift( {src}, {s.get_nbits( node )} )"
+    return src
+
+  def visit_Index( s, node ):
+    obj = s.visit( node.value )
+
+    if isinstance( node.value.Type, rt.Array ):
+      if s.is_static( node.idx ):
+        return f"{obj}[{s.static_src( node.idx )}]"
+      if not isinstance( node.Type, rt.Signal ):
+        raise s.error( node, "signal index into an array of non-signals" )
+      return f"_gather( {obj}, {s.visit( node.idx )}, {s.get_nbits( node )} )"
+
+    s.get_nbits( node.value )
+    if s.is_static( node.idx ):
+      return f"{obj}[{s.static_src( node.idx )}]"
+    return f"{obj}.get_part( {s.visit( node.idx )}, 1 )"
+
+  def visit_Slice( s, node ):
+    obj = s.visit( node.value )
+    s.get_nbits( node.value )
+
+    if node.base is None:
+      return f"{obj}[{s.static_src( node.lower )}:{s.static_src( node.upper )}]"
+    if s.is_static( node.base ):
+      base = s.static_src( node.base )
+      return f"{obj}[{base}:{base}+{node.size}]"
+    return f"{obj}.get_part( {s.visit( node.base )}, {node.size} )"
+
+  def visit_BinOp( s, node ):
+    return f"({s.visit( node.left )} {s.binops[ node.op.__class__ ]} {s.visit( node.right )})"
+
+  def visit_Compare( s, node ):
+    return f"({s.visit( node.left )} {s.binops[ node.op.__class__ ]} {s.visit( node.right )})"
+
+  def visit_UnaryOp( s, node ):
+    return f"({s.unaryops[ node.op.__class__ ]}{s.visit( node.operand )})"
+
+  def visit_IfExp( s, node ):
+    return f"_mux( {s.visit( node.cond )}, {s.visit( node.body )}, {s.visit( node.orelse )} )"
+
+  def visit_Concat( s, node ):
+    return f"_concat( {', '.join( s.visit( x ) for x in node.values )} )"
+
+  def visit_ZeroExt( s, node ):
+    return f"_zext( {s.visit( node.value )}, {s.get_nbits( node )} )"
+
+  def visit_SignExt( s, node ):
+    return f"_sext( {s.visit( node.value )}, {s.get_nbits( node )} )"
+
+  def visit_Truncate( s, node ):
+    return f"_trunc( {s.visit( node.value )}, {s.get_nbits( node )} )"
+
+  def visit_SizeCast( s, node ):
+    return f"_size_cast( {s.visit( node.value )}, {s.get_nbits( node )} )"
+
+  def visit_Reduce( s, node ):
+    return f"{s.reduces[ node.op.__class__ ]}( {s.visit( node.value )} )"
+
+def and_mask( mask, cond ):
+  if mask is None:
+    return cond
+  return mask & cond
+
+def andnot_mask( mask, cond ):
+  if mask is None:
+    return ~cond
+  return mask & ~cond
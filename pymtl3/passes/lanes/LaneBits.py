@@ -0,0 +1,398 @@
+"""
+========================================================================
+LaneBits.py
+========================================================================
+A LaneBits object holds the values of one signal across all N lanes of a
+multi-lane simulation in a NumPy array of shape (N,). Values up to 64
+bits are stored as uint64 and wider values as Python integers in object
+arrays. Constants are stored as arrays of shape (1,) so that they
+broadcast against the lanes.
+
+All the operators are elementwise and truncate the result to the
+bitwidth like Bits does. The assign* methods take an optional boolean
+lane mask that we use to implement if/else statements, where only the
+lanes that take the branch are updated.
+"""
+import numpy as np
+
+from pymtl3.datatypes import Bits
+
+
+def _dtype( nbits ):
+  return np.uint64 if nbits <= 64 else object
+
+def _mask( nbits ):
+  m = (1 << nbits) - 1
+  return np.uint64(m) if nbits <= 64 else m
+
+class LaneBits:
+  __slots__ = ( '_nbits', '_v', '_next' )
+
+  def __init__( self, nbits, v ):
+    self._nbits = nbits
+    self._v     = v
+    self._next  = None
+
+  @staticmethod
+  def zeros( nbits, nlanes ):
+    return LaneBits( nbits, np.zeros( nlanes, dtype=_dtype(nbits) ) )
+
+  @staticmethod
+  def const( nbits, value ):
+    return LaneBits( nbits, np.array( [ int(value) & ((1 << nbits) - 1) ],
+                                      dtype=_dtype(nbits) ) )
+
+  @property
+  def nbits( self ):
+    return self._nbits
+
+  @property
+  def lanes( self ):
+    """ The NumPy array that holds the value of every lane. """
+    return self._v
+
+  def _operand( self, other ):
+    if isinstance( other, LaneBits ):
+      v = other._v
+      if self._nbits > 64 and other._nbits <= 64:
+        v = v.astype( object )
+      elif self._nbits <= 64 and other._nbits > 64:
+        v = (v & ((1 << 64) - 1)).astype( np.uint64 )
+      return v
+    if isinstance( other, np.ndarray ):
+      return other.astype( _dtype(self._nbits) ) & _mask(self._nbits)
+    v = int(other) & ((1 << self._nbits) - 1)
+    return np.uint64(v) if self._nbits <= 64 else v
+
+  def clone( self ):
+    return LaneBits( self._nbits, self._v.copy() )
+
+  def __deepcopy__( self, memo ):
+    return self.clone()
+
+  #-----------------------------------------------------------------------
+  # Assignments
+  #-----------------------------------------------------------------------
+
+  def __imatmul__( self, other ):
+    self._v[:] = self._operand( other )
+    return self
+
+  def __ilshift__( self, other ):
+    if self._next is None:
+      self._next = self._v.copy()
+    self._next[:] = self._operand( other )
+    return self
+
+  def _flip( self ):
+    self._v[:] = self._next
+
+  def assign( self, other, mask=None ):
+    if mask is None:
+      self._v[:] = self._operand( other )
+    else:
+      np.copyto( self._v, self._operand( other ), where=mask )
+
+  def assign_next( self, other, mask=None ):
+    if self._next is None:
+      self._next = self._v.copy()
+    if mask is None:
+      self._next[:] = self._operand( other )
+    else:
+      np.copyto( self._next, self._operand( other ), where=mask )
+
+  def assign_slice( self, start, stop, other, mask=None, nonblocking=False ):
+    if nonblocking:
+      if self._next is None:
+        self._next = self._v.copy()
+      dst = self._next
+    else:
+      dst = self._v
+
+    nbits = stop - start
+    if isinstance( other, LaneBits ):
+      v = other._v & _mask( min( nbits, other._nbits ) )
+      v = v.astype( self._v.dtype ) if v.dtype != self._v.dtype else v
+    else:
+      v = self._operand( other ) & ( _mask(nbits) if self._nbits <= 64 else (1 << nbits) - 1 )
+
+    if self._nbits <= 64:
+      shift = np.uint64(start)
+      field = np.uint64( ((1 << stop) - 1) ^ ((1 << start) - 1) )
+    else:
+      shift = start
+      field = ((1 << stop) - 1) ^ ((1 << start) - 1)
+    new = (dst & ~field & _mask(self._nbits)) | (v << shift)
+
+    if mask is None: dst[:] = new
+    else:            np.copyto( dst, new, where=mask )
+
+  def assign_part( self, base, nbits, other, mask=None, nonblocking=False ):
+    """ Assign to a part selection [base:base+nbits] where base differs
+    across lanes. """
+    base = self._operand( base )
+    for i in range( self._nbits - nbits + 1 ):
+      m = ( base == i ) if mask is None else ( mask & ( base == i ) )
+      if m.any():
+        self.assign_slice( i, i + nbits, other, m, nonblocking )
+
+  #-----------------------------------------------------------------------
+  # Slicing
+  #-----------------------------------------------------------------------
+
+  def __getitem__( self, idx ):
+    if isinstance( idx, slice ):
+      start, stop = int(idx.start or 0), int(idx.stop or self._nbits)
+      assert 0 <= start < stop <= self._nbits, \
+        f"Invalid access: [{start}:{stop}] in a {self._nbits}-bit LaneBits"
+      return self._extract( start, stop - start )
+
+    if isinstance( idx, LaneBits ):
+      return self.get_part( idx, 1 )
+
+    i = int(idx)
+    assert 0 <= i < self._nbits, \
+      f"Invalid access: [{i}] in a {self._nbits}-bit LaneBits"
+    return self._extract( i, 1 )
+
+  def __setitem__( self, idx, v ):
+    if isinstance( idx, slice ):
+      start, stop = int(idx.start or 0), int(idx.stop or self._nbits)
+      self.assign_slice( start, stop, v )
+    elif isinstance( idx, LaneBits ):
+      self.assign_part( idx, 1, v )
+    else:
+      i = int(idx)
+      self.assign_slice( i, i+1, v )
+
+  def _extract( self, start, nbits ):
+    v = self._v
+    if self._nbits <= 64:
+      v = ( v >> np.uint64(start) ) & _mask(nbits)
+    else:
+      v = ( v >> start ) & _mask(nbits)
+      if nbits <= 64:
+        v = v.astype( np.uint64 )
+    return LaneBits( nbits, v )
+
+  def get_part( self, base, nbits ):
+    """ Return the part selection [base:base+nbits] where base differs
+    across lanes. Out-of-range lanes read zero. """
+    base = self._operand( base )
+    ret  = LaneBits( nbits, np.zeros( np.broadcast( self._v, base ).shape,
+                                      dtype=_dtype(nbits) ) )
+    for i in range( self._nbits - nbits + 1 ):
+      np.copyto( ret._v, self._extract( i, nbits )._v, where=( base == i ) )
+    return ret
+
+  #-----------------------------------------------------------------------
+  # Arithmetics
+  #-----------------------------------------------------------------------
+
+  def __add__( self, other ):
+    return LaneBits( self._nbits, (self._v + self._operand(other)) & _mask(self._nbits) )
+
+  def __radd__( self, other ):
+    return self.__add__( other )
+
+  def __sub__( self, other ):
+    return LaneBits( self._nbits, (self._v - self._operand(other)) & _mask(self._nbits) )
+
+  def __rsub__( self, other ):
+    return LaneBits( self._nbits, (self._operand(other) - self._v) & _mask(self._nbits) )
+
+  def __mul__( self, other ):
+    return LaneBits( self._nbits, (self._v * self._operand(other)) & _mask(self._nbits) )
+
+  def __rmul__( self, other ):
+    return self.__mul__( other )
+
+  # Division by zero yields zero in every lane instead of raising
+
+  def __floordiv__( self, other ):
+    b = self._operand(other)
+    with np.errstate( divide='ignore' ):
+      if self._nbits > 64:
+        b = np.where( b == 0, 1, b )
+        return LaneBits( self._nbits, np.where( self._operand(other) == 0, 0, self._v // b ) )
+      return LaneBits( self._nbits, self._v // b )
+
+  def __mod__( self, other ):
+    b = self._operand(other)
+    with np.errstate( divide='ignore' ):
+      if self._nbits > 64:
+        b = np.where( b == 0, 1, b )
+        return LaneBits( self._nbits, np.where( self._operand(other) == 0, 0, self._v % b ) )
+      return LaneBits( self._nbits, self._v % b )
+
+  def __pow__( self, other ):
+    return LaneBits( self._nbits, (self._v ** self._operand(other)) & _mask(self._nbits) )
+
+  def __lshift__( self, other ):
+    b = self._operand(other)
+    if self._nbits <= 64:
+      v = np.where( b >= self._nbits, np.uint64(0),
+                    self._v << np.minimum( b, np.uint64(63) ) )
+      return LaneBits( self._nbits, v & _mask(self._nbits) )
+    return LaneBits( self._nbits, (self._v << b) & _mask(self._nbits) )
+
+  def __rshift__( self, other ):
+    b = self._operand(other)
+    if self._nbits <= 64:
+      v = np.where( b >= self._nbits, np.uint64(0),
+                    self._v >> np.minimum( b, np.uint64(63) ) )
+      return LaneBits( self._nbits, v )
+    return LaneBits( self._nbits, self._v >> b )
+
+  def __and__( self, other ):
+    return LaneBits( self._nbits, self._v & self._operand(other) )
+
+  def __rand__( self, other ):
+    return self.__and__( other )
+
+  def __or__( self, other ):
+    return LaneBits( self._nbits, self._v | self._operand(other) )
+
+  def __ror__( self, other ):
+    return self.__or__( other )
+
+  def __xor__( self, other ):
+    return LaneBits( self._nbits, self._v ^ self._operand(other) )
+
+  def __rxor__( self, other ):
+    return self.__xor__( other )
+
+  def __invert__( self ):
+    return LaneBits( self._nbits, ~self._v & _mask(self._nbits) )
+
+  def __neg__( self ):
+    return LaneBits( self._nbits, (_mask(self._nbits) - self._v + 1) & _mask(self._nbits) )
+
+  def __pos__( self ):
+    return self
+
+  # Comparisons return 1-bit LaneBits
+
+  def _cmp( self, v ):
+    return LaneBits( 1, v.astype( np.uint64 ) )
+
+  def __eq__( self, other ):
+    return self._cmp( self._v == self._operand(other) )
+
+  def __ne__( self, other ):
+    return self._cmp( self._v != self._operand(other) )
+
+  def __lt__( self, other ):
+    return self._cmp( self._v < self._operand(other) )
+
+  def __le__( self, other ):
+    return self._cmp( self._v <= self._operand(other) )
+
+  def __gt__( self, other ):
+    return self._cmp( self._v > self._operand(other) )
+
+  def __ge__( self, other ):
+    return self._cmp( self._v >= self._operand(other) )
+
+  __hash__ = None
+
+  def __bool__( self ):
+    raise TypeError( "The truth value of a LaneBits is ambiguous, please use .lanes" )
+
+  def __int__( self ):
+    assert self._v.shape == (1,), "Only a LaneBits constant can be converted to int"
+    return int(self._v[0])
+
+  def __index__( self ):
+    return self.__int__()
+
+  def to_bits( self, lane ):
+    return Bits( self._nbits, int(self._v[ lane if self._v.shape[0] > 1 else 0 ]) )
+
+  def __repr__( self ):
+    return f"LaneBits{self._nbits}({self._v!r})"
+
+  def __str__( self ):
+    n = (self._nbits - 1) // 4 + 1
+    vals = [ f"{int(x):0{n}x}" for x in self._v[:4] ]
+    if self._v.shape[0] > 4:
+      vals.append( "..." )
+    return "|".join( vals )
+
+#-------------------------------------------------------------------------
+# Helper functions used by the generated update blocks
+#-------------------------------------------------------------------------
+
+def lift( value, nbits ):
+  if isinstance( value, LaneBits ):
+    return value
+  return LaneBits.const( nbits, value )
+
+def to_mask( cond ):
+  return cond._v.astype( bool )
+
+def mux( cond, a, b ):
+  nbits = max( a.nbits, b.nbits )
+  return LaneBits( nbits, np.where( to_mask(cond), a._v, b._v ) )
+
+def concat( *args ):
+  nbits = sum( x.nbits for x in args )
+  if nbits <= 64:
+    v = np.uint64(0)
+    for x in args:
+      v = ( v << np.uint64(x.nbits) ) | x._v
+  else:
+    v = 0
+    for x in args:
+      v = ( v << x.nbits ) | x._v.astype( object )
+  return LaneBits( nbits, v )
+
+def zext( value, nbits ):
+  return LaneBits( nbits, value._v.astype( _dtype(nbits) ) )
+
+def trunc( value, nbits ):
+  return LaneBits( nbits, (value._v & _mask(nbits)).astype( _dtype(nbits) ) )
+
+def sext( value, nbits ):
+  old  = value.nbits
+  sign = ( value._v >> ( np.uint64(old-1) if old <= 64 else old-1 ) ) & 1
+  v    = value._v.astype( _dtype(nbits) )
+  ext  = _mask(nbits) ^ ( _mask(old) if nbits <= 64 else (1 << old) - 1 )
+  return LaneBits( nbits, v | ( sign.astype( _dtype(nbits) ) * ext ) )
+
+def size_cast( value, nbits ):
+  if value.nbits >= nbits:
+    return trunc( value, nbits )
+  return zext( value, nbits )
+
+def reduce_and( value ):
+  return LaneBits( 1, ( value._v == _mask(value.nbits) ).astype( np.uint64 ) )
+
+def reduce_or( value ):
+  return LaneBits( 1, ( value._v != 0 ).astype( np.uint64 ) )
+
+def reduce_xor( value ):
+  if value.nbits > 64:
+    return LaneBits( 1, np.array( [ bin(x).count('1') & 1 for x in value._v ],
+                                  dtype=np.uint64 ) )
+  v = value._v
+  for i in ( 32, 16, 8, 4, 2, 1 ):
+    v = v ^ ( v >> np.uint64(i) )
+  return LaneBits( 1, v & np.uint64(1) )
+
+def gather( array, idx, nbits ):
+  """ Read array[idx] where idx differs across lanes. """
+  idx = idx._v
+  ret = LaneBits( nbits, np.zeros( idx.shape, dtype=_dtype(nbits) ) )
+  for i, x in enumerate( array ):
+    np.copyto( ret._v, lift( x, nbits )._v, where=( idx == i ) )
+  return ret
+
+def scatter( array, idx, value, mask=None, nonblocking=False ):
+  """ Write array[idx] where idx differs across lanes. """
+  idx = idx._v
+  for i, x in enumerate( array ):
+    m = ( idx == i ) if mask is None else ( mask & ( idx == i ) )
+    if m.any():
+      if nonblocking: x.assign_next( value, m )
+      else:           x.assign( value, m )
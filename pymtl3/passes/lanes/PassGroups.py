@@ -0,0 +1,25 @@
+from ..BasePass import BasePass
+from ..sim.GenDAGPass import GenDAGPass
+from ..sim.SimpleSchedulePass import SimpleSchedulePass
+from ..tracing.LineTraceParamPass import LineTraceParamPass
+from .GenLaneUpblkPass import GenLaneUpblkPass
+from .PrepareLaneSimPass import PrepareLaneSimPass
+
+
+# MultiLaneSim simulates nlanes independent copies of a pure-RTL design
+# at once. Every Bits signal becomes a LaneBits value backed by a NumPy
+# array, and every update block is evaluated once for all lanes.
+class MultiLaneSim( BasePass ):
+  def __init__( s, nlanes, *, print_line_trace=True, reset_active_high=True ):
+    s.nlanes = nlanes
+    s.print_line_trace = print_line_trace
+    s.reset_active_high = reset_active_high
+
+  def __call__( s, top ):
+    LineTraceParamPass()( top )
+    GenDAGPass()( top )
+    SimpleSchedulePass()( top )
+    GenLaneUpblkPass( s.nlanes )( top )
+
+    PrepareLaneSimPass(print_line_trace=s.print_line_trace,
+                       reset_active_high=s.reset_active_high)( top )
@@ -0,0 +1,81 @@
+"""
+========================================================================
+PrepareLaneSimPass.py
+========================================================================
+Replace the update blocks in the schedule with their vectorized version
+generated by GenLaneUpblkPass, and lock in the simulation with LaneBits
+values instead of Bits values. Net blocks generated by GenDAGPass and
+the flip function only use @= and _flip() so we reuse them as is.
+"""
+from pymtl3.datatypes import Bits
+from pymtl3.dsl import MemArray
+from pymtl3.passes.errors import ModelTypeError, PassOrderError
+
+from ..sim.PrepareSimPass import PrepareSimPass
+from .LaneBits import LaneBits
+
+
+class PrepareLaneSimPass( PrepareSimPass ):
+
+  def __call__( self, top ):
+    if not hasattr( top, "_lanes" ):
+      raise PassOrderError( "_lanes" )
+    if not hasattr( top, "_sched" ):
+      raise PassOrderError( "_sched" )
+
+    mapping = top._lanes.upblk_mapping
+    top._sched.update_schedule = [ mapping.get( x, x ) for x in top._sched.update_schedule ]
+    top._sched.schedule_ff     = [ mapping.get( x, x ) for x in top._sched.schedule_ff ]
+
+    super().__call__( top )
+
+  @staticmethod
+  def create_lock_unlock_simulation( top ):
+    PrepareSimPass.create_lock_unlock_simulation( top )
+
+    lock_bits_simulation = top.lock_in_simulation
+    nlanes = top._lanes.nlanes
+
+    def lock_in_simulation():
+      lock_bits_simulation()
+
+      # Swap the Bits objects with LaneBits objects. Signals in the same
+      # net share the same Bits object, so they will share the same
+      # LaneBits object as well.
+
+      lane_values = {}
+      mapping     = top._sim.signal_object_mapping
+
+      for obj, (current_obj, i, is_list, value) in mapping.items():
+        Type = obj._dsl.Type
+        if not issubclass( Type, Bits ):
+          raise ModelTypeError( f"Bits signals. {obj!r} is of type {Type.__name__}" )
+        if isinstance( obj, MemArray ):
+          raise ModelTypeError( f"Bits signals. {obj!r} is a MemArray" )
+
+        if id(value) not in lane_values:
+          lane_value = LaneBits.zeros( Type.nbits, nlanes )
+          lane_value @= int(value)
+          if obj._dsl.needs_double_buffer:
+            lane_value <<= lane_value
+          lane_values[ id(value) ] = ( value, lane_value )
+        lane_value = lane_values[ id(value) ][1]
+
+        mapping[ obj ] = (current_obj, i, is_list, lane_value)
+        if is_list: current_obj[i] = lane_value
+        else:       setattr( current_obj, i, lane_value )
+
+      # Regenerate the function that checks top level inports
+
+      inports = [ mapping[x] for x in top._dsl.all_signals
+                  if x.is_input_value_port() and x.is_top_level_signal() and
+                     x.get_host_component() is top ]
+
+      def check_top_level_inports():
+        for current_obj, i, is_list, value in inports:
+          assert ( current_obj[i] if is_list else getattr( current_obj, i ) ) is value, \
+                 f"Please use @= to assign top level InPort top.{i}"
+
+      top._sim.check_top_level_inports = check_top_level_inports
+
+    top.lock_in_simulation = lock_in_simulation
@@ -0,0 +1,2 @@
+from .LaneBits import LaneBits
+from .PassGroups import MultiLaneSim
@@ -0,0 +1,184 @@
+"""
+========================================================================
+MultiLaneSim_test.py
+========================================================================
+Check that every lane of a multi-lane simulation matches a normal
+simulation of the same design with the same stimulus.
+"""
+import random
+
+import pytest
+
+from pymtl3 import *
+from pymtl3.passes.errors import ModelTypeError
+
+np = pytest.importorskip("numpy")
+
+from ..PassGroups import MultiLaneSim
+
+
+def _check_lanes( cls, inputs, outputs, ncycles=20, nlanes=8 ):
+  rng = random.Random(0xdeadbeef)
+
+  stimulus = { name: [ [ rng.randint( 0, (1 << nbits) - 1 ) for _ in range(nlanes) ]
+                       for _ in range(ncycles) ] for name, nbits in inputs }
+
+  ref = []
+  for lane in range(nlanes):
+    m = cls()
+    m.apply( DefaultPassGroup(print_line_trace=False) )
+    m.sim_reset()
+    trace = []
+    for t in range(ncycles):
+      for name, _ in inputs:
+        port = getattr( m, name )
+        port @= stimulus[name][t][lane]
+      m.sim_eval_combinational()
+      trace.append( [ int(getattr( m, name )) for name in outputs ] )
+      m.sim_tick()
+    ref.append( trace )
+
+  m = cls()
+  m.elaborate()
+  m.apply( MultiLaneSim( nlanes, print_line_trace=False ) )
+  m.sim_reset()
+  for t in range(ncycles):
+    for name, _ in inputs:
+      port = getattr( m, name )
+      port @= np.array( stimulus[name][t], dtype=object )
+    m.sim_eval_combinational()
+    for k, name in enumerate( outputs ):
+      lanes = getattr( m, name ).lanes
+      assert [ int(x) for x in lanes ] == [ ref[lane][t][k] for lane in range(nlanes) ]
+    m.sim_tick()
+
+def test_accumulator():
+
+  class Acc( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.en  = InPort()
+      s.out = OutPort( Bits8 )
+      s.acc = Wire( Bits8 )
+
+      @update_ff
+      def up_acc():
+        if s.reset:
+          s.acc <<= 0
+        elif s.en:
+          s.acc <<= s.acc + s.in_
+
+      s.out //= s.acc
+
+  _check_lanes( Acc, [ ('in_', 8), ('en', 1) ], [ 'out' ] )
+
+def test_if_body_writes_condition():
+
+  class WriteCond( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits2 )
+      s.out = OutPort( Bits2 )
+
+      @update
+      def up_out():
+        s.out @= s.in_
+        if s.out == 0:
+          s.out @= 1
+        else:
+          s.out @= 2
+
+  _check_lanes( WriteCond, [ ('in_', 2) ], [ 'out' ] )
+
+def test_regfile_dynamic_index():
+
+  class RegFile( Component ):
+    def construct( s, nregs=4 ):
+      s.raddr = InPort( Bits2 )
+      s.waddr = InPort( Bits2 )
+      s.wdata = InPort( Bits16 )
+      s.wen   = InPort()
+      s.rdata = OutPort( Bits16 )
+      s.rbit  = OutPort()
+      s.regs  = [ Wire( Bits16 ) for _ in range(nregs) ]
+
+      @update_ff
+      def up_write():
+        if s.wen:
+          s.regs[ s.waddr ] <<= s.wdata
+
+      @update
+      def up_read():
+        s.rdata @= s.regs[ s.raddr ]
+        s.rbit  @= s.wdata[ zext( s.raddr, 4 ) ]
+
+  _check_lanes( RegFile, [ ('raddr', 2), ('waddr', 2), ('wdata', 16), ('wen', 1) ],
+                [ 'rdata', 'rbit' ] )
+
+def test_comb_datapath():
+
+  class Datapath( Component ):
+    def construct( s ):
+      s.a   = InPort( Bits8 )
+      s.b   = InPort( Bits8 )
+      s.sel = InPort( Bits2 )
+      s.x   = OutPort( Bits16 )
+      s.y   = OutPort( Bits16 )
+      s.z   = OutPort( Bits8 )
+      s.r   = OutPort()
+
+      @update
+      def up_x():
+        s.x @= concat( s.a, s.b[0:4], s.b[4:8] )
+        s.y @= sext( s.a, 16 ) + zext( s.b, 16 )
+        s.r @= reduce_xor( s.a ) | ( s.a == s.b )
+
+      @update
+      def up_z():
+        tmp = Bits8(0)
+        for i in range(4):
+          if s.sel == i:
+            tmp = s.a >> i
+        s.z @= tmp if s.sel != 3 else ~s.b - 1
+
+  _check_lanes( Datapath, [ ('a', 8), ('b', 8), ('sel', 2) ], [ 'x', 'y', 'z', 'r' ] )
+
+def test_wide_signals():
+
+  class Wide( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits96 )
+      s.out = OutPort( Bits96 )
+      s.lo  = OutPort( Bits32 )
+      s.reg = Wire( Bits96 )
+
+      @update_ff
+      def up_reg():
+        s.reg <<= ( s.reg ^ s.in_ ) << 3
+
+      @update
+      def up_out():
+        s.out @= s.reg + s.in_
+        s.lo  @= s.reg[64:96]
+
+  _check_lanes( Wide, [ ('in_', 96) ], [ 'out', 'lo' ] )
+
+def test_bitstruct_not_supported():
+
+  @bitstruct
+  class Msg:
+    a: Bits8
+    b: Bits8
+
+  class Top( Component ):
+    def construct( s ):
+      s.in_ = InPort( Msg )
+      s.out = OutPort( Bits8 )
+
+      @update
+      def up():
+        s.out @= s.in_.a
+
+  m = Top()
+  m.elaborate()
+  with pytest.raises( ModelTypeError ):
+    m.apply( MultiLaneSim( 4 ) )
@@ -170,3 +170,7 @@ class HeuristicTopoPass( UnrollSimPass ):
           Q.put( (branchiness[ v ], id(v)) )
 
     check_schedule( top, update_schedule, V, E, InD )
+
+    # Net blocks of aliased nets don't need to run
+    alias_genblks = top._dag.alias_genblks
+    update_schedule[:] = [ x for x in update_schedule if x not in alias_genblks ]
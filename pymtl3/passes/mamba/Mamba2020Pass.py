@@ -8,19 +8,18 @@
 # Author : Shunning Jiang
 # Date   : Feb 14, 2020
 
+import linecache
 import os
-from collections import defaultdict, deque
+from collections import deque
 
-import py
-
-from pymtl3.datatypes import Bits, is_bitstruct_class
 from pymtl3.dsl import MethodPort
 from pymtl3.dsl.errors import UpblkCyclicError
+from pymtl3.extra.disk_cache import cached_compile
 from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 from pymtl3.passes.errors import PassOrderError
 
-from ..sim.DynamicSchedulePass import kosaraju_scc
+from ..sim.DynamicSchedulePass import gen_scc_worklist_block, kosaraju_scc
 from ..sim.SimpleSchedulePass import SimpleSchedulePass, dump_dag
 from .HeuristicTopoPass import CountBranchesLoops
 from .UnrollSimPass import UnrollSimPass
@@ -38,11 +37,13 @@ class Mamba2020Pass( UnrollSimPass ):
       raise Exception("Some schedule pass has already been applied!")
 
     top._sched = PassMetadata()
+    top._sched.scc_counters = {}
 
     # Extract branchiness first
     # Initialize all generated net block to 0 branchiness
 
     self.meta_block_id = 0
+    self.alias_genblks = top._dag.alias_genblks
     self.branchiness = { x: 0 for x in top._dag.genblks }
     self.only_loop_at_top = { x: False for x in top._dag.genblks }
     v = CountBranchesLoops()
@@ -91,6 +92,9 @@ class Mamba2020Pass( UnrollSimPass ):
     meta_id = self.meta_block_id
     self.meta_block_id += 1
 
+    # Net blocks of aliased nets don't need to run
+    blocks = [ b for b in blocks if b not in self.alias_genblks ]
+
     # Create custom global dict for all blocks inside the meta block
     _globals = { f"blk{i}": b for i, b in enumerate( blocks ) }
 
@@ -104,11 +108,14 @@ class Mamba2020Pass( UnrollSimPass ):
         blk_srcs.append( f"blk{i}() # {b.__name__}" )
 
     gen_src = f"def meta_block{meta_id}():\n  "
-    gen_src += "\n  ".join( blk_srcs )
+    gen_src += "\n  ".join( blk_srcs ) or "pass"
 
-    # use custom_exec to compile the meta block
+    # use custom_exec to compile the meta block. The code object only
+    # depends on the source so it can come from the disk cache.
     _locals = {}
-    custom_exec( py.code.Source( gen_src ).compile(), _globals, _locals )
+    fname = f"meta_block{meta_id}"
+    custom_exec( cached_compile( gen_src, fname ), _globals, _locals )
+    linecache.cache[ fname ] = (len(gen_src), None, gen_src.splitlines(True), fname)
     ret = _locals[ f'meta_block{meta_id}' ]
     if _DEBUG: print(gen_src)
 
@@ -261,180 +268,25 @@ class Mamba2020Pass( UnrollSimPass ):
             Q.append( v )
             visited.add( v )
 
+      tmp_schedule = [ x for x in tmp_schedule if x not in self.alias_genblks ]
+
       variables = set()
       for (u, v) in E:
         # Collect all variables that triggers other blocks in the SCC
         if u in scc and v in scc:
-          variables.update( constraint_objs[ (u, v) ] )
+          variables.update( constraint_objs.get( (u, v), () ) )
 
       if len(variables) == 0:
         raise UpblkCyclicError("There is a cyclic dependency without involving variables."
                         "Probably a loop that involves blocks that should be update_once:\n{}"\
                         .format(", ".join( [ x.__name__ for x in scc] )))
 
-      # generate a loop for scc
-      # Shunning: we just simply loop over the whole SCC block
-      # TODO performance optimizations using Mamba techniques within a SCC block
-
-      template = """
-from copy import deepcopy
-def wrapped_SCC_{0}():
-  N = 0
-  while True:
-    N += 1
-    if N > 100:
-      raise UpblkCyclicError("Combinational loop detected at runtime in {{{4}}} after 100 iters!")
-    {1}
-    {3}
-    {2}
-    # print( "SCC block{0} is executed", N, "times" )
-    break
-generated_block = wrapped_SCC_{0}
-"""
-
-      # clean up non-top variables if top is there. For slices of Bits
-      # we directly use the top level wide Bits since Bits clone is
-      # rpython code
-
-      final_variables = set()
-
-      for x in sorted( variables, key=repr ):
-        w = x.get_top_level_signal()
-        if w is x:
-          final_variables.add( x )
-          continue
-
-        # w is not x
-        if issubclass( w._dsl.Type, Bits ):
-          if w not in final_variables:
-            final_variables.add( w )
-        elif is_bitstruct_class( w._dsl.Type ):
-          if w not in final_variables:
-            final_variables.add( x )
-        else:
-          final_variables.add( x )
-
-      # also group them by common ancestor to reduce byte code
-      # TODO use longest-common-prefix (LCP) algorithms ...
-
-      final_var_host = defaultdict(list)
-      for x in final_variables:
-        final_var_host[ x.get_host_component() ].append( x )
-
-      # Then, we generate the Python code that saves variables at the
-      # beginning of each SCC iteration and the code that checks if the
-      # values of those variables have changed
-      copy_srcs  = []
-      check_srcs = []
-
-      var_id = 0
-      for host, var_list in final_var_host.items():
-        hostlen = len(repr(host))
-
-        copy_srcs.append( f"host = {host!r}" )
-        check_srcs.append( f"host = {host!r}" )
-
-        sub_check_srcs = []
-
-        for var in var_list:
-          var_id += 1
-          subname = repr(var)[hostlen+1:]
-          if issubclass( var._dsl.Type, Bits ):     copy_srcs.append( f"t{var_id}=host.{subname}.clone()" )
-          elif is_bitstruct_class( var._dsl.Type ): copy_srcs.append( f"t{var_id}=host.{subname}.clone()" )
-          else:                                     copy_srcs.append( f"t{var_id}=deepcopy(host.{subname})" )
-
-          sub_check_srcs.append( f"host.{subname} != t{var_id}" )
-
-        check_srcs.append( f"if { ' or '.join(sub_check_srcs)}: continue" )
-
-      # Divide all blks into meta blocks
-      # Branchiness factor is the bound of branchiness in a meta block.
-      branchiness_factor = 20
-      branchy_block_factor = 6
-
-      num_blks = 0  # sanity check
-      cur_meta, cur_br, cur_count = [], 0, 0
-      scc_schedule = []
-
-      _globals = { 's': top, 'UpblkCyclicError': UpblkCyclicError }
-      blk_srcs = []
-
-      # If there is only 10 blocks, we directly unroll it
-      if len(tmp_schedule) < 10:
-        blk_srcs = []
-        for i, b in enumerate(tmp_schedule):
-          blk_srcs.append( f"blk{i}() # [br {self.branchiness[b]}, loop {int(self.only_loop_at_top[b])}] {b.__name__}" )
-          _globals[f"blk{i}"] = b # put it into the block's closure
-
-      else:
-        for i, blk in enumerate( tmp_schedule ):
-          # Same here. If an update block only has top-level loop, br = 0
-          br = 0 if self.only_loop_at_top[blk] else self.branchiness[blk]
-          if cur_br == 0:
-            cur_meta.append( blk )
-            cur_br += br
-            cur_count += (br > 0)
-            if cur_br >= branchiness_factor or cur_count >= branchy_block_factor:
-              num_blks += len(cur_meta)
-              scc_schedule.append( cur_meta )
-              cur_meta, cur_br, cur_count = [], 0, 0 # clear
-          else:
-            if br == 0:
-              # If no branchy block available, directly start a new metablock
-              num_blks += len(cur_meta)
-              scc_schedule.append( cur_meta )
-              cur_meta, cur_br, cur_count = [ blk ], br, (br > 0)
-            else:
-              cur_meta.append( blk )
-              cur_br += br
-              cur_count += (br > 0)
-
-              if cur_br + br >= branchiness_factor or cur_count + 1 >= branchy_block_factor:
-                num_blks += len(cur_meta)
-                scc_schedule.append( cur_meta )
-                cur_meta, cur_br, cur_count = [], 0, 0 # clear
-
-        if cur_meta:
-          num_blks += len(cur_meta)
-          scc_schedule.append( cur_meta )
-
-        assert num_blks == len(tmp_schedule), f"Some blocks are missing during trace breaking of SCC "\
-                                              f"({num_blks} compiled, {len(tmp_schedule)} total)"
-
-        blk_srcs = []
-
-        if len(scc_schedule) == 1:
-          for i, b in enumerate( scc_schedule[-1] ):
-            blk_srcs.append( f"blk{i}() # [br {self.branchiness[b]}, loop {int(self.only_loop_at_top[b])}] {b.__name__}" )
-            _globals[ f"blk{i}" ] = b
-
-        else:
-          # TODO we might turn all meta blocks before the last one into meta
-          # blocks, and directly fold the last block into the main loop
-          # for i, meta in enumerate( scc_schedule[:-1] ):
-            # b = self.compile_meta_block( meta )
-            # blk_srcs.append( f"{b.__name__}()" )
-            # _globals[ b.__name__ ] = b
-
-          # for i, b in enumerate( scc_schedule[-1] ):
-            # blk_srcs.append( f"blk_of_last_meta{i}() # [br {self.branchiness[b]}, loop {int(self.only_loop_at_top[b])}] {b.__name__}" )
-            # _globals[ f"blk_of_last_meta{i}" ] = b
-
-          for i, meta in enumerate( scc_schedule ):
-            b = self.compile_meta_block( meta )
-            blk_srcs.append( f"{b.__name__}()" )
-            _globals[ b.__name__ ] = b
-
-
-      scc_block_src = template.format( scc_id, "; ".join( copy_srcs ), "\n    ".join( check_srcs ),
-                                       '\n    '.join(blk_srcs),
-                                       ", ".join( [ x.__name__ for x in scc] ) )
-
-      if _DEBUG: print(scc_block_src, "\n", "="*100 )
-
-      _locals  = {}
-      custom_exec(py.code.Source( scc_block_src ).compile(), _globals, _locals)
-      return _locals[ 'generated_block' ]
+      # Generate a worklist block that only re-executes the blocks that
+      # read the changed variables
+      scc_blk, counter = gen_scc_worklist_block( top, scc_id, scc, tmp_schedule, E,
+                                                 constraint_objs, self.alias_genblks )
+      top._sched.scc_counters[ scc_blk ] = counter
+      return scc_blk
 
     # Now we generate meta blocks for each SCC and produce final schedule
 
@@ -573,6 +425,8 @@ generated_block = wrapped_SCC_{0}
       # if _DEBUG: print( f"blk_of_last_meta{i}() # [br {self.branchiness[b]}, loop {int(self.only_loop_at_top[b])}] {b.__name__}" )
     if len(schedule) == 1:
       for i, b in enumerate( schedule[0] ):
+        if b in self.alias_genblks:
+          continue
         top._sched.update_schedule.append( b )
         if _DEBUG: print( f"blk{i}() # [br {self.branchiness[b]}, loop {int(self.only_loop_at_top[b])}] {b.__name__}" )
     else:
@@ -1,6 +1,7 @@
 from ..BasePass import BasePass
 from ..sim.GenDAGPass import GenDAGPass
 from ..sim.PrepareSimPass import PrepareSimPass
+from ..sim.ProfileSimPass import ProfileSimPass
 from ..sim.SimpleSchedulePass import SimpleSchedulePass
 from ..sim.WrapGreenletPass import WrapGreenletPass
 from ..tracing.CLLineTracePass import CLLineTracePass
@@ -38,10 +39,12 @@ class HeuTopoUnrollSim( BasePass ):
                       reset_active_high=s.reset_active_high)( top )
 
 class Mamba2020( BasePass ):
-  def __init__( s, *, waveform=None, print_line_trace=True, reset_active_high=True ):
+  def __init__( s, *, waveform=None, print_line_trace=True, reset_active_high=True,
+                      profile=False ):
     s.waveform = waveform
     s.print_line_trace = print_line_trace
     s.reset_active_high = reset_active_high
+    s.profile = profile
 
   def __call__( s, top ):
     top.elaborate()
@@ -50,5 +53,14 @@ class Mamba2020( BasePass ):
     if s.print_line_trace:
       CLLineTracePass()( top )
       LineTraceParamPass()( top )
-    Mamba2020Pass(print_line_trace=s.print_line_trace,
-                  reset_active_high=s.reset_active_high)( top )
+    mamba = Mamba2020Pass(print_line_trace=s.print_line_trace,
+                          reset_active_high=s.reset_active_high)
+    mamba( top )
+
+    # Mamba2020Pass unrolls the schedule into the simulation functions,
+    # so we need to recreate them after instrumenting the schedule
+    if s.profile:
+      ProfileSimPass()( top )
+      mamba.create_sim_eval_comb( top )
+      mamba.create_sim_tick( top )
+      mamba.create_sim_reset( top )
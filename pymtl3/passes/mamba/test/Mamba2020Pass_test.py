@@ -143,3 +143,46 @@ def test_update_once():
     return
 
   raise Exception("Should've thrown UpblkCyclicError")
+
+def test_scc_worklist():
+
+  class Stage(Component):
+    def construct( s ):
+      s.fwd_in  = InPort(Bits32)
+      s.fwd_out = OutPort(Bits32)
+      s.bwd_in  = InPort(Bits32)
+      s.bwd_out = OutPort(Bits32)
+
+      @update
+      def up():
+        s.fwd_out @= s.fwd_in + 1
+        s.bwd_out @= s.bwd_in
+
+  class Top(Component):
+    def construct( s, N=12 ):
+      s.in_ = InPort(Bits32)
+      s.out = OutPort(Bits32)
+      s.stages = [ Stage() for i in range(N) ]
+      s.stages[0].fwd_in //= s.in_
+      for i in range(N-1):
+        s.stages[i].fwd_out //= s.stages[i+1].fwd_in
+        s.stages[i+1].bwd_out //= s.stages[i].bwd_in
+      s.stages[N-1].fwd_out //= s.stages[N-1].bwd_in
+      s.out //= s.stages[0].bwd_out
+
+  A = Top()
+  A.apply( Mamba2020(print_line_trace=False) )
+
+  counters = list(A._sched.scc_counters.values())
+  assert len(counters) == 1 and len(counters[0].blocks) == 12
+  counter = counters[0]
+
+  A.sim_reset()
+  counter.reset()
+  for i in range(10):
+    A.in_ @= i
+    A.sim_eval_combinational()
+    assert A.out == i + 12
+
+  assert counter.ncalls == 10
+  assert counter.nexecs < counter.niters * 12
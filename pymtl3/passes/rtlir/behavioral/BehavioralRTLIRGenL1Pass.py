@@ -20,6 +20,7 @@ from pymtl3.datatypes import (
     trunc,
     zext,
 )
+from pymtl3.dsl.AstHelper import get_inplace_assign
 from pymtl3.passes.rtlir.errors import PyMTLSyntaxError
 from pymtl3.passes.rtlir.RTLIRPass import RTLIRPass
 from pymtl3.passes.rtlir.rtype.RTLIRType import RTLIRGetter
@@ -420,8 +421,14 @@ class BehavioralRTLIRGeneratorL1( ast.NodeVisitor ):
     """Return the behavioral RTLIR of an expression.
 
     ast.Expr might be useful when a statement is only a call to a task or
-    a non-returning function.
+    a non-returning function. A call to a fused in-place Bits method such
+    as s.x.iadd(y) is translated as the equivalent s.x @= s.x + y.
     """
+    assign = get_inplace_assign( node, s.component, s.blk )
+    if assign is not None:
+      ret = s.visit( assign )
+      ret.ast = node
+      return ret
     raise PyMTLSyntaxError(
       s.blk, node, 'Stand-alone expression is not supported yet!' )
 
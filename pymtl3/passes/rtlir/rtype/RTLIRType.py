@@ -544,6 +544,7 @@ class RTLIRGetter:
       ( list,          self._handle_Array ),
       ( dsl.InPort,    self._handle_InPort ),
       ( dsl.OutPort,   self._handle_OutPort ),
+      ( dsl.MemArray,  self._handle_MemArray ),
       ( dsl.Wire,      self._handle_Wire ),
       ( ( int, Bits ), self._handle_Const ),
       ( dsl.Interface, self._handle_Interface ),
@@ -691,6 +692,10 @@ class RTLIRGetter:
   def _handle_Wire( self, w_id, obj ):
     return Wire( get_rtlir_dtype( obj ) )
 
+  def _handle_MemArray( self, m_id, obj ):
+    # A MemArray is an unpacked array of wires
+    return Array( [ obj.get_nelems() ], Wire( get_rtlir_dtype( obj ) ) )
+
   def _handle_Const( self, c_id, obj ):
     return Const( get_rtlir_dtype( obj ), obj )
 
@@ -91,3 +91,13 @@ def test_pymtl3_interface_wire():
   # in_.foo will be silently dropped!
   assert rtlir_getter.get_rtlir( a.in_ ) == rt.InterfaceView('Bits32FooWireBarInIfc',
       {'bar':rt.Port('input', rdt.Vector(32))})
+
+def test_pymtl3_mem_array():
+  from pymtl3 import Component, MemArray
+  class A( Component ):
+    def construct( s ):
+      s.mem = MemArray( Bits16, 8 )
+  a = A()
+  a.elaborate()
+  assert rt.is_rtlir_convertible( a.mem )
+  assert rtlir_getter.get_rtlir( a.mem ) == rt.Array([8], rt.Wire(rdt.Vector(16)))
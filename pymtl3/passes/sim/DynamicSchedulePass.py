@@ -5,20 +5,19 @@
 # Author : Shunning Jiang
 # Date   : Apr 19, 2019
 
+import linecache
 import os
 from collections import defaultdict, deque
 from copy import deepcopy
 
-import py
-
 from pymtl3.datatypes import Bits, is_bitstruct_class
 from pymtl3.dsl.errors import UpblkCyclicError
+from pymtl3.extra.disk_cache import cached_compile
 from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 from pymtl3.passes.errors import PassOrderError
 
 from .SimpleSchedulePass import SimpleSchedulePass, dump_dag
-from .SimpleTickPass import SimpleTickPass
 
 
 class DynamicSchedulePass( BasePass ):
@@ -96,11 +95,21 @@ class DynamicSchedulePass( BasePass ):
     # Put the graph schedule to _sched
     top._sched.update_schedule = schedule = []
 
+    # Record the member blocks of each generated SCC block so that later
+    # passes can still look up the original update blocks
+    top._sched.scc_members = {}
+    top._sched.scc_counters = {}
+
+    # Net blocks of aliased nets only convey constraints
+    alias_genblks = top._dag.alias_genblks
+
     scc_id = 0
     for i in scc_schedule:
       scc = SCCs[i]
       if len(scc) == 1:
-        schedule.append( list(scc)[0] )
+        blk = list(scc)[0]
+        if blk not in alias_genblks:
+          schedule.append( blk )
       else:
 
         # For each non-trivial SCC, we need to figure out a intra-SCC
@@ -153,106 +162,150 @@ class DynamicSchedulePass( BasePass ):
               Q.append( v )
               visited.add( v )
 
+        tmp_schedule = [ x for x in tmp_schedule if x not in alias_genblks ]
+
         scc_id += 1
         variables = set()
         for (u, v) in E:
           # Collect all variables that triggers other blocks in the SCC
           if u in scc and v in scc:
-            variables.update( constraint_objs[ (u, v) ] )
+            variables.update( constraint_objs.get( (u, v), () ) )
 
         if len(variables) == 0:
           raise UpblkCyclicError("There is a cyclic dependency without involving variables."
                           "Probably a loop that involves blocks that should be update_once:\n{}"\
                           .format(", ".join( [ x.__name__ for x in scc] )))
 
-        # generate a loop for scc
-        # Shunning: we just simply loop over the whole SCC block
-        # TODO performance optimizations using Mamba techniques within a SCC block
-
-        def gen_wrapped_SCCblk( s, scc, src ):
-
-          # TODO mamba?
-          scc_tick_func = SimpleTickPass.gen_tick_function( scc )
-          _globals = { 's': s, 'scc_tick_func': scc_tick_func, 'deepcopy': deepcopy,
-                       'UpblkCyclicError': UpblkCyclicError }
-          _locals  = {}
-
-          custom_exec(py.code.Source( src ).compile(), _globals, _locals)
-          return _locals[ 'generated_block' ]
-
-        template = """
-def wrapped_SCC_{0}():
-  N = 0
-  while True:
-    N += 1
-    if N > 100:
-      raise UpblkCyclicError("Combinational loop detected at runtime in {{{3}}} after 100 iters!")
-    {1}
-    scc_tick_func()
-    {2}
-    # print( "SCC block{0} is executed", num_iters, "times" )
-    break
-generated_block = wrapped_SCC_{0}
-          """
-
-        copy_srcs  = []
-        check_srcs = []
-        # print_srcs = []
-
-        # clean up non-top variables if top is there. remove slices
-
-        final_variables = set()
-
-        for x in sorted( variables, key=repr ):
-          w = x.get_top_level_signal()
-          if w is x:
-            final_variables.add( x )
-            continue
-
-          # w is not x
-          if issubclass( w._dsl.Type, Bits ):
-            if w not in final_variables:
-              final_variables.add( w )
-          elif is_bitstruct_class( w._dsl.Type ):
-            if w not in final_variables:
-              final_variables.add( x )
-          else:
-            final_variables.add( x )
-
-        # group them by host component so that we create less bytecode
-
-        final_var_host = defaultdict(list)
-        for x in final_variables:
-          final_var_host[ x.get_host_component() ].append( x )
-
-        # create a block of copy/check code for each host component. Need
-        # to allocate global var_id across different host components.
-
-        var_id = 0
-        for host, var_list in final_var_host.items():
-
-          copy_srcs .append( f"host={host!r}" )
-          check_srcs.append( f"host={host!r}" )
-
-          sub_check_srcs = []
-
-          hostlen = len(repr(host))
-          for var in var_list:
-            var_id += 1
-            subname = repr(var)[hostlen+1:]
-            if issubclass( var._dsl.Type, Bits ):     copy_srcs.append( f"t{var_id}=host.{subname}.clone()" )
-            elif is_bitstruct_class( var._dsl.Type ): copy_srcs.append( f"t{var_id}=host.{subname}.clone()" )
-            else:                                     copy_srcs.append( f"t{var_id}=deepcopy(host.{subname})" )
-
-            sub_check_srcs.append( f"host.{subname} != t{var_id}" )
-
-          check_srcs.append( f"if { ' or '.join(sub_check_srcs)}: continue" )
-
-        scc_block_src = template.format( scc_id, "; ".join( copy_srcs ), "\n    ".join( check_srcs ),
-                                         ", ".join( [ x.__name__ for x in scc] ) )
-
-        # print(scc_block_src)
-        schedule.append( gen_wrapped_SCCblk( top, tmp_schedule, scc_block_src ) )
+        scc_blk, counter = gen_scc_worklist_block( top, scc_id, scc, tmp_schedule, E,
+                                                   constraint_objs, alias_genblks )
+        top._sched.scc_members [ scc_blk ] = tmp_schedule
+        top._sched.scc_counters[ scc_blk ] = counter
+        schedule.append( scc_blk )
+
+#-------------------------------------------------------------------------
+# SCC worklist evaluation
+#-------------------------------------------------------------------------
+# Instead of re-executing the whole SCC until none of the variables
+# change, each member block has a pending flag. After a block executes,
+# we check the variables it writes that other members read, and only
+# re-enqueue the readers of the changed variables. A sweep over the
+# schedule runs the pending blocks in order, and the SCC converges when a
+# sweep doesn't enqueue any block at or before the current one.
+
+class SCCCounter:
+  """ Runtime statistics of an SCC block. niters is the total number of
+  sweeps and nexecs the total number of member block executions. """
+  __slots__ = ( 'name', 'blocks', 'ncalls', 'niters', 'nexecs' )
+
+  def __init__( s, name, blocks ):
+    s.name   = name
+    s.blocks = blocks
+    s.reset()
+
+  def reset( s ):
+    s.ncalls = 0
+    s.niters = 0
+    s.nexecs = 0
+
+  def __repr__( s ):
+    return f"SCCCounter({s.name}, {len(s.blocks)} blocks, ncalls={s.ncalls}, " \
+           f"niters={s.niters}, nexecs={s.nexecs})"
+
+def gen_scc_worklist_block( top, scc_id, scc, schedule, E, constraint_objs,
+                            alias_genblks=frozenset() ):
+  """ Generate the worklist block of an SCC whose members are executed
+  in the order of schedule. Return the block and its SCCCounter. """
+
+  index = { blk: i for i, blk in enumerate( schedule ) }
+
+  succs = defaultdict(list)
+  for (u, v) in E:
+    if u in scc and v in scc:
+      succs[u].append( (v, constraint_objs.get( (u, v), () )) )
+
+  # Net blocks of aliased nets are not scheduled, so we forward the
+  # variables to the readers of the alias instead
+  def expand( v, visited ):
+    if v in index:
+      return { index[v] }
+    ret = set()
+    if v in alias_genblks and v not in visited:
+      visited.add( v )
+      for w, _ in succs[v]:
+        ret |= expand( w, visited )
+    return ret
+
+  # For slices of Bits we directly check the top level wide Bits
+  def normalize( x ):
+    w = x.get_top_level_signal()
+    if w is not x and issubclass( w._dsl.Type, Bits ):
+      return w
+    return x
+
+  def gen_copy( x ):
+    if issubclass( x._dsl.Type, Bits ) or is_bitstruct_class( x._dsl.Type ):
+      return f"{x!r}.clone()"
+    return f"deepcopy({x!r})"
+
+  def gen_enqueue( i, targets ):
+    src = " = ".join( [ f"p{j}" for j in sorted(targets) ] ) + " = True"
+    if min(targets) <= i:
+      src += "; again = True"
+    return src
+
+  blk_srcs = []
+  _globals = { 's': top, 'deepcopy': deepcopy, 'UpblkCyclicError': UpblkCyclicError }
+
+  for i, blk in enumerate( schedule ):
+    _globals[ f"blk{i}" ] = blk
+
+    var_readers = defaultdict(set)
+    # Edges without variables, e.g. method call constraints, can't be
+    # tracked, so we re-enqueue those successors on any re-execution
+    opaque = set()
+    for v, objs in succs[ blk ]:
+      targets = expand( v, set() )
+      if not objs:
+        opaque |= targets
+      for x in objs:
+        var_readers[ normalize(x) ] |= targets
+
+    watched = [ (x, var_readers[x]) for x in sorted( var_readers, key=repr ) if var_readers[x] ]
+
+    blk_srcs.append( f"if p{i}:" )
+    blk_srcs.append( f"  p{i} = False; n += 1" )
+    blk_srcs.extend( [ f"  t{k} = {gen_copy(x)}" for k, (x, _) in enumerate( watched ) ] )
+    blk_srcs.append( f"  blk{i}() # {blk.__name__}" )
+    blk_srcs.extend( [ f"  if {x!r} != t{k}: {gen_enqueue( i, targets )}"
+                       for k, (x, targets) in enumerate( watched ) ] )
+    if opaque:
+      blk_srcs.append( f"  if N > 1: {gen_enqueue( i, opaque )}" )
+
+  name = f"wrapped_SCC_{scc_id}"
+  src = """
+def compile_scc():
+  def {0}():
+    {1} = True
+    N = n = 0
+    while True:
+      N += 1
+      if N > 100:
+        raise UpblkCyclicError("Combinational loop detected at runtime in {{{2}}} after 100 iters!")
+      again = False
+      {3}
+      if not again:
+        break
+    C.ncalls += 1; C.niters += N; C.nexecs += n
+  return {0}
+""".format( name, " = ".join( [ f"p{i}" for i in range(len(schedule)) ] ),
+            ", ".join( sorted( x.__name__ for x in scc ) ), "\n      ".join( blk_srcs ) )
+
+  _globals[ 'C' ] = counter = SCCCounter( name, list(schedule) )
+  _locals  = {}
+  fname = f"scc_worklist_{name}"
+  custom_exec( cached_compile( src, fname ), _globals, _locals )
+  linecache.cache[ fname ] = (len(src), None, src.splitlines(True), fname)
+  return _locals[ 'compile_scc' ](), counter
 
 def kosaraju_scc( G, G_T ):
 
@@ -0,0 +1,188 @@
+#=========================================================================
+# EventDrivenSchedulePass.py
+#=========================================================================
+# Generate an activity-driven schedule on top of the dynamic schedule.
+# Every entry of the static schedule (an update block, a net block, or a
+# wrapped SCC block) gets a dirty flag and a sensitivity list built from
+# the read/write sets computed by GenDAGPass. An entry is only executed
+# when some signal it reads has changed since its last execution.
+#
+# We assume that an update block is a pure function of the signals it
+# reads. Blocks that call methods/functions, read non-signal objects, or
+# are update_once/greenlet blocks are executed every time. Since method
+# calls may write signals, the signals that are not written by
+# combinational blocks are re-checked after each block that calls.
+
+from collections import defaultdict
+from copy import deepcopy
+
+import py
+
+from pymtl3.datatypes import Bits, is_bitstruct_class
+from pymtl3.dsl.Connectable import Signal
+from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.extra.pypy import custom_exec
+
+from .DynamicSchedulePass import DynamicSchedulePass
+
+
+class EventDrivenSchedulePass( DynamicSchedulePass ):
+  def __call__( self, top ):
+    super().__call__( top )
+    self.schedule_event_driven( top )
+
+  def schedule_event_driven( self, top ):
+
+    static_schedule = top._sched.update_schedule
+    scc_members     = top._sched.scc_members
+
+    upblk_reads, upblk_writes, upblk_calls = top.get_all_upblk_metadata()
+    genblk_reads, genblk_writes = top._dag.genblk_reads, top._dag.genblk_writes
+    signal_alias = top._dag.signal_alias
+
+    onces = top.get_all_update_once()
+    greenlet_blk_mapping = { y: x for x, y in getattr( top._dag, "blk_greenlet_mapping", {} ).items() }
+
+    #---------------------------------------------------------------------
+    # Collect the read/write set of each schedule entry
+    #---------------------------------------------------------------------
+    # For slices and bitstruct fields we watch the top level signal, which
+    # may only cause some spurious re-executions. Aliased readers share
+    # the storage of the writer, so we watch the writer instead.
+
+    entry_reads  = []
+    entry_writes = []
+    always_run   = []
+    has_calls    = []
+    full_writes  = set() # top level signals written as a whole
+
+    for entry in static_schedule:
+      reads, writes = set(), set()
+      is_always = is_calling = False
+
+      for blk in scc_members.get( entry, [ entry ] ):
+        if blk in greenlet_blk_mapping:
+          is_always = is_calling = True
+          blk = greenlet_blk_mapping[ blk ]
+
+        if blk in upblk_reads:
+          if upblk_calls[ blk ] or blk in onces:
+            is_always = is_calling = True
+          elif not upblk_reads[ blk ] or not reads_only_signals( top, blk ):
+            is_always = True
+          blk_reads, blk_writes = upblk_reads[ blk ], upblk_writes[ blk ]
+        else:
+          if blk not in genblk_reads:
+            is_always = True # net blocks driven by constants
+          blk_reads, blk_writes = genblk_reads.get( blk, () ), genblk_writes[ blk ]
+
+        for x in blk_reads:
+          if isinstance( x, Signal ):
+            x = x.get_top_level_signal()
+            reads.add( signal_alias.get( x, x ) )
+          else:                       is_always = True
+
+        for x in blk_writes:
+          w = x.get_top_level_signal()
+          writes.add( w )
+          if w is x:
+            full_writes.add( w )
+
+      entry_reads.append( reads )
+      entry_writes.append( writes )
+      always_run.append( is_always )
+      has_calls.append( is_calling )
+
+    # Build the sensitivity list of each watched signal
+
+    sensitivity = defaultdict(list)
+    for i, reads in enumerate( entry_reads ):
+      if not always_run[i]:
+        for x in reads:
+          sensitivity[ x ].append( i )
+
+    top._sched.sensitivity = { static_schedule[i]: sorted( entry_reads[i], key=repr )
+                               for i in range(len(static_schedule)) if not always_run[i] }
+
+    #---------------------------------------------------------------------
+    # Generate the code
+    #---------------------------------------------------------------------
+    # V[k] saves the value of the k-th watched signal when it was last
+    # checked, and D[i] is the dirty flag of the i-th schedule entry.
+
+    watched = sorted( sensitivity.keys(), key=repr )
+    var_id  = { x: k for k, x in enumerate( watched ) }
+
+    def gen_check( x ):
+      k = var_id[ x ]
+      if issubclass( x._dsl.Type, Bits ) or is_bitstruct_class( x._dsl.Type ):
+        copy_src = f"{x!r}.clone()"
+      else:
+        copy_src = f"deepcopy({x!r})"
+      dirty_src = " = ".join( [ f"D[{i}]" for i in sensitivity[x] ] )
+      return f"if {x!r} != V[{k}]: V[{k}] = {copy_src}; {dirty_src} = True"
+
+    # Signals not written as a whole by combinational blocks can change
+    # outside this function, e.g. update_ff blocks, top level inports, or
+    # method calls.
+
+    external = [ x for x in watched if x not in full_writes ]
+    external_srcs = [ gen_check( x ) for x in external ] or [ "pass" ]
+
+    blk_srcs = []
+    for i, entry in enumerate( static_schedule ):
+      check_srcs = [ gen_check( x ) for x in sorted( entry_writes[i], key=repr )
+                     if x in var_id ]
+
+      if always_run[i]:
+        blk_srcs.append( f"blk{i}() # {entry.__name__}" )
+        blk_srcs.extend( check_srcs )
+        if has_calls[i]:
+          blk_srcs.append( "check_external()" )
+      else:
+        blk_srcs.append( f"if D[{i}]: # {entry.__name__}" )
+        blk_srcs.append( f"  D[{i}] = False" )
+        blk_srcs.append( f"  blk{i}()" )
+        blk_srcs.extend( [ f"  {x}" for x in check_srcs ] )
+
+    src = """
+def compile_event_driven():
+  def check_external():
+    {}
+  def event_driven_update():
+    check_external()
+    {}
+  return event_driven_update
+""".format( "\n    ".join( external_srcs ), "\n    ".join( blk_srcs ) )
+
+    _globals = { f"blk{i}": x for i, x in enumerate( static_schedule ) }
+    _globals.update( { 's': top, 'deepcopy': deepcopy,
+                       'V': [ None ] * len(watched),
+                       'D': [ True ] * len(static_schedule) } )
+    _locals = {}
+    custom_exec( py.code.Source( src ).compile(), _globals, _locals )
+
+    top._sched.static_update_schedule = static_schedule
+    top._sched.update_schedule = [ _locals['compile_event_driven']() ]
+
+def reads_only_signals( top, blk ):
+  """ Return False if blk reads some non-signal attribute of its host
+  component, e.g. a Python object that CL adapters use to keep state,
+  which cannot be captured by the sensitivity list. """
+  host = top.get_update_block_host_component( blk )
+
+  for obj_name, _, _ in host.__class__._name_rd[ blk.__name__ ]:
+    if obj_name[0][0] != "s":
+      continue
+
+    obj = host
+    for field, _ in obj_name[1:]:
+      obj = getattr( obj, field, None )
+      while isinstance( obj, list ) and obj:
+        obj = obj[0]
+      if isinstance( obj, Signal ):
+        break
+      if not isinstance( obj, NamedObject ):
+        return False
+
+  return True
@@ -11,10 +11,10 @@ Date   : Jan 18, 2018
 from collections import defaultdict, deque
 from linecache import cache as line_cache
 
-from pymtl3.datatypes import *
 from pymtl3.datatypes.bitstructs import get_bitstruct_inst_all_classes
 from pymtl3.dsl import *
 from pymtl3.dsl.errors import LeftoverPlaceholderError
+from pymtl3.extra.disk_cache import cached_compile
 from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 
@@ -47,6 +47,15 @@ class GenDAGPass( BasePass ):
     top._dag.genblk_writes  = {}
     # top._dag.genblk_src     = {}
 
+    # Top level signals in the same net share the same storage object
+    # after lock_in_simulation. A net without any slice/field reader
+    # hence needs no copy at all. We still generate an empty block for it
+    # to convey the constraints, but schedule passes drop it from the
+    # runtime schedule. signal_alias maps each aliased reader to the
+    # writer it shares the storage object with.
+    top._dag.alias_genblks  = set()
+    top._dag.signal_alias   = {}
+
     # Fall back to compiling one block at a time
     # This is currently because there might be different structs with
     # the same name but essentially different type. It requires name
@@ -54,10 +63,12 @@ class GenDAGPass( BasePass ):
     # compilation, we minimize the effect.
 
     # TODO see if directly compiling AST instead of source can be faster
+    # The code object only depends on the source and the file name, so we
+    # reuse it from the disk cache if available.
     def compile_net_blk( _globals, src, writer ):
       _locals = {}
       fname = f"Net (writer is {writer!r}"
-      custom_exec( compile( src, filename=fname, mode="exec"), _globals, _locals )
+      custom_exec( cached_compile( src, fname ), _globals, _locals )
       line_cache[ fname ] = (len(src), None, src.splitlines(), fname )
       return list(_locals.values())[0]
 
@@ -123,8 +134,11 @@ class GenDAGPass( BasePass ):
         blk = compile_net_blk( {}, f"""def {genblk_name}(): pass""", writer )
 
         top._dag.genblks.add( blk )
+        top._dag.alias_genblks.add( blk )
         if writer.is_signal():
           top._dag.genblk_reads[ blk ] = [ writer ]
+          for x in all_readers:
+            top._dag.signal_alias[ x ] = writer
         top._dag.genblk_writes[ blk ] = all_readers
         continue
       # readers = all_readers
@@ -7,24 +7,31 @@ Author : Shunning Jiang
 Date   : Jan 26, 2020
 """
 
+import linecache
+import sys
+
 import py
 
 from pymtl3.datatypes import Bits, b1
 from pymtl3.dsl.Component import Component
 from pymtl3.dsl.Connectable import Const, Interface, MethodPort, Signal
 from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.extra.disk_cache import cached_compile
 from pymtl3.extra.pypy import custom_exec
-from pymtl3.passes.backends.verilog import VerilogTBGenPass
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 from pymtl3.passes.errors import PassOrderError
-from pymtl3.passes.tracing.CLLineTracePass import CLLineTracePass
-from pymtl3.passes.tracing.LineTraceParamPass import LineTraceParamPass
-from pymtl3.passes.tracing.PrintTextWavePass import PrintTextWavePass
-from pymtl3.passes.tracing.VcdGenerationPass import VcdGenerationPass
 
 from .SimpleTickPass import SimpleTickPass
 
 
+# A pass whose module has not been imported cannot have set any metadata
+# on top. Looking the passes up lazily keeps the tracing passes and the
+# verilog backend out of "import pymtl3".
+def _get_imported_pass( module_name, pass_name ):
+  module = sys.modules.get( module_name )
+  return None if module is None else getattr( module, pass_name )
+
+
 class PrepareSimPass( BasePass ):
   def __init__( self, print_line_trace=True, reset_active_high=True ):
     assert reset_active_high in [ True, False ]
@@ -83,18 +90,81 @@ class PrepareSimPass( BasePass ):
     final_schedule += top._sched.update_schedule
     final_schedule.append( top._sim.check_top_level_inports )
     top.sim_tick = SimpleTickPass.gen_tick_function( final_schedule )
+    top.sim_run  = self.gen_sim_run_function( top, final_schedule )
+
+  @staticmethod
+  def gen_sim_run_function( top, funclist ):
+    """Generate top.sim_run( ncycles=None, until=None ).
+
+    sim_run ticks the simulator until ncycles cycles have been simulated
+    or until() returns True, whichever comes first. until is checked
+    before every cycle. It returns the number of simulated cycles. The
+    body of the tick is inlined into the loop so that running many
+    cycles doesn't pay a Python call to sim_tick per cycle. If top.sim_tick
+    has been replaced after this function is generated, sim_run calls the
+    new top.sim_tick instead. The buffered waveform, if any, is flushed
+    when sim_run returns."""
+
+    gen_src = """
+def compile_sim_run( schedule, top ):
+  {}
+  _sim_tick = top.sim_tick
+  _wave_flush = getattr( top, 'wave_flush', None )
+  _inf = float('inf')
+
+  def sim_run( ncycles=None, until=None ):
+    if ncycles is None and until is None:
+      raise TypeError( "sim_run() needs at least one of ncycles and until" )
+    limit = _inf if ncycles is None else ncycles
+    check = until is not None
+    n = 0
+
+    if top.sim_tick is not _sim_tick:
+      tick = top.sim_tick
+      while n < limit:
+        if check and until(): break
+        tick()
+        n += 1
+    else:
+      while n < limit:
+        if check and until(): break
+        {}
+        n += 1
+
+    if _wave_flush is not None:
+      _wave_flush()
+    return n
+
+  return sim_run
+""".format( "; ".join( [ f"_{i}=schedule[{i}]" for i in range(len(funclist)) ] ) or "pass",
+              "\n        ".join( [ f"_{i}()" for i in range(len(funclist)) ] ) or "pass" )
+
+    _locals = {}
+    custom_exec( cached_compile( gen_src, 'sim_run' ), {}, _locals )
+    linecache.cache['sim_run'] = (len(gen_src), None, gen_src.splitlines(True), 'sim_run')
+    return _locals['compile_sim_run']( funclist, top )
 
   def collect_ff_funcs( self, top ):
     # ff_funcs summarizes the execution at the clock edge
     ret = []
+
+    VcdGenerationPass = _get_imported_pass( 'pymtl3.passes.tracing.VcdGenerationPass',
+                                            'VcdGenerationPass' )
+    PrintTextWavePass = _get_imported_pass( 'pymtl3.passes.tracing.PrintTextWavePass',
+                                            'PrintTextWavePass' )
+    VerilogTBGenPass  = _get_imported_pass( 'pymtl3.passes.backends.verilog.tbgen.VerilogTBGenPass',
+                                            'VerilogTBGenPass' )
+    CLLineTracePass   = _get_imported_pass( 'pymtl3.passes.tracing.CLLineTracePass',
+                                            'CLLineTracePass' )
+
     # append tracing related work
-    if top.has_metadata( VcdGenerationPass.vcd_func ):
+    if VcdGenerationPass and top.has_metadata( VcdGenerationPass.vcd_func ):
       ret.append( top.get_metadata( VcdGenerationPass.vcd_func ) )
 
-    if top.has_metadata( PrintTextWavePass.textwave_func ):
+    if PrintTextWavePass and top.has_metadata( PrintTextWavePass.textwave_func ):
       ret.append( top.get_metadata( PrintTextWavePass.textwave_func ) )
 
-    if top.has_metadata( VerilogTBGenPass.vtbgen_hooks ):
+    if VerilogTBGenPass and top.has_metadata( VerilogTBGenPass.vtbgen_hooks ):
       ret.extend( top.get_metadata( VerilogTBGenPass.vtbgen_hooks ) )
 
     ret.extend( top._sched.schedule_ff )
@@ -102,7 +172,7 @@ class PrepareSimPass( BasePass ):
     ret.append( self.create_advance_sim_cycle( top ) )
 
     # clear cl method flag after flip
-    if top.has_metadata( CLLineTracePass.clear_cl_trace_func ):
+    if CLLineTracePass and top.has_metadata( CLLineTracePass.clear_cl_trace_func ):
       ret.append( top.get_metadata( CLLineTracePass.clear_cl_trace_func ) )
 
     return ret
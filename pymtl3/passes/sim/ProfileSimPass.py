@@ -0,0 +1,232 @@
+"""
+========================================================================
+ProfileSimPass.py
+========================================================================
+Wrap every scheduled update block, net block, generated SCC/meta block
+and CL method with a counter of the number of calls and the cumulative
+time spent in it. The statistics are attached to the host component of
+each block as metadata, and ProfileSimPass.report( top ) summarizes them
+sorted by host component.
+
+This pass has to be applied after a schedule pass and before the
+simulation is locked in (e.g. PrepareSimPass), because it replaces the
+entries of top._sched in place.
+"""
+import time
+import types
+from collections import defaultdict
+
+from pymtl3.dsl import MetadataKey, MethodPort
+from pymtl3.passes.BasePass import BasePass
+from pymtl3.passes.errors import PassOrderError
+
+
+class BlockProfile:
+  __slots__ = ( 'name', 'kind', 'host', 'ncalls', 'time' )
+
+  def __init__( s, name, kind, host ):
+    s.name   = name
+    s.kind   = kind
+    s.host   = host
+    s.ncalls = 0
+    s.time   = 0.0
+
+  def __repr__( s ):
+    return f"BlockProfile({s.name}, {s.kind}, ncalls={s.ncalls}, time={s.time:.6f})"
+
+def _profiled( func, stat ):
+  perf_counter = time.perf_counter
+
+  def profiled( *args, **kwargs ):
+    t0 = perf_counter()
+    ret = func( *args, **kwargs )
+    stat.time += perf_counter() - t0
+    stat.ncalls += 1
+    return ret
+
+  profiled.__name__ = func.__name__
+  profiled.__wrapped__ = func
+  return profiled
+
+class ProfileSimPass( BasePass ):
+
+  #: Profiling statistics of the blocks/methods hosted by a component.
+  #:
+  #: Type: ``dict`` of name to ``BlockProfile``; output
+  stats = MetadataKey(dict)
+
+  def __call__( self, top ):
+    if not hasattr( top, "_sched" ):
+      raise PassOrderError( "_sched" )
+
+    self.top = top
+    self.all_stats = []
+    self.wrapped   = {}
+
+    dag = top._dag
+    self.kinds = {}
+    for blk in dag.final_upblks:
+      self.kinds[ blk ] = 'net' if blk in dag.genblks else 'upblk'
+    for blk in top.get_all_update_ff():
+      self.kinds[ blk ] = 'ff'
+
+    # Greenlet-wrapped blocks replace the original block in the schedule
+    self.greenlet_origin = {}
+    if hasattr( dag, 'blk_greenlet_mapping' ):
+      for blk, gblk in dag.blk_greenlet_mapping.items():
+        self.greenlet_origin[ gblk ] = blk
+        self.kinds[ gblk ] = self.kinds.get( blk, 'upblk' )
+
+    sched = top._sched
+    self.scc_members = getattr( sched, 'scc_members', {} )
+
+    for schedule, kind in [ ( sched.update_schedule,       None   ),
+                            ( sched.schedule_ff,           None   ),
+                            ( sched.schedule_posedge_flip, 'flip' ) ]:
+      for i, blk in enumerate( schedule ):
+        schedule[i] = self.instrument( blk, kind )
+
+    self.instrument_methods( top )
+
+    # Expose the statistics on the host components
+
+    host_stats = defaultdict(dict)
+    for stat in self.all_stats:
+      stats = host_stats[ stat.host ]
+      name  = stat.name
+      i = 1
+      while name in stats:
+        name = f"{stat.name}#{i}"
+        i += 1
+      stat.name = name
+      stats[ name ] = stat
+    for host, stats in host_stats.items():
+      host.set_metadata( self.stats, stats )
+
+  #-----------------------------------------------------------------------
+  # Instrumentation
+  #-----------------------------------------------------------------------
+
+  def new_stat( self, name, kind, host ):
+    stat = BlockProfile( name, kind, host )
+    self.all_stats.append( stat )
+    return stat
+
+  def get_host( self, blk ):
+    top = self.top
+    blk = self.greenlet_origin.get( blk, blk )
+    try:
+      return top.get_update_block_host_component( blk )
+    except KeyError:
+      pass
+    # Net blocks are attributed to the host of the writer
+    reads = top._dag.genblk_reads.get( blk )
+    if reads:
+      return reads[0].get_host_component()
+    return top
+
+  def instrument( self, blk, kind=None ):
+    if blk in self.wrapped:
+      return self.wrapped[ blk ]
+
+    if kind is None:
+      kind = self.kinds.get( blk )
+
+    if kind is None:
+      # A block generated by a schedule pass that calls other blocks
+      kind = 'scc' if blk in self.scc_members else 'meta'
+      host = self.top
+      self.instrument_members( blk )
+    else:
+      host = self.get_host( blk )
+
+    ret = self.wrapped[ blk ] = _profiled( blk, self.new_stat( blk.__name__, kind, host ) )
+    return ret
+
+  def instrument_members( self, blk ):
+    # Keep top._sched.scc_members consistent with the wrapped blocks
+    if blk in self.scc_members:
+      members = self.scc_members[ blk ]
+      for i, x in enumerate( members ):
+        members[i] = self.instrument( x )
+
+    # Blocks generated by exec (e.g. meta/SCC blocks) look up the blocks
+    # they call in their own globals at call time
+    _globals = getattr( blk, '__globals__', None )
+    if _globals is None or '__name__' in _globals:
+      return
+    for name, x in list( _globals.items() ):
+      if isinstance( x, types.FunctionType ) and not name.startswith('_'):
+        if x in self.kinds or x in self.scc_members or \
+           ( '__name__' not in x.__globals__ and x.__globals__ is not _globals ):
+          _globals[ name ] = self.instrument( x )
+
+  def instrument_methods( self, top ):
+    # Every method net is driven by a callee port. Callers either share
+    # the method object of the driver (after GenDAGPass) or call through
+    # the driver port (after CLLineTracePass), so we only need to wrap
+    # the method once per net.
+    in_nets = set()
+    for driver, net in top.get_all_method_nets():
+      in_nets.update( net )
+      if driver is not None and driver.method is not None:
+        method  = driver.method
+        wrapped = self.instrument_method( driver )
+        for x in net:
+          if x.method is method:
+            x.method = wrapped
+
+    # Callee ports that are not connected to anything, e.g. at the top
+    for x in top.get_all_object_filter( lambda x: isinstance( x, MethodPort ) ):
+      if x not in in_nets and x.is_callee_port() and x.method is not None:
+        self.instrument_method( x )
+
+  def instrument_method( self, port ):
+    host = port.get_host_component()
+    name = repr(port)[ len(repr(host))+1: ]
+    # Name the method of a non-blocking interface after the interface
+    if name.endswith( ".method" ):
+      name = name[:-7]
+    port.method = _profiled( port.method, self.new_stat( name, 'method', host ) )
+    return port.method
+
+  #-----------------------------------------------------------------------
+  # Report
+  #-----------------------------------------------------------------------
+
+  @staticmethod
+  def reset( top ):
+    for x in top.get_all_components():
+      if not x.has_metadata( ProfileSimPass.stats ):
+        continue
+      for stat in x.get_metadata( ProfileSimPass.stats ).values():
+        stat.ncalls = 0
+        stat.time   = 0.0
+
+  @staticmethod
+  def report( top, nhosts=None ):
+    """Return a report of the hottest blocks grouped by host component.
+
+    Host components are sorted by the total time of the blocks and
+    methods they host. All times are inclusive, e.g. the time of an
+    update block includes the CL methods it calls and the time of
+    scc/meta blocks includes the blocks they call."""
+    hosts = [ x for x in top.get_all_components() if x.has_metadata( ProfileSimPass.stats ) ]
+
+    def host_time( x ):
+      return sum( stat.time for stat in x.get_metadata( ProfileSimPass.stats ).values()
+                  if stat.kind not in ( 'scc', 'meta' ) )
+
+    hosts = sorted( hosts, key=host_time, reverse=True )
+    if nhosts is not None:
+      hosts = hosts[:nhosts]
+
+    lines = [ f"{'block':<40} {'kind':<6} {'calls':>10} {'time (s)':>12} {'us/call':>10}" ]
+    for host in hosts:
+      stats = host.get_metadata( ProfileSimPass.stats )
+      lines.append( f"{host!r} ({host.__class__.__name__}): {host_time(host):.6f} s" )
+      for stat in sorted( stats.values(), key=lambda x: x.time, reverse=True ):
+        per_call = stat.time / stat.ncalls * 1e6 if stat.ncalls else 0.0
+        lines.append( f"  {stat.name:<38} {stat.kind:<6} {stat.ncalls:>10} "
+                      f"{stat.time:>12.6f} {per_call:>10.3f}" )
+    return "\n".join( lines )
@@ -12,6 +12,7 @@ import linecache
 from collections import defaultdict
 
 from pymtl3.dsl.errors import UpblkCyclicError
+from pymtl3.extra.disk_cache import cached_compile
 from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 from pymtl3.passes.errors import PassOrderError
@@ -68,6 +69,10 @@ class SimpleSchedulePass( BasePass ):
 
     check_schedule( top, update_schedule, V, E, InD )
 
+    # Net blocks of aliased nets don't need to run
+    alias_genblks = top._dag.alias_genblks
+    update_schedule[:] = [ x for x in update_schedule if x not in alias_genblks ]
+
   def schedule_ff( self, top ):
 
     if not hasattr( top, "_sched" ):
@@ -142,7 +147,7 @@ class SimpleSchedulePass( BasePass ):
       # when the source code is huge. For some designs with 10K+ flip-flops
       # the performance overhead becomes huge.
       l = locals()
-      custom_exec( compile( '\n'.join(lines), filename='ff_flips', mode='exec' ), globals(), l)
+      custom_exec( cached_compile( '\n'.join(lines), 'ff_flips' ), globals(), l)
       linecache.cache['ff_flips'] = (1, None, lines, 'ff_flips')
       top._sched.schedule_posedge_flip = [ l['compile_double_buffer']( top ) ]
 
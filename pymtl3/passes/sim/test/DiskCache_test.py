@@ -0,0 +1,114 @@
+#=========================================================================
+# DiskCache_test.py
+#=========================================================================
+# Test that enabling the on-disk cache reuses parsed update blocks and
+# generated code objects across elaborations without changing behavior.
+
+import os
+
+import pytest
+
+from pymtl3.datatypes import Bits8, Bits32
+from pymtl3.dsl import *
+from pymtl3.dsl import AstHelper
+from pymtl3.extra.disk_cache import (
+    cached_compile,
+    disable_disk_cache,
+    enable_disk_cache,
+)
+
+from ..GenDAGPass import GenDAGPass
+from ..PrepareSimPass import PrepareSimPass
+from ..SimpleSchedulePass import SimpleSchedulePass
+
+
+@pytest.fixture
+def cache( tmpdir ):
+  yield enable_disk_cache( str(tmpdir) )
+  disable_disk_cache()
+
+def _make_top():
+  # Return a new class every time so that the in-memory per-class cache
+  # of ComponentLevel2 doesn't hide the disk cache
+
+  class Inner( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.out = OutPort( Bits8 )
+      s.reg = Wire( Bits8 )
+
+      @update_ff
+      def up_reg():
+        s.reg <<= s.in_ + 1
+
+      @update
+      def up_out():
+        s.out @= s.reg[0:8] ^ 0x5a
+
+  class Top( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits32 )
+      s.out = OutPort( Bits32 )
+      s.inners = [ Inner() for _ in range(4) ]
+      for i in range(4):
+        s.inners[i].in_ //= s.in_[i*8:i*8+8]
+        s.out[i*8:i*8+8] //= s.inners[i].out
+
+  return Top
+
+def _simulate( top ):
+  top.elaborate()
+  top.apply( GenDAGPass() )
+  top.apply( SimpleSchedulePass() )
+  top.apply( PrepareSimPass(print_line_trace=False) )
+  top.sim_reset()
+  outs = []
+  for i in range(10):
+    top.in_ @= 0x01020304 * i
+    top.sim_eval_combinational()
+    outs.append( int(top.out) )
+    top.sim_tick()
+  return outs
+
+def test_cache_reused_across_elaborations( cache ):
+  ref = _simulate( _make_top()() )
+  assert cache.hits == 0
+  assert os.listdir( os.path.join( cache.path, 'upblk' ) )
+  assert os.listdir( os.path.join( cache.path, 'code' ) )
+
+  assert _simulate( _make_top()() ) == ref
+  assert cache.hits > 0
+
+def _count_entries( path ):
+  return sum( len(files) for _, _, files in os.walk( path ) )
+
+def test_upblk_keyed_by_ast_helper( cache ):
+  ref = _simulate( _make_top()() )
+  nentries = _count_entries( os.path.join( cache.path, 'upblk' ) )
+
+  # Pretend that the analyzer changed since the entries were stored
+  cache.file_digests[ AstHelper.__file__ ] = 'changed'
+  assert _simulate( _make_top()() ) == ref
+  assert _count_entries( os.path.join( cache.path, 'upblk' ) ) == 2 * nentries
+
+def test_cached_compile_keyed_by_source( cache ):
+  code0 = cached_compile( "def f(): return 1", "gen" )
+  code1 = cached_compile( "def f(): return 2", "gen" )
+  code2 = cached_compile( "def f(): return 1", "gen" )
+  assert cache.hits == 1
+
+  for code, ret in [ (code0, 1), (code1, 2), (code2, 1) ]:
+    _locals = {}
+    exec( code, {}, _locals )
+    assert _locals['f']() == ret
+
+def test_corrupted_entry_is_a_miss( cache ):
+  cached_compile( "x = 1", "gen" )
+  for root, _, files in os.walk( cache.path ):
+    for f in files:
+      with open( os.path.join( root, f ), 'wb' ) as fd:
+        fd.write( b'garbage' )
+
+  _locals = {}
+  exec( cached_compile( "x = 1", "gen" ), {}, _locals )
+  assert _locals['x'] == 1
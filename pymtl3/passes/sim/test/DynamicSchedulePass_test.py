@@ -315,3 +315,60 @@ def test_update_once():
     print(e)
     return
   raise Exception("Should've thrown UpblkCyclicError")
+
+def test_scc_worklist():
+
+  class Top(Component):
+
+    def construct( s ):
+      s.in_ = InPort(32)
+      s.out = OutPort(32)
+      s.a = Wire(32)
+      s.b = Wire(32)
+      s.c = Wire(32)
+      s.d = Wire(32)
+      s.e = Wire(32)
+
+      @update
+      def up0():
+        s.a @= s.in_
+        s.out @= s.d + s.e
+
+      @update
+      def up4():
+        s.e @= s.b
+
+      @update
+      def up1():
+        s.b @= s.a + 1
+
+      @update
+      def up2():
+        s.c @= s.b + 1
+
+      @update
+      def up3():
+        s.d @= s.c + 1
+
+  A = Top()
+  A.elaborate()
+  A.apply( GenDAGPass() )
+  A.apply( DynamicSchedulePass() )
+  A.apply( PrepareSimPass(print_line_trace=False) )
+
+  counters = list(A._sched.scc_counters.values())
+  assert len(counters) == 1 and len(counters[0].blocks) == 5
+  counter = counters[0]
+
+  A.sim_reset()
+  counter.reset()
+  for i in range(1, 11):
+    A.in_ @= i
+    A.sim_eval_combinational()
+    assert A.out == i + 3 + i + 1
+
+  # up0 has the most inputs in the SCC so the schedule starts from it.
+  # The second sweep only re-executes up0 whose inputs d/e changed.
+  assert counter.ncalls == 10
+  assert counter.niters == 20
+  assert counter.nexecs == 60
@@ -0,0 +1,109 @@
+#=========================================================================
+# PrepareSimPass_test.py
+#=========================================================================
+# Test the simulation APIs created by PrepareSimPass.
+
+import pytest
+
+from pymtl3 import *
+from pymtl3.passes.mamba import Mamba2020, UnrollSim
+from pymtl3.passes.testcases import CaseMemArrayRegFileComp
+
+
+class Counter( Component ):
+  def construct( s ):
+    s.en  = InPort()
+    s.out = OutPort( Bits16 )
+    s.cnt = Wire( Bits16 )
+    s.out //= s.cnt
+
+    @update_ff
+    def up_cnt():
+      if s.reset:
+        s.cnt <<= 0
+      elif s.en:
+        s.cnt <<= s.cnt + 1
+
+  def done( s ):
+    return s.out >= 20
+
+@pytest.mark.parametrize( "pass_group", [ DefaultPassGroup, Mamba2020, UnrollSim ] )
+def test_sim_run( pass_group ):
+  top = Counter()
+  top.apply( pass_group(print_line_trace=False) )
+  top.sim_reset()
+  top.en @= 1
+
+  base = top.sim_cycle_count()
+  assert top.sim_run( 5 ) == 5
+  assert top.sim_cycle_count() == base + 5
+  assert top.out == 5
+
+  # until is checked before every cycle
+  assert top.sim_run( until=top.done ) == 15
+  assert top.out == 20
+  assert top.sim_run( until=top.done ) == 0
+
+  # whichever comes first
+  top.en @= 0
+  assert top.sim_run( 10, until=lambda: top.out == 0 ) == 10
+  assert top.sim_cycle_count() == base + 30
+
+  with pytest.raises( TypeError ):
+    top.sim_run()
+
+def test_sim_run_matches_sim_tick():
+  ref = Counter()
+  ref.apply( DefaultPassGroup(print_line_trace=False) )
+  ref.sim_reset()
+
+  top = Counter()
+  top.apply( DefaultPassGroup(print_line_trace=False) )
+  top.sim_reset()
+
+  for i in range(10):
+    ref.en @= i & 1
+    top.en @= i & 1
+    for _ in range(i):
+      ref.sim_tick()
+    top.sim_run( i )
+    assert ref.out == top.out
+    assert ref.sim_cycle_count() == top.sim_cycle_count()
+
+def test_sim_run_after_sim_tick_replaced():
+  top = Counter()
+  top.apply( DefaultPassGroup(print_line_trace=False) )
+  top.sim_reset()
+  top.en @= 1
+
+  ticks = []
+  sim_tick = top.sim_tick
+  def counted_sim_tick():
+    ticks.append( top.sim_cycle_count() )
+    sim_tick()
+  top.sim_tick = counted_sim_tick
+
+  assert top.sim_run( 3 ) == 3
+  assert len(ticks) == 3
+  assert top.out == 3
+
+@pytest.mark.parametrize( "pass_group", [ DefaultPassGroup, Mamba2020, UnrollSim ] )
+def test_mem_array( pass_group ):
+  ref = CaseMemArrayRegFileComp.DUT( False )
+  ref.apply( DefaultPassGroup(print_line_trace=False) )
+  ref.sim_reset()
+
+  top = CaseMemArrayRegFileComp.DUT( True )
+  top.apply( pass_group(print_line_trace=False) )
+  top.sim_reset()
+
+  for i in range(40):
+    for m in [ ref, top ]:
+      m.wen   @= i % 3 != 0
+      m.waddr @= ( i * 7 ) % 8
+      m.wdata @= i * 1000
+      m.raddr @= ( i * 5 ) % 8
+      m.sim_eval_combinational()
+    assert ref.rdata == top.rdata
+    ref.sim_tick()
+    top.sim_tick()
@@ -0,0 +1,149 @@
+#=========================================================================
+# ProfileSimPass_test.py
+#=========================================================================
+# Test that ProfileSimPass counts every block and method without changing
+# the simulation results.
+
+from pymtl3 import *
+from pymtl3.passes.mamba import Mamba2020
+from pymtl3.stdlib.queues import BypassQueueCL
+
+from ..ProfileSimPass import ProfileSimPass
+
+
+class Inner( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.out = OutPort( Bits8 )
+    s.reg = Wire( Bits8 )
+
+    @update_ff
+    def up_reg():
+      s.reg <<= s.in_ + 1
+
+    @update
+    def up_out():
+      s.out @= s.reg ^ 0x5a
+
+class Top( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.out = OutPort( Bits8 )
+    s.inner0 = Inner()
+    s.inner1 = Inner()
+    s.inner0.in_ //= s.in_
+    s.inner1.in_ //= s.inner0.out
+    s.out //= s.inner1.out
+
+def _run( top, ncycles ):
+  top.sim_reset()
+  outs = []
+  for i in range(ncycles):
+    top.in_ @= i
+    top.sim_eval_combinational()
+    outs.append( int(top.out) )
+    top.sim_tick()
+  return outs
+
+def _check_rtl( top, pass_group ):
+  ref = Top()
+  ref.apply( DefaultPassGroup(print_line_trace=False) )
+  ref = _run( ref, 10 )
+
+  top.apply( pass_group )
+  assert _run( top, 10 ) == ref
+
+  stats = top.inner0.get_metadata( ProfileSimPass.stats )
+  assert stats['up_reg'].kind == 'ff'
+  assert stats['up_reg'].ncalls == 10 + 3 # sim_reset ticks three times
+  assert stats['up_out'].ncalls > 10
+
+  report = ProfileSimPass.report( top )
+  assert "s.inner0 (Inner)" in report
+  assert "up_out" in report
+
+  ProfileSimPass.reset( top )
+  assert top.inner0.get_metadata( ProfileSimPass.stats )['up_reg'].ncalls == 0
+  top.sim_tick()
+  assert top.inner0.get_metadata( ProfileSimPass.stats )['up_reg'].ncalls == 1
+
+def test_default_pass_group():
+  _check_rtl( Top(), DefaultPassGroup(print_line_trace=False, profile=True) )
+
+def test_mamba2020():
+  _check_rtl( Top(), Mamba2020(print_line_trace=False, profile=True) )
+
+def test_scc_members():
+
+  class Loop( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.out = OutPort( Bits8 )
+      s.a = Wire( Bits8 )
+      s.b = Wire( Bits8 )
+
+      @update
+      def up_a():
+        s.a @= s.in_ + 1
+        s.out @= s.b
+
+      @update
+      def up_b():
+        s.b @= s.a + 1
+
+  top = Loop()
+  top.apply( DefaultPassGroup(print_line_trace=False, profile=True) )
+  top.in_ @= 3
+  top.sim_eval_combinational()
+  assert top.out == 5
+
+  stats = top.get_metadata( ProfileSimPass.stats )
+  sccs = [ x for x in stats.values() if x.kind == 'scc' ]
+  assert len(sccs) == 1 and sccs[0].ncalls == 1
+  # Only the members whose inputs changed are re-executed
+  counter = list(top._sched.scc_counters.values())[0]
+  assert stats['up_a'].ncalls + stats['up_b'].ncalls == counter.nexecs
+  assert counter.ncalls == 1 and counter.niters == 2
+
+def test_cl_methods():
+
+  class Producer( Component ):
+    def construct( s ):
+      s.send = CallerIfcCL()
+      s.n = 0
+
+      @update_once
+      def up_send():
+        s.send( s.n )
+        s.n += 1
+
+  class Consumer( Component ):
+    def construct( s ):
+      s.recv = CallerIfcCL()
+      s.msgs = []
+
+      @update_once
+      def up_recv():
+        s.msgs.append( s.recv() )
+
+  class CLTop( Component ):
+    def construct( s ):
+      s.src  = Producer()
+      s.q    = BypassQueueCL()
+      s.sink = Consumer()
+      s.src.send  //= s.q.enq
+      s.sink.recv //= s.q.deq
+
+  top = CLTop()
+  top.apply( DefaultPassGroup(print_line_trace=False, profile=True) )
+  top.sim_reset()
+  for i in range(5):
+    top.sim_tick()
+
+  assert top.sink.msgs[-5:] == [ x for x in range(top.src.n-5, top.src.n) ]
+
+  stats = top.q.get_metadata( ProfileSimPass.stats )
+  assert stats['enq'].kind == 'method'
+  assert stats['enq'].ncalls == top.src.n
+  assert stats['deq'].ncalls == top.src.n
+  assert "s.q (BypassQueueCL)" in ProfileSimPass.report( top )
@@ -261,3 +261,50 @@ def test_equal_top_level():
     print(e)
     assert str(e).startswith("Please use @= to assign top level InPort")
     return
+
+def test_aliased_net_blocks_not_scheduled():
+  from pymtl3.passes.mamba import Mamba2020
+  from ..DynamicSchedulePass import DynamicSchedulePass
+  from ..EventDrivenSchedulePass import EventDrivenSchedulePass
+
+  class Inner(Component):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.out = OutPort( Bits8 )
+      @update
+      def up():
+        s.out @= s.in_ + 1
+
+  class Top(Component):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.out = OutPort( Bits8 )
+      s.u = Inner()
+      s.v = Inner()
+      s.u.in_ //= s.in_
+      s.v.in_ //= s.u.out
+      s.out   //= s.v.out
+
+  def check( top ):
+    alias_genblks = top._dag.alias_genblks
+    assert len(alias_genblks) >= 3
+    assert not alias_genblks & set(top._sched.update_schedule)
+    top.sim_reset()
+    for i in range(5):
+      top.in_ @= i
+      top.sim_eval_combinational()
+      assert top.out == i + 2
+      top.sim_tick()
+
+  for sched_pass in [ SimpleSchedulePass, DynamicSchedulePass, EventDrivenSchedulePass ]:
+    top = Top()
+    top.elaborate()
+    top.apply( GenDAGPass() )
+    top.apply( sched_pass() )
+    assert top._dag.signal_alias[ top.v.in_ ] is top.u.out
+    top.apply( PrepareSimPass(print_line_trace=False) )
+    check( top )
+
+  top = Top()
+  top.apply( Mamba2020(print_line_trace=False) )
+  check( top )
@@ -1063,6 +1063,71 @@ class CaseFixedSizeSliceComp:
       [ 0x9876, 0x76, 0x98 ],
   ]
 
+class CaseFusedInplaceArithComp:
+  class DUT( Component ):
+    def construct( s ):
+      s.in0 = InPort( Bits8 )
+      s.in1 = InPort( Bits8 )
+      s.out = OutPort( Bits8 )
+      @update
+      def upblk():
+        s.out.assign_add( s.in0, s.in1 )
+        s.out.isub( 1 )
+        s.out.assign_field( 4, 8, s.in1[0:4] )
+  TV_IN = \
+  _set(
+      'in0', Bits8, 0,
+      'in1', Bits8, 1,
+  )
+  TV_OUT = \
+  _check( 'out', Bits8, 2 )
+  TV =\
+  [
+      [ 0x00, 0x00, 0x0f ],
+      [ 0x01, 0x02, 0x22 ],
+      [ 0x10, 0x05, 0x54 ],
+      [ 0xff, 0xff, 0xfd ],
+      [ 0x80, 0x3c, 0xcb ],
+  ]
+
+class CaseMemArrayRegFileComp:
+  class DUT( Component ):
+    def construct( s, use_mem_array=True ):
+      s.raddr = InPort( Bits3 )
+      s.rdata = OutPort( Bits32 )
+      s.wen   = InPort( Bits1 )
+      s.waddr = InPort( Bits3 )
+      s.wdata = InPort( Bits32 )
+      if use_mem_array:
+        s.regs = MemArray( Bits32, 8 )
+      else:
+        s.regs = [ Wire( Bits32 ) for _ in range(8) ]
+      @update_ff
+      def upblk():
+        if s.wen:
+          s.regs[ s.waddr ] <<= s.wdata
+        s.rdata <<= s.regs[ s.raddr ]
+  TV_IN = \
+  _set(
+      'wen', Bits1, 0,
+      'waddr', Bits3, 1,
+      'wdata', Bits32, 2,
+      'raddr', Bits3, 3,
+  )
+  TV_OUT = \
+  _check( 'rdata', Bits32, 4 )
+  TV =\
+  [
+      [ 1, 0, 42, 0,  0 ],
+      [ 1, 1, 43, 0,  0 ],
+      [ 0, 2, 44, 1, 42 ],
+      [ 1, 2, -1, 2, 43 ],
+      [ 0, 0,  0, 2,  0 ],
+      [ 0, 0,  0, 0, -1 ],
+      [ 0, 0,  0, 7, 42 ],
+      [ 0, 0,  0, 0,  0 ],
+  ]
+
 class CaseTwoUpblksSliceComp:
   class DUT( Component ):
     def construct( s ):
@@ -0,0 +1,257 @@
+"""
+========================================================================
+BlockWave.py
+========================================================================
+A compact binary waveform format in the spirit of FST. Value changes are
+grouped into blocks of consecutive cycles, and each block is compressed
+with zlib. Every block starts with a snapshot of all nets so that a
+reader can jump to any cycle by only decompressing one block.
+
+File layout (all integers are little endian):
+
+  magic   b"PYMTLBW1"
+  header  u32 length, then zlib compressed JSON of
+          { "timescale": str, "nets": [ [ nbits, [ names ] ], ... ] }
+  blocks  u64 start cycle, u32 ncycles, u32 compressed length,
+          u32 raw length, then the zlib compressed payload:
+          - the values of all nets at the beginning of the block, where
+            each value takes (nbits+7)//8 bytes
+          - one record per cycle: a sequence of (varint net id + 1,
+            value) terminated by a zero byte
+
+Use BlockWaveReader to read the waveform back.
+"""
+import atexit
+import json
+import struct
+import zlib
+from bisect import bisect_right
+
+MAGIC = b"PYMTLBW1"
+_block_header = struct.Struct( "<QIII" )
+
+def encode_varint( x ):
+  ret = bytearray()
+  while x >= 0x80:
+    ret.append( (x & 0x7f) | 0x80 )
+    x >>= 7
+  ret.append( x )
+  return bytes(ret)
+
+#-------------------------------------------------------------------------
+# BlockWaveWriter
+#-------------------------------------------------------------------------
+# The dump function generated by VcdGenerationPass appends the records
+# to buf and calls end_cycle() once per cycle.
+
+class BlockWaveWriter:
+
+  def __init__( s, file_name, nets, values, timescale="10ps", block_cycles=4096,
+                compress_level=6 ):
+    s.file = open( file_name, "wb" )
+    s.nbytes = [ (nbits + 7) // 8 for nbits, _ in nets ]
+    s.block_cycles   = block_cycles
+    s.compress_level = compress_level
+
+    s.buf     = bytearray()
+    s.start   = 0
+    s.ncycles = 0
+
+    # The dump function provides the current values of all nets
+    s.snapshot_func = None
+    s.snapshot = s.encode_snapshot( values )
+
+    header = json.dumps( { "timescale": timescale,
+                           "nets": [ [ nbits, names ] for nbits, names in nets ] } )
+    header = zlib.compress( header.encode() )
+    s.file.write( MAGIC + struct.pack( "<I", len(header) ) + header )
+
+    atexit.register( s.close )
+
+  def encode_snapshot( s, values ):
+    return b"".join( [ v.to_bytes( n, "little" ) for v, n in zip( values, s.nbytes ) ] )
+
+  def skip_cycle( s ):
+    # Cycles that are not dumped leave a gap between two blocks
+    s.write_block()
+    s.start += 1
+
+  def end_cycle( s ):
+    s.buf.append( 0 )
+    s.ncycles += 1
+    if s.ncycles >= s.block_cycles:
+      s.write_block()
+
+  def write_block( s ):
+    if not s.ncycles:
+      return
+    raw = s.snapshot + s.buf
+    payload = zlib.compress( raw, s.compress_level )
+    s.file.write( _block_header.pack( s.start, s.ncycles, len(payload), len(raw) ) )
+    s.file.write( payload )
+
+    s.start  += s.ncycles
+    s.ncycles = 0
+    s.buf.clear()
+    s.snapshot = s.encode_snapshot( s.snapshot_func() )
+
+  def flush( s ):
+    """ Write all cycles so far to the file as a (possibly short) block. """
+    if s.file.closed:
+      return
+    s.write_block()
+    s.file.flush()
+
+  def close( s ):
+    if s.file.closed:
+      return
+    s.flush()
+    s.file.close()
+
+#-------------------------------------------------------------------------
+# BlockWaveReader
+#-------------------------------------------------------------------------
+
+class BlockWaveReader:
+  """ Read a waveform written by VcdGenerationPass with wave_format
+  "bwave". Signals are named by their full hierarchical name, e.g.
+  "top.q.enq.msg". Cycles are counted from the first cycle of sim_reset,
+  and the cycles outside the dump window are not in the file. """
+
+  def __init__( s, file_name ):
+    s.file = open( file_name, "rb" )
+    if s.file.read( len(MAGIC) ) != MAGIC:
+      raise ValueError( f"{file_name} is not a PyMTL block waveform file" )
+
+    header_len, = struct.unpack( "<I", s.file.read(4) )
+    header = json.loads( zlib.decompress( s.file.read( header_len ) ) )
+
+    s.timescale = header["timescale"]
+    s.nets      = [ ( nbits, names ) for nbits, names in header["nets"] ]
+    s.nbytes    = [ (nbits + 7) // 8 for nbits, _ in s.nets ]
+    s.net_id    = { name: i for i, (_, names) in enumerate( s.nets ) for name in names }
+
+    # Only read the block headers to build the time index
+    s.blocks = []
+    while True:
+      data = s.file.read( _block_header.size )
+      if len(data) < _block_header.size:
+        break
+      start, ncycles, clen, rawlen = _block_header.unpack( data )
+      s.blocks.append( ( start, ncycles, s.file.tell(), clen ) )
+      s.file.seek( clen, 1 )
+
+    s.block_starts = [ x[0] for x in s.blocks ]
+    s.ncycles = s.blocks[-1][0] + s.blocks[-1][1] if s.blocks else 0
+    s._cache = ( None, None, None )
+
+  def __enter__( s ):
+    return s
+
+  def __exit__( s, *args ):
+    s.close()
+
+  def close( s ):
+    s.file.close()
+
+  @property
+  def signals( s ):
+    return sorted( s.net_id )
+
+  def nbits( s, name ):
+    return s.nets[ s.net_id[ name ] ][0]
+
+  def _find_block( s, cycle ):
+    if not 0 <= cycle < s.ncycles:
+      raise IndexError( f"cycle {cycle} is out of range [0, {s.ncycles})" )
+    k = bisect_right( s.block_starts, cycle ) - 1
+    if k < 0 or cycle >= s.blocks[k][0] + s.blocks[k][1]:
+      raise IndexError( f"cycle {cycle} is not dumped" )
+    return k
+
+  def _decode_block( s, k ):
+    if s._cache[0] == k:
+      return s._cache[1], s._cache[2]
+
+    _, _, offset, clen = s.blocks[k]
+    s.file.seek( offset )
+    raw = zlib.decompress( s.file.read( clen ) )
+
+    values = []
+    pos = 0
+    for n in s.nbytes:
+      values.append( int.from_bytes( raw[pos:pos+n], "little" ) )
+      pos += n
+
+    s._cache = ( k, values, raw[pos:] )
+    return values, raw[pos:]
+
+  def _iter_block( s, k ):
+    """ Yield ( cycle, changes ) for each cycle in block k, where changes
+    is a list of ( net id, value ). """
+    start = s.blocks[k][0]
+    _, records = s._decode_block( k )
+    nbytes = s.nbytes
+
+    cycle   = start
+    changes = []
+    pos = 0
+    end = len(records)
+    while pos < end:
+      x = shift = 0
+      while True:
+        b = records[pos]
+        pos += 1
+        x |= (b & 0x7f) << shift
+        shift += 7
+        if b < 0x80:
+          break
+
+      if x == 0:
+        yield cycle, changes
+        cycle  += 1
+        changes = []
+      else:
+        net = x - 1
+        n = nbytes[net]
+        changes.append( ( net, int.from_bytes( records[pos:pos+n], "little" ) ) )
+        pos += n
+
+  def value( s, name, cycle ):
+    """ Return the value of signal name at the given cycle as an int. """
+    net = s.net_id[ name ]
+    k   = s._find_block( cycle )
+    ret = s._decode_block( k )[0][ net ]
+
+    for c, changes in s._iter_block( k ):
+      if c > cycle:
+        break
+      for i, v in changes:
+        if i == net:
+          ret = v
+    return ret
+
+  def changes( s, name, start=0, end=None ):
+    """ Return a list of ( cycle, value ) of signal name in the dumped
+    cycles in [start, end). The first entry is the value at the first
+    dumped cycle. """
+    if end is None:
+      end = s.ncycles
+
+    net = s.net_id[ name ]
+    ret = []
+    cur = None
+
+    for k in range( max( 0, bisect_right( s.block_starts, start ) - 1 ), len(s.blocks) ):
+      if s.blocks[k][0] >= end:
+        break
+      cur = s._decode_block( k )[0][ net ]
+      for c, changes in s._iter_block( k ):
+        if c >= end:
+          break
+        for i, v in changes:
+          if i == net:
+            cur = v
+        if c >= start and ( not ret or cur != ret[-1][1] ):
+          ret.append( ( c, cur ) )
+    return ret
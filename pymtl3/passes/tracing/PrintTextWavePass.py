@@ -18,10 +18,12 @@ Date   : Nov 9, 2019
 
 import py
 
-from pymtl3.dsl import Const, MetadataKey
+from pymtl3.dsl import Const, MemArray, MetadataKey
 from pymtl3.passes.BasePass import BasePass
 from pymtl3.passes.errors import PassOrderError
 
+from .VcdGenerationPass import gen_window_cond, get_wave_control, select_wave_signals
+
 
 class PrintTextWavePass( BasePass ):
 
@@ -41,8 +43,38 @@ class PrintTextWavePass( BasePass ):
   #: Default value: False
   enable = MetadataKey(bool)
 
-  textwave_func = MetadataKey()
-  textwave_dict = MetadataKey()
+  #: Only print the signals in the subtrees of these components
+  #:
+  #: Type: ``list`` of components; input
+  #:
+  #: Default value: all components
+  wave_components = MetadataKey(list)
+
+  #: Only print the signals whose full names match one of these glob
+  #: patterns, same as VcdGenerationPass.wave_signals
+  #:
+  #: Type: ``list`` of ``str``; input
+  #:
+  #: Default value: all signals
+  wave_signals = MetadataKey(list)
+
+  #: First cycle to record
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: 0
+  wave_start_cycle = MetadataKey(int)
+
+  #: Stop recording from this cycle on
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: None
+  wave_stop_cycle = MetadataKey(int)
+
+  textwave_func   = MetadataKey()
+  textwave_dict   = MetadataKey()
+  textwave_cycles = MetadataKey()
 
   def __call__( self, top ):
     if top.has_metadata( self.enable ) and top.get_metadata( self.enable ):
@@ -50,10 +82,11 @@ class PrintTextWavePass( BasePass ):
       assert not top.has_metadata( self.textwave_func )
       assert not top.has_metadata( self.textwave_dict )
 
-      func, sigs_dict = self._collect_sig_func( top )
+      func, sigs_dict, cycles = self._collect_sig_func( top )
 
       top.set_metadata( self.textwave_func, func )
       top.set_metadata( self.textwave_dict, sigs_dict )
+      top.set_metadata( self.textwave_cycles, cycles )
       top.print_textwave = self._gen_print_wave( top, sigs_dict )
 
   def _process_binary( self, sig, base, max ):
@@ -101,7 +134,7 @@ class PrintTextWavePass( BasePass ):
       light_gray = '\033[47m'
       back='\033[0m'  #back to normal printing
 
-      all_signal_values = text_sigs
+      all_signal_values = sigs_dict
       #spaces before cycle number
       max_length = 5
       for sig in all_signal_values:
@@ -119,7 +152,7 @@ class PrintTextWavePass( BasePass ):
       #-----------------------------------------------------------------------
       # handles clock tick symbol
 
-      for i in range(len(all_signal_values["s.reset"])):
+      for i in top.get_metadata( self.textwave_cycles ):
         # insert a space every 5 cycles
         print(f"{tick}{str(i).ljust(char_length-1)}",end="")
       print("")
@@ -220,21 +253,45 @@ class PrintTextWavePass( BasePass ):
     wav_srcs = []
     text_sigs = {}
 
+    selected = select_wave_signals( top,
+      top.get_metadata( self.wave_components ) if top.has_metadata( self.wave_components ) else None,
+      top.get_metadata( self.wave_signals )    if top.has_metadata( self.wave_signals )    else None )
+
     # Now we create per-cycle signal value collect functions
     signal_names = []
     for x in top._dsl.all_signals:
+      if isinstance( x, MemArray ):
+        continue
       if x.is_top_level_signal() and x.get_field_name() != "clk" and x.get_field_name() != "reset":
-        signal_names.append( (x._dsl.level, repr(x)) )
+        if selected is None or x in selected:
+          signal_names.append( (x._dsl.level, repr(x)) )
 
     for _, x in [(0, 's.reset')] + sorted(signal_names):
       text_sigs[x] = []
       wav_srcs.append(f"text_sigs['{x}'].append( {x}.to_bits().bin() )")
 
+    start = 0
+    if top.has_metadata( self.wave_start_cycle ):
+      start = top.get_metadata( self.wave_start_cycle )
+    stop = None
+    if top.has_metadata( self.wave_stop_cycle ):
+      stop = top.get_metadata( self.wave_stop_cycle )
+
+    cycles = []
+    ctrl = get_wave_control( top )
+
     # TODO use integer index instead of dict, should be easy
     src =  """
-def dump_wav():
-  {}
-""".format( "\n  ".join(wav_srcs) )
-    s, l_dict = top, {}
-    exec(compile( src, filename="temp", mode="exec"), globals().update(locals()), l_dict)
-    return l_dict['dump_wav'], text_sigs
+def compile_dump_wav( text_sigs, cycles, ctrl ):
+  N = 0
+  def dump_wav():
+    nonlocal N
+    if {}:
+      cycles.append( N )
+      {}
+    N += 1
+  return dump_wav
+""".format( gen_window_cond( start, stop ), "\n      ".join(wav_srcs) )
+    _locals = {}
+    exec( compile( src, filename="temp", mode="exec" ), { 's': top }, _locals )
+    return _locals['compile_dump_wav']( text_sigs, cycles, ctrl ), text_sigs, cycles
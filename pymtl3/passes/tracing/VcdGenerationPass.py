@@ -7,13 +7,22 @@ Author : Shunning Jiang, Yanghui Ou, Peitian Pan
 Date   : Sep 8, 2019
 """
 
+import linecache
+import queue
+import threading
 import time
+import weakref
 from collections import defaultdict
+from fnmatch import fnmatchcase
 
-from pymtl3.datatypes import Bits, concat
-from pymtl3.dsl import Const, MetadataKey
+from pymtl3.datatypes import Bits, Bits1, is_bitstruct_inst
+from pymtl3.dsl import Const, MemArray, MetadataKey
+from pymtl3.extra.disk_cache import cached_compile
+from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass
-from pymtl3.passes.errors import PassOrderError
+from pymtl3.passes.errors import InvalidPassOptionValue, PassOrderError
+
+from .BlockWave import BlockWaveWriter, encode_varint
 
 
 class VcdGenerationPass( BasePass ):
@@ -27,18 +36,106 @@ class VcdGenerationPass( BasePass ):
   #: Default value: ""
   vcd_file_name = MetadataKey(str)
 
+  #: vcd file name, set by the pass groups. Same as vcd_file_name.
+  #:
+  #: Type: ``str``; input
+  vcdwave = MetadataKey(str)
+
+  #: Number of value changes buffered in memory before they are written
+  #: to the file. They are also written when sim_run returns, or call
+  #: top.wave_flush() to write them earlier.
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: 65536
+  vcd_buffer_size = MetadataKey(int)
+
+  #: Write the buffered value changes from a background thread
+  #:
+  #: Type: ``bool``; input
+  #:
+  #: Default value: False
+  vcd_writer_thread = MetadataKey(bool)
+
+  #: Waveform format. "vcd" dumps a VCD file and "bwave" dumps a block
+  #: compressed binary waveform that can be read by BlockWaveReader.
+  #:
+  #: Type: ``str``; input
+  #:
+  #: Default value: "vcd"
+  wave_format = MetadataKey(str)
+
+  #: Number of cycles in a compressed block of a "bwave" waveform
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: 4096
+  wave_block_cycles = MetadataKey(int)
+
+  #: Only dump the signals in the subtrees of these components
+  #:
+  #: Type: ``list`` of components; input
+  #:
+  #: Default value: all components
+  wave_components = MetadataKey(list)
+
+  #: Only dump the signals whose full names (e.g. "top.tile0.req.msg")
+  #: match one of these glob patterns. Signals selected by either
+  #: wave_components or wave_signals are dumped.
+  #:
+  #: Type: ``list`` of ``str``; input
+  #:
+  #: Default value: all signals
+  wave_signals = MetadataKey(list)
+
+  #: First cycle to dump. Cycles are counted from the first cycle of
+  #: sim_reset, same as top.sim_cycle_count().
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: 0
+  wave_start_cycle = MetadataKey(int)
+
+  #: Stop dumping from this cycle on
+  #:
+  #: Type: ``int``; input
+  #:
+  #: Default value: None
+  wave_stop_cycle = MetadataKey(int)
+
+  #: Runtime switch of all waveform dump functions of top, which is
+  #: toggled by top.wave_enable( bool )
+  #:
+  #: Type: ``WaveControl``; output
+  wave_control = MetadataKey()
+
   vcd_func = MetadataKey()
 
   def __call__( self, top ):
-    if top.has_metadata( self.vcd_file_name ):
-      vcd_file_name = top.get_metadata( self.vcd_file_name )
+    for key in [ self.vcd_file_name, self.vcdwave ]:
+      if top.has_metadata( key ):
+        vcd_file_name = top.get_metadata( key )
+        break
+    else:
+      return
 
-      if vcd_file_name is not None:
-        assert not top.has_metadata( self.vcd_func )
-        top.set_metadata( self.vcd_func, self.make_vcd_func( top, vcd_file_name ) )
+    if vcd_file_name is not None:
+      assert not top.has_metadata( self.vcd_func )
+      top.set_metadata( self.vcd_func, self.make_vcd_func( top, vcd_file_name ) )
 
   def make_vcd_func( self, top, vcd_file_name ):
     assert vcd_file_name is not None
+
+    wave_format = "vcd"
+    if top.has_metadata( self.wave_format ):
+      wave_format = top.get_metadata( self.wave_format )
+
+    if wave_format == "bwave":
+      return self.make_bwave_func( top, vcd_file_name )
+    if wave_format != "vcd":
+      raise InvalidPassOptionValue( "wave_format", wave_format, "VcdGenerationPass",
+                                    "the supported formats are 'vcd' and 'bwave'" )
+
     if vcd_file_name != "":
       vcd_file_name = str(vcd_file_name) + ".vcd"
     else:
@@ -80,47 +177,19 @@ class VcdGenerationPass( BasePass ):
 
     vcd_symbols = _gen_vcd_symbol()
 
-    # Preprocess some metadata
-
-    component_signals = defaultdict(set)
-
-    all_components = set()
-
-    # We only collect top level signals, and squash bitstruct into a long
-    # bits object
-    for x in top._dsl.all_signals:
-      if x.is_top_level_signal():
-        host = x.get_host_component()
-        component_signals[ host ].add( x )
-
-    # We pre-process all nets in order to remove all sliced wires because
-    # they belong to a top level wire and we count that wire
+    trimmed_value_nets, vcd_clock_net_idx, signal_net_mapping, component_signals = \
+      self.collect_nets( top )
 
-    trimmed_value_nets = []
-    vcd_clock_net_idx = None
-
-    # FIXME handle the case where the top level signal is in a value net
-    for writer, net in top.get_all_value_nets():
-      new_net = []
-      for x in net:
-        if not isinstance(x, Const) and x.is_top_level_signal():
-          new_net.append( x )
-          if repr(x) == "s.clk":
-            # Hardcode clock net because it needs to go up and down
-            assert vcd_clock_net_idx is None
-            vcd_clock_net_idx = len(trimmed_value_nets)
-
-      if new_net:
-        trimmed_value_nets.append( new_net )
+    # Only create scopes for components that contain dumped signals
+    wave_hosts = set()
+    for m, signals in component_signals.items():
+      while signals and m is not None and m not in wave_hosts:
+        wave_hosts.add( m )
+        m = m.get_parent_object()
 
     # Generate symbol for existing nets
 
     net_symbol_mapping = [ next(vcd_symbols) for x in trimmed_value_nets ]
-    signal_net_mapping = {}
-
-    for i in range(len(trimmed_value_nets)):
-      for x in trimmed_value_nets[i]:
-        signal_net_mapping[x] = i
 
     # Inner utility function to perform recursive descent of the model.
     # Shunning: I mostly follow v2's implementation
@@ -131,7 +200,6 @@ class VcdGenerationPass( BasePass ):
       return name.replace('[','(').replace(']',')').replace(':', '__')
 
     def recurse_models( m, spaces ):
-      nonlocal vcd_clock_net_idx, vcd_sim_ncycles
 
       # Special case the top level "s" to "top"
 
@@ -152,26 +220,7 @@ class VcdGenerationPass( BasePass ):
         # simulator if they are connected. Generate new vcd symbols per
         # net, not per signal as an optimization.
 
-        if signal in signal_net_mapping:
-          net_id = signal_net_mapping[signal]
-          symbol = net_symbol_mapping[net_id]
-        else:
-          # We treat this as a new net
-
-          # Check if it's clock. Hardcode clock net
-          if repr(signal) == "s.clk":
-            assert vcd_clock_net_idx is None
-            vcd_clock_net_idx = len(trimmed_value_nets)
-
-          # This is a signal whose connection is not captured by the
-          # global net data structure. This might be a sliced signal or
-          # a signal updated in an upblk. Creating a new net for it does
-          # not hurt functionality.
-
-          trimmed_value_nets.append( [ signal ] )
-          signal_net_mapping[signal] = len(signal_net_mapping)
-          symbol = next(vcd_symbols)
-          net_symbol_mapping.append( symbol )
+        symbol = net_symbol_mapping[ signal_net_mapping[signal] ]
 
         # This signal can be a part of an interface so we have to
         # "subtract" host component's name from signal's full name
@@ -183,7 +232,8 @@ class VcdGenerationPass( BasePass ):
 
       # Recursively visit all submodels.
       for child in m.get_child_components():
-        recurse_models( child, spaces+'  ' )
+        if child in wave_hosts:
+          recurse_models( child, spaces+'  ' )
 
       print( f"{spaces}$upscope $end", file=vcd_file )
 
@@ -195,23 +245,9 @@ class VcdGenerationPass( BasePass ):
     # nets in the design.
     print( "$enddefinitions $end\n", file=vcd_file )
 
-    # last_values is an array of values from the previous cycle
-
-    last_values = [0 for _ in range(len(trimmed_value_nets))]
-
-    for i, net in enumerate(trimmed_value_nets):
-      # Convert everything to Bits to get around lack of bit struct support.
-      # The first cycle VCD contains the default value
-      bin_str = net[0]._dsl.Type().to_bits().bin()
-
-      print( f"b{bin_str} {net_symbol_mapping[i]}", file=vcd_file )
-
-      # Set this to be the last cycle value str
-      last_values[i] = bin_str
-
-    # Now we create per-cycle signal value collect functions
-
-    vcd_sim_ncycles = 0
+    # Now we create per-cycle signal value collect functions. The dump
+    # function is generated as straight-line code that compares the
+    # integer value of each net against the last dumped value.
 
     # Separate clock net from normal nets ahead of time
     clock_symbol = net_symbol_mapping[ vcd_clock_net_idx ]
@@ -220,49 +256,415 @@ class VcdGenerationPass( BasePass ):
                     for i in range(len(trimmed_value_nets))
                       if i != vcd_clock_net_idx ]
 
+    # last_values is an array of values from the previous cycle. The
+    # first cycle VCD contains the default value
+
+    last_values = []
+
+    for signal, symbol in net_details:
+      # Convert everything to Bits to get around lack of bit struct support.
+      default = signal._dsl.Type().to_bits()
+      print( f"b{default.bin()} {symbol}", file=vcd_file )
+      last_values.append( int(default) )
+
+    print( f"b{Bits1(0).bin()} {clock_symbol}", file=vcd_file )
+
     # Flip clock for the first cycle
     print( '\n#0\nb0b1 {}\n'.format( clock_symbol ), file=vcd_file, flush=True )
 
-    # Returns a dump_vcd function that is ready to be appended to _sched.
-    # TODO: type check?
+    buffer_size = 65536
+    if top.has_metadata( self.vcd_buffer_size ):
+      buffer_size = top.get_metadata( self.vcd_buffer_size )
+
+    threaded = top.has_metadata( self.vcd_writer_thread ) and \
+               top.get_metadata( self.vcd_writer_thread )
+
+    writer = BufferedWaveWriter( vcd_file, threaded )
+
+    start, stop = self.get_cycle_window( top )
+    src = self.gen_dump_vcd_src( net_details, clock_symbol, start, stop )
+    ctrl = get_wave_control( top )
+
+    _globals = { 'Bits': Bits }
+    _locals  = {}
+    fname = f"dump_vcd_{top.__class__.__name__}"
+    custom_exec( cached_compile( src, fname ), _globals, _locals )
+    linecache.cache[ fname ] = (len(src), None, src.splitlines(True), fname)
+
+    # Signals are only replaced by their actual value objects after the
+    # simulation is locked in, so we resolve all references when the
+    # dump function is called for the first time.
+
+    impl = None
+
+    def dump_vcd():
+      nonlocal impl
+      if impl is None:
+        values = resolve_values( top, [ x for x, _ in net_details ] )
+        impl = _locals['compile_dump_vcd']( values, last_values, writer, buffer_size, ctrl )
+      impl()
+
+    top.wave_flush = writer.flush
+    return dump_vcd
+
+  def make_bwave_func( self, top, wave_file_name ):
+    if wave_file_name != "":
+      wave_file_name = str(wave_file_name) + ".bwave"
+    else:
+      wave_file_name = str(top.__class__.__name__) + ".bwave"
+
+    try:                    timescale = top.vcd_timescale
+    except AttributeError:  timescale = "10ps"
+
+    block_cycles = 4096
+    if top.has_metadata( self.wave_block_cycles ):
+      block_cycles = top.get_metadata( self.wave_block_cycles )
+
+    trimmed_value_nets, clock_net_idx, _, _ = self.collect_nets( top )
+
+    # The clock is implicit in a block waveform
+    nets = [ net for i, net in enumerate( trimmed_value_nets ) if i != clock_net_idx ]
+    signals = [ net[0] for net in nets ]
+    last_values = [ int( x._dsl.Type().to_bits() ) for x in signals ]
+
+    writer = BlockWaveWriter( wave_file_name,
+                              [ ( net[0]._dsl.Type.nbits,
+                                  sorted( "top" + repr(x)[1:] for x in net ) ) for net in nets ],
+                              last_values, timescale, block_cycles )
+
+    start, stop = self.get_cycle_window( top )
+    src = self.gen_dump_bwave_src( signals, start, stop )
+    ctrl = get_wave_control( top )
 
-    # Adding this 's' argument is for eval to correctly evaluate 's.x'...
-    # Python 3 destroys a lot of our hacks .. sigh
+    _locals = {}
+    fname = f"dump_bwave_{top.__class__.__name__}"
+    custom_exec( cached_compile( src, fname ), {}, _locals )
+    linecache.cache[ fname ] = (len(src), None, src.splitlines(True), fname)
 
-    def dump_vcd_inner( s ):
-      nonlocal vcd_sim_ncycles
+    impl = None
 
-      for i, (signal, symbol) in enumerate( net_details ):
+    def dump_bwave():
+      nonlocal impl
+      if impl is None:
+        values = resolve_values( top, signals )
+        impl = _locals['compile_dump_bwave']( values, last_values, writer, ctrl )
+      impl()
 
-        # If we encounter a BitStruct then dump it as a concatenation of
-        # all fields.
-        # TODO: treat each field in a BitStruct as a separate signal?
+    top.wave_flush = writer.flush
+    return dump_bwave
 
-        try:
-          net_bits_bin = eval(repr(signal)).to_bits()
-        except Exception as e:
-          raise TypeError(f'{e}\n - {signal} becomes another type. Please check your code.')
+  def collect_nets( self, top ):
+    """ Return the nets of top level signals, the index of the clock net,
+    the net index of each top level signal, and the top level signals of
+    each component. """
 
-        net_bits_bin_str = net_bits_bin.bin()
-        # `last_value` is the string form of a Bits object in binary
-        # e.g. '0b000' == Bits3(0).bin()
-        # We store strings instead of values ...
-        if last_values[i] != net_bits_bin_str:
-          last_values[i] = net_bits_bin_str
-          print( f'b{net_bits_bin_str} {symbol}', file=vcd_file )
+    component_signals = defaultdict(list)
 
-      # Flop clock at the end of cycle
-      next_neg_edge = 100 * vcd_sim_ncycles + 50
-      print( f'\n#{next_neg_edge}\nb0b0 {clock_symbol}', file=vcd_file )
+    selected = select_wave_signals( top,
+      top.get_metadata( self.wave_components ) if top.has_metadata( self.wave_components ) else None,
+      top.get_metadata( self.wave_signals )    if top.has_metadata( self.wave_signals )    else None )
 
-      # Flip clock of the next cycle
-      next_pos_edge = next_neg_edge + 50
-      print( f'#{next_pos_edge}\nb0b1 {clock_symbol}\n', file=vcd_file, flush=True )
-      vcd_sim_ncycles += 1
+    # We only collect top level signals, and squash bitstruct into a long
+    # bits object. Like in Verilog simulators, MemArrays are not dumped.
+    for x in top._dsl.all_signals:
+      if x.is_top_level_signal() and not isinstance( x, MemArray ):
+        if selected is None or x in selected or repr(x) == "s.clk":
+          host = x.get_host_component()
+          component_signals[ host ].append( x )
+
+    # We pre-process all nets in order to remove all sliced wires because
+    # they belong to a top level wire and we count that wire
+
+    trimmed_value_nets = []
+    clock_net_idx = None
 
-    def gen_dump_vcd( s ):
-      def dump_vcd():
-        dump_vcd_inner( s )
-      return dump_vcd
+    # FIXME handle the case where the top level signal is in a value net
+    for writer, net in top.get_all_value_nets():
+      new_net = []
+      for x in net:
+        if not isinstance(x, Const) and x.is_top_level_signal() and \
+           ( selected is None or x in selected or repr(x) == "s.clk" ):
+          new_net.append( x )
+          if repr(x) == "s.clk":
+            # Hardcode clock net because it needs to go up and down
+            assert clock_net_idx is None
+            clock_net_idx = len(trimmed_value_nets)
 
-    return gen_dump_vcd( top )
+      if new_net:
+        trimmed_value_nets.append( new_net )
+
+    signal_net_mapping = {}
+
+    for i in range(len(trimmed_value_nets)):
+      for x in trimmed_value_nets[i]:
+        signal_net_mapping[x] = i
+
+    # A signal whose connection is not captured by the global net data
+    # structure might be a sliced signal or a signal updated in an upblk.
+    # Creating a new net for it does not hurt functionality.
+
+    for m in sorted( top.get_all_components(), key=repr ):
+      for signal in component_signals[m]:
+        if signal not in signal_net_mapping:
+          # Check if it's clock. Hardcode clock net
+          if repr(signal) == "s.clk":
+            assert clock_net_idx is None
+            clock_net_idx = len(trimmed_value_nets)
+
+          signal_net_mapping[signal] = len(trimmed_value_nets)
+          trimmed_value_nets.append( [ signal ] )
+
+    return trimmed_value_nets, clock_net_idx, signal_net_mapping, component_signals
+
+  def get_cycle_window( self, top ):
+    start = 0
+    if top.has_metadata( self.wave_start_cycle ):
+      start = top.get_metadata( self.wave_start_cycle )
+    stop = None
+    if top.has_metadata( self.wave_stop_cycle ):
+      stop = top.get_metadata( self.wave_stop_cycle )
+    return start, stop
+
+  @staticmethod
+  def gen_dump_vcd_src( net_details, clock_symbol, start=0, stop=None ):
+    """ Return the source of compile_dump_vcd( values, last_values, writer,
+    buffer_size, ctrl ), which binds the value objects of all nets to
+    local variables and returns a dump function with one compare per net.
+    Only cycles in [start, stop) are dumped when ctrl is enabled. """
+
+    unpack_srcs = []
+    dump_srcs   = []
+
+    for i, (signal, symbol) in enumerate( net_details ):
+      nbits = signal._dsl.Type.nbits
+
+      # If we encounter a BitStruct then dump it as a concatenation of
+      # all fields.
+      # TODO: treat each field in a BitStruct as a separate signal?
+      if issubclass( signal._dsl.Type, Bits ): value_src = f"int(_v{i})"
+      else:                                    value_src = f"int(_v{i}.to_bits())"
+
+      suffix = f" {symbol}\n"
+
+      unpack_srcs.append( f"_v{i} = values[{i}]; _l{i} = last_values[{i}]" )
+      dump_srcs.extend( [
+        f"v = {value_src}",
+        f"if v != _l{i}:",
+        f"  _l{i} = v; A( 'b0b' + format( v, '0{nbits}b' ) + {suffix!r} )",
+      ] )
+
+    nonlocals = "".join( [ f", _l{i}" for i in range(len(net_details)) ] )
+
+    return """
+def compile_dump_vcd( values, last_values, writer, buffer_size, ctrl ):
+  buf = writer.buf
+  A   = buf.append
+  N   = 0
+  P   = 0
+  {0}
+
+  def dump_vcd():
+    nonlocal N, P{1}
+    if {2}:
+      # Mark the time again if the previous cycles were not dumped
+      if P != N:
+        A( '#' + str(100 * N) + {4!r} )
+
+      {3}
+
+      # Flop clock at the end of cycle and flip clock of the next cycle
+      T = 100 * N + 50
+      A( '\\n#' + str(T) + {5!r} + str(T + 50) + {4!r} )
+      P = N + 1
+
+      if len(buf) >= buffer_size:
+        writer.write_buffer()
+    N += 1
+
+  return dump_vcd
+""".format( "\n  ".join( unpack_srcs ), nonlocals, gen_window_cond( start, stop ),
+            "\n      ".join( dump_srcs ),
+            f"\nb0b1 {clock_symbol}\n\n", f"\nb0b0 {clock_symbol}\n#" )
+
+  @staticmethod
+  def gen_dump_bwave_src( signals, start=0, stop=None ):
+    """ Return the source of compile_dump_bwave( values, last_values,
+    writer, ctrl ). Same as gen_dump_vcd_src but the value changes are
+    encoded as the records of BlockWaveWriter. """
+
+    unpack_srcs = []
+    dump_srcs   = []
+
+    for i, signal in enumerate( signals ):
+      nbytes = (signal._dsl.Type.nbits + 7) // 8
+      if issubclass( signal._dsl.Type, Bits ): value_src = f"int(_v{i})"
+      else:                                    value_src = f"int(_v{i}.to_bits())"
+
+      unpack_srcs.append( f"_v{i} = values[{i}]; _l{i} = last_values[{i}]" )
+      dump_srcs.extend( [
+        f"v = {value_src}",
+        f"if v != _l{i}:",
+        f"  _l{i} = v; B += {encode_varint( i+1 )!r}; B += v.to_bytes( {nbytes}, 'little' )",
+      ] )
+
+    ls = [ f"_l{i}" for i in range(len(signals)) ]
+
+    return """
+def compile_dump_bwave( values, last_values, writer, ctrl ):
+  B = writer.buf
+  end_cycle  = writer.end_cycle
+  skip_cycle = writer.skip_cycle
+  N = 0
+  {0}
+
+  def snapshot():
+    return [ {1} ]
+  writer.snapshot_func = snapshot
+
+  def dump_bwave():
+    nonlocal B, N{2}
+    if {3}:
+      {4}
+      end_cycle()
+    else:
+      skip_cycle()
+    N += 1
+
+  return dump_bwave
+""".format( "\n  ".join( unpack_srcs ) or "pass", ", ".join( ls ),
+            "".join( [ f", {x}" for x in ls ] ), gen_window_cond( start, stop ),
+            "\n      ".join( dump_srcs ) )
+
+#-------------------------------------------------------------------------
+# Selective waveform capture
+#-------------------------------------------------------------------------
+
+class WaveControl:
+  __slots__ = ( 'enabled', )
+
+  def __init__( s ):
+    s.enabled = True
+
+def get_wave_control( top ):
+  """ Return the WaveControl of top shared by all waveform dump functions
+  and create top.wave_enable( bool ) the first time. """
+  if not top.has_metadata( VcdGenerationPass.wave_control ):
+    ctrl = WaveControl()
+    top.set_metadata( VcdGenerationPass.wave_control, ctrl )
+
+    def wave_enable( enabled ):
+      ctrl.enabled = bool( enabled )
+    top.wave_enable = wave_enable
+
+  return top.get_metadata( VcdGenerationPass.wave_control )
+
+def gen_window_cond( start, stop ):
+  conds = [ "ctrl.enabled" ]
+  if start:
+    conds.append( f"N >= {start}" )
+  if stop is not None:
+    conds.append( f"N < {stop}" )
+  return " and ".join( conds )
+
+def select_wave_signals( top, components, globs ):
+  """ Return the set of top level signals that are in the subtree of one
+  of the components or whose full names match one of the glob patterns,
+  or None to select all signals. """
+  if components is None and globs is None:
+    return None
+
+  components = set( components or [] )
+  globs = globs or []
+
+  ret = set()
+  for x in top._dsl.all_signals:
+    if not x.is_top_level_signal():
+      continue
+
+    m = x.get_host_component()
+    while m is not None and m not in components:
+      m = m.get_parent_object()
+
+    if m is not None or any( fnmatchcase( "top" + repr(x)[1:], g ) for g in globs ):
+      ret.add( x )
+  return ret
+
+def resolve_values( top, signals ):
+  values = [ eval( repr(signal), { 's': top } ) for signal in signals ]
+  for signal, value in zip( signals, values ):
+    if not isinstance( value, Bits ) and not is_bitstruct_inst( value ):
+      raise TypeError(f'{signal} becomes {value!r} of type {type(value)}. Please check your code.')
+  return values
+
+#-------------------------------------------------------------------------
+# BufferedWaveWriter
+#-------------------------------------------------------------------------
+# Collect the dumped strings in a list and write them to the file in
+# large chunks. With a background thread, joining and writing the chunks
+# is overlapped with the simulation. The file is closed when the writer
+# is garbage collected or at exit, whichever comes first. The thread and
+# the finalizer only refer to the file, the buffer and the queue so that
+# they don't keep the writer alive.
+
+def _write_loop( file, chunks ):
+  while True:
+    chunk = chunks.get()
+    if chunk is None:
+      chunks.task_done()
+      return
+    file.write( "".join( chunk ) )
+    file.flush()
+    chunks.task_done()
+
+def _write_buffer( file, buf, chunks ):
+  if not buf:
+    return
+  if chunks is not None:
+    chunks.put( buf[:] )
+  else:
+    file.write( "".join( buf ) )
+    file.flush()
+  buf.clear()
+
+def _flush( file, buf, chunks ):
+  if file.closed:
+    return
+  _write_buffer( file, buf, chunks )
+  if chunks is not None:
+    chunks.join()
+  file.flush()
+
+def _close( file, buf, chunks, thread ):
+  if file.closed:
+    return
+  _flush( file, buf, chunks )
+  if thread is not None:
+    chunks.put( None )
+    thread.join()
+  file.close()
+
+class BufferedWaveWriter:
+
+  def __init__( s, file, threaded=False ):
+    s.file = file
+    s.buf  = []
+    s.queue  = None
+    s.thread = None
+
+    if threaded:
+      s.queue  = queue.Queue()
+      s.thread = threading.Thread( target=_write_loop, args=( file, s.queue ), daemon=True )
+      s.thread.start()
+
+    s._finalizer = weakref.finalize( s, _close, s.file, s.buf, s.queue, s.thread )
+
+  def write_buffer( s ):
+    """ Write the buffered changes, called when the buffer is full. """
+    _write_buffer( s.file, s.buf, s.queue )
+
+  def flush( s ):
+    """ Write all buffered changes to the file. """
+    _flush( s.file, s.buf, s.queue )
+
+  def close( s ):
+    s._finalizer()
@@ -1,2 +1,3 @@
+from .BlockWave import BlockWaveReader
 from .PrintTextWavePass import PrintTextWavePass
 from .VcdGenerationPass import VcdGenerationPass
@@ -0,0 +1,118 @@
+#=========================================================================
+# BlockWave_test.py
+#=========================================================================
+# Dump block compressed waveforms with VcdGenerationPass and read them
+# back with BlockWaveReader.
+
+import pytest
+
+from pymtl3.datatypes import *
+from pymtl3.dsl import *
+from pymtl3.passes.errors import InvalidPassOptionValue
+from pymtl3.passes.PassGroups import DefaultPassGroup
+
+from ..BlockWave import BlockWaveReader
+from ..VcdGenerationPass import VcdGenerationPass
+
+bs = mk_bitstruct( "BlockWaveStruct", {
+  'foo' : Bits1,
+  'bar' : Bits32,
+} )
+
+class Acc( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.st  = InPort( bs )
+    s.out = OutPort( Bits16 )
+    s.acc = Wire( Bits16 )
+    s.out //= s.acc
+
+    @update_ff
+    def up_acc():
+      if s.reset:
+        s.acc <<= 0
+      else:
+        s.acc <<= s.acc + zext( s.in_, 16 )
+
+def _dump( block_cycles ):
+  dut = Acc()
+  dut.set_metadata( VcdGenerationPass.wave_block_cycles, block_cycles )
+  dut.apply( DefaultPassGroup( vcdwave=f"Acc_{block_cycles}", wave_format="bwave" ) )
+  dut.sim_reset()
+
+  outs = []
+  for i in range(100):
+    dut.in_ @= i % 7
+    dut.st  @= bs( i & 1, i * 1000 )
+    dut.sim_tick()
+    outs.append( int(dut.out) )
+
+  dut.wave_flush()
+  return outs
+
+@pytest.mark.parametrize( "block_cycles", [ 1, 16, 4096 ] )
+def test_block_wave( block_cycles ):
+  outs = _dump( block_cycles )
+
+  with BlockWaveReader( f"Acc_{block_cycles}.bwave" ) as r:
+    # three cycles of reset
+    assert r.ncycles == 103
+    assert len(r.blocks) == (103 + block_cycles - 1) // block_cycles
+    assert "top.in_" in r.signals and "top.acc" in r.signals
+    assert r.nbits( "top.st" ) == 33
+
+    # Connected signals are in the same net
+    assert r.changes( "top.out" ) == r.changes( "top.acc" )
+
+    # Values are dumped at the beginning of each cycle
+    for i in range(100):
+      assert r.value( "top.in_", i+3 ) == i % 7
+      assert r.value( "top.st", i+3 ) == ( (i & 1) << 32 ) | ( i * 1000 )
+    for i in range(99):
+      assert r.value( "top.acc", i+4 ) == outs[i]
+
+    # Seek backwards across blocks
+    assert r.value( "top.in_", 10 ) == 0
+    assert r.changes( "top.in_", 50, 53 ) == [ (50, 47 % 7), (51, 48 % 7), (52, 49 % 7) ]
+
+    with pytest.raises( IndexError ):
+      r.value( "top.in_", 103 )
+
+def test_invalid_wave_format():
+  dut = Acc()
+  with pytest.raises( InvalidPassOptionValue ):
+    dut.apply( DefaultPassGroup( vcdwave="Acc_invalid", wave_format="fsdb" ) )
+
+@pytest.mark.parametrize( "block_cycles", [ 1, 4096 ] )
+def test_block_wave_window( block_cycles ):
+  dut = Acc()
+  dut.elaborate()
+  dut.set_metadata( VcdGenerationPass.wave_block_cycles, block_cycles )
+  dut.set_metadata( VcdGenerationPass.wave_signals, [ "top.in_" ] )
+  dut.set_metadata( VcdGenerationPass.wave_start_cycle, 10 )
+  dut.set_metadata( VcdGenerationPass.wave_stop_cycle, 50 )
+  dut.apply( DefaultPassGroup( vcdwave=f"Acc_window_{block_cycles}", wave_format="bwave" ) )
+  dut.sim_reset()
+
+  for i in range(100):
+    dut.wave_enable( not 20 <= i < 30 )
+    dut.in_ @= i
+    dut.sim_tick()
+
+  dut.wave_flush()
+
+  dumped = [ c for c in range(10, 50) if not 23 <= c < 33 ]
+
+  with BlockWaveReader( f"Acc_window_{block_cycles}.bwave" ) as r:
+    assert r.signals == [ "top.in_" ]
+    assert r.ncycles == 50
+    assert sum( x[1] for x in r.blocks ) == len(dumped)
+
+    for c in dumped:
+      assert r.value( "top.in_", c ) == c - 3
+    for c in (0, 9, 23, 32, 50):
+      with pytest.raises( IndexError ):
+        r.value( "top.in_", c )
+
+    assert r.changes( "top.in_" ) == [ ( c, c - 3 ) for c in dumped ]
+    assert r.changes( "top.in_", 30, 35 ) == [ (33, 30), (34, 31) ]
@@ -176,6 +176,9 @@ def test_toy():
     if sliced != "reset" and sliced != "clk":
       assert i[dot+1:] in out
 
+  # The generated dump function doesn't leak its variables into the pass
+  assert 'text_sigs' not in PrintTextWavePass.__call__.__globals__
+
 def test_widetoy():
   class Toy( Component ):
 
@@ -306,3 +309,40 @@ def test_bitstruct():
     sliced = i[dot+1:]
     if sliced != "reset" and sliced != "clk":
       assert i[dot+1:] in out
+
+def test_selective_textwave():
+
+  class Toy( Component ):
+    def construct( s ):
+      s.in0 = InPort( Bits16 )
+      s.in1 = InPort( Bits16 )
+      s.out = OutPort( Bits16 )
+
+      @update
+      def add_upblk():
+        s.out @= s.in0 + s.in1
+
+  dut = Toy()
+  dut.elaborate()
+  dut.set_metadata( PrintTextWavePass.enable, True )
+  dut.set_metadata( PrintTextWavePass.wave_signals, [ "top.in*" ] )
+  dut.set_metadata( PrintTextWavePass.wave_start_cycle, 4 )
+  dut.set_metadata( PrintTextWavePass.wave_stop_cycle, 10 )
+  dut.apply( DefaultPassGroup() )
+  dut.sim_reset()
+
+  for i in range(10):
+    dut.wave_enable( i != 3 )
+    dut.in0 @= i
+    dut.in1 @= 1
+    dut.sim_tick()
+
+  sig = dut.get_metadata( PrintTextWavePass.textwave_dict )
+  assert sorted( sig ) == [ "s.in0", "s.in1", "s.reset" ]
+  assert dut.get_metadata( PrintTextWavePass.textwave_cycles ) == [ 4, 5, 7, 8, 9 ]
+  assert [ int(x, 2) for x in sig["s.in0"] ] == [ 1, 2, 4, 5, 6 ]
+
+  f = io.StringIO()
+  with redirect_stdout( f ):
+    dut.print_textwave()
+  assert "|7" in f.getvalue() and "|6" not in f.getvalue()
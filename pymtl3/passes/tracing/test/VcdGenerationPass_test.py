@@ -11,11 +11,13 @@
 # Author: Peitian Pan
 # Date:   Nov 1, 2019
 
+import gc
+
 from pymtl3.datatypes import *
 from pymtl3.dsl import *
 from pymtl3.passes.PassGroups import DefaultPassGroup
 
-from ..VcdGenerationPass import VcdGenerationPass
+from ..VcdGenerationPass import BufferedWaveWriter, VcdGenerationPass
 
 
 def run_test( dut, tv, tv_in, tv_out ):
@@ -89,3 +91,143 @@ def test_bitstruct_signals():
     [  bs(0, -1), b32(0), b32(-1), ],
     [  bs(0, 42), b32(42), b32(84), ],
   ], tv_in, tv_out )
+
+def _dump_value_changes( threaded, buffer_size ):
+  class A3( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.out = OutPort( Bits8 )
+
+      @update
+      def upblk():
+        s.out @= s.in_ + 1
+
+  dut = A3()
+  vcd_file_name = f"A3_buffered_{int(threaded)}_{buffer_size}"
+  dut.set_metadata( VcdGenerationPass.vcd_file_name, vcd_file_name )
+  dut.set_metadata( VcdGenerationPass.vcd_writer_thread, threaded )
+  dut.set_metadata( VcdGenerationPass.vcd_buffer_size, buffer_size )
+  dut.apply( DefaultPassGroup() )
+  dut.sim_reset()
+  for i in range(10):
+    dut.in_ @= i * 3
+    dut.sim_tick()
+
+  dut.wave_flush()
+  with open(vcd_file_name+".vcd") as fd:
+    header, body = fd.read().split( "$enddefinitions $end" )
+
+  # Symbols are assigned in arbitrary order, so we replace them by names
+  names = {}
+  for line in header.splitlines():
+    tokens = line.split()
+    if tokens and tokens[0] == "$var":
+      names[ tokens[3] ] = tokens[4]
+
+  changes = []
+  for line in body.splitlines():
+    tokens = line.split()
+    if len(tokens) == 1:
+      changes.append( tokens[0] )
+    elif len(tokens) == 2:
+      changes.append( ( names[ tokens[1] ], tokens[0] ) )
+
+  # The last cycle of in_ and out
+  assert ( "in_", "b0b00011011" ) in changes
+  assert ( "out", "b0b00011100" ) in changes
+  assert "#1300" in changes
+  return sorted( changes, key=str )
+
+def test_buffered_writer():
+  ref = _dump_value_changes( False, 65536 )
+  assert _dump_value_changes( False, 1 ) == ref
+  assert _dump_value_changes( True, 4 ) == ref
+
+def test_buffered_writer_closed_when_collected():
+  writer = BufferedWaveWriter( open( "buffered_gc.vcd", "w" ) )
+  file = writer.file
+  writer.buf.append( "#0\n" )
+  del writer
+  gc.collect()
+  assert file.closed
+  with open( "buffered_gc.vcd" ) as fd:
+    assert fd.read() == "#0\n"
+
+class Inc( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.out = OutPort( Bits8 )
+    s.tmp = Wire( Bits8 )
+
+    @update
+    def upblk():
+      s.tmp @= s.in_ + 1
+      s.out @= s.tmp
+
+class Inc2( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.out = OutPort( Bits8 )
+    s.a = Inc()
+    s.b = Inc()
+    s.a.in_ //= s.in_
+    s.b.in_ //= s.a.out
+    s.out //= s.b.out
+
+def test_sim_run_flushes_waveform():
+  dut = Inc2()
+  dut.set_metadata( VcdGenerationPass.vcd_file_name, "Inc2_sim_run" )
+  dut.apply( DefaultPassGroup() )
+  dut.sim_reset()
+  dut.in_ @= 3
+  dut.sim_run( 5 )
+
+  # No wave_flush, sim_run writes the buffered changes
+  with open("Inc2_sim_run.vcd") as fd:
+    lines = fd.read().splitlines()
+  assert "#800" in lines
+  assert any( line.startswith( "b0b00000101 " ) for line in lines )
+
+def test_selective_capture():
+  dut = Inc2()
+  dut.elaborate()
+  dut.set_metadata( VcdGenerationPass.vcd_file_name, "Inc2_selective" )
+  dut.set_metadata( VcdGenerationPass.wave_components, [ dut.a ] )
+  dut.set_metadata( VcdGenerationPass.wave_signals, [ "top.b.t*" ] )
+  dut.set_metadata( VcdGenerationPass.wave_start_cycle, 5 )
+  dut.set_metadata( VcdGenerationPass.wave_stop_cycle, 20 )
+  dut.apply( DefaultPassGroup() )
+  dut.sim_reset()
+  for i in range(20):
+    # Cycles 10 and 11 (after three cycles of reset) are not dumped
+    dut.wave_enable( i not in (7, 8) )
+    dut.in_ @= i
+    dut.sim_tick()
+
+  dut.wave_flush()
+  with open("Inc2_selective.vcd") as fd:
+    header, body = fd.read().split( "$enddefinitions $end" )
+
+  scopes = [ line.split()[2] for line in header.splitlines() if line.strip().startswith("$scope") ]
+  assert sorted( scopes ) == [ "a", "b", "top" ]
+
+  # The clock is always dumped
+  names = [ line.split()[4] for line in header.splitlines() if line.strip().startswith("$var") ]
+  assert sorted( names ) == [ "clk", "clk", "in_", "out", "reset", "tmp", "tmp" ]
+
+  times = [ int(line[1:]) for line in body.splitlines() if line.startswith("#") ]
+  # The clock falls in the middle of each dumped cycle
+  cycles = [ t // 100 for t in times if t % 100 == 50 ]
+  assert cycles == [ x for x in range(5, 20) if x not in (10, 11) ]
+
+def test_tracing_passes_importable_from_passes():
+  # The pass groups import the tracing passes lazily
+  from pymtl3.passes import CLLineTracePass, LineTraceParamPass, PrintTextWavePass
+  from pymtl3.passes import VcdGenerationPass as passes_VcdGenerationPass
+  from pymtl3.passes.PassGroups import VcdGenerationPass as groups_VcdGenerationPass
+  from ..CLLineTracePass import CLLineTracePass as tracing_CLLineTracePass
+
+  assert passes_VcdGenerationPass is groups_VcdGenerationPass is VcdGenerationPass
+  assert CLLineTracePass is tracing_CLLineTracePass
+  assert LineTraceParamPass.__name__ == 'LineTraceParamPass'
+  assert PrintTextWavePass.__name__ == 'PrintTextWavePass'
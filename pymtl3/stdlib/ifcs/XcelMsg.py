@@ -20,11 +20,11 @@ class XcelMsgType:
     WRITE : "wr",
   }
 
-def mk_xcel_msg( addr, data ):
-  return mk_xcel_req_msg( addr, data ), mk_xcel_resp_msg( data )
+def mk_xcel_msg( addr, data, packed=False ):
+  return mk_xcel_req_msg( addr, data, packed ), mk_xcel_resp_msg( data, packed )
 
-def mk_xcel_req_msg( a, d ):
-  @bitstruct
+def mk_xcel_req_msg( a, d, packed=False ):
+  @bitstruct( packed=packed )
   class XcelReqMsg:
     type_ : Bits1
     addr  : mk_bits( a )
@@ -39,8 +39,8 @@ def mk_xcel_req_msg( a, d ):
 
   return XcelReqMsg
 
-def mk_xcel_resp_msg( d ):
-  @bitstruct
+def mk_xcel_resp_msg( d, packed=False ):
+  @bitstruct( packed=packed )
   class XcelRespMsg:
     type_ : Bits1
     data  : mk_bits( d )
@@ -48,12 +48,12 @@ class MemMsgType:
     FLUSH      : "fl"
   }
 
-def mk_mem_msg( opq, addr, data ):
-  return mk_mem_req_msg( opq, addr, data ), mk_mem_resp_msg( opq, data )
+def mk_mem_msg( opq, addr, data, packed=False ):
+  return mk_mem_req_msg( opq, addr, data, packed ), mk_mem_resp_msg( opq, data, packed )
 
-def mk_mem_req_msg( o, a, d ):
+def mk_mem_req_msg( o, a, d, packed=False ):
 
-  @bitstruct
+  @bitstruct( packed=packed )
   class MemReqMsg:
     type_  : Bits4
     opaque : mk_bits( o           )
@@ -74,9 +74,9 @@ def mk_mem_req_msg( o, a, d ):
 
   return MemReqMsg
 
-def mk_mem_resp_msg( o, d ):
+def mk_mem_resp_msg( o, d, packed=False ):
 
-  @bitstruct
+  @bitstruct( packed=packed )
   class MemRespMsg:
     type_  : Bits4
     opaque : mk_bits( o           )
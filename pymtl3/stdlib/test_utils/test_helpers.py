@@ -177,8 +177,7 @@ def run_sim( model, cmdline_opts=None, line_trace=True, duts=None ):
     model.sim_reset()
 
     # Run simulation
-    while not model.done() and model.sim_cycle_count() < max_cycles:
-      model.sim_tick()
+    model.sim_run( max_cycles - model.sim_cycle_count(), until=model.done )
 
     # Force a test failure if we timed out
     assert model.sim_cycle_count() < max_cycles
@@ -189,6 +188,8 @@ def run_sim( model, cmdline_opts=None, line_trace=True, duts=None ):
     model.sim_tick()
 
   finally:
+    if hasattr( model, 'wave_flush' ):
+      model.wave_flush()
     finalize_verilator( model )
 
 class RunTestVectorSimError( Exception ):
@@ -315,4 +316,6 @@ run_test_vector_sim received an incorrect value!
     model.sim_tick()
 
   finally:
+    if hasattr( model, 'wave_flush' ):
+      model.wave_flush()
     finalize_verilator( model )